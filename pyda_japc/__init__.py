@@ -3,6 +3,8 @@ Documentation for the pyda_japc package
 
 """
 
+import os
+
 from ._version import version as __version__  # noqa
 
 
@@ -20,4 +22,13 @@ __cmmnbuild_deps__ = [
     # {"product": "slf4j-log4j12", "groupId": "org.slf4j"},
 ]
 
+from ._pipeline import BackpressurePolicy, ConversionPipeline
 from ._provider import JapcProvider
+from ._recorder import Recorder, RingBuffer
+from ._transformations import LazyDataTypeValue
+from ._warmup import warmup, warmup_in_background
+
+
+if os.environ.get('PYDA_JAPC_WARMUP'):
+    # Opt-in: warm up while the importing application gets on with its own initialisation.
+    warmup_in_background()
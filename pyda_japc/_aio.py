@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import typing
+import weakref
+
+
+class LoopBridge:
+    """
+    Hand results produced on JAPC callback threads over to an asyncio event loop.
+
+    Rather than scheduling one ``call_soon_threadsafe`` (and hence one wake-up
+    of the loop) per result, results are queued, and a single drain of the
+    queue is scheduled whenever it goes from empty to non-empty. Bursts of
+    results arriving together are thereby handled in a single wake-up.
+
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        # Don't keep the loop alive, bridges are looked up in a weak mapping keyed by their loop.
+        self._loop_ref = weakref.ref(loop)
+        self._pending: typing.List[typing.Tuple[typing.Callable[[typing.Any], None], typing.Any]] = []
+        self._lock = threading.Lock()
+        #: The number of times the loop was woken up, for diagnostics.
+        self.wakeups = 0
+
+    @property
+    def loop(self) -> typing.Optional[asyncio.AbstractEventLoop]:
+        return self._loop_ref()
+
+    def call(self, fn: typing.Callable[[typing.Any], None], arg: typing.Any) -> None:
+        """Call ``fn(arg)`` on the event loop. Safe to call from any thread."""
+        with self._lock:
+            self._pending.append((fn, arg))
+            schedule = len(self._pending) == 1
+        loop = self._loop_ref()
+        if schedule and loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:
+                # The loop has been closed, nobody is waiting for the results anymore.
+                pass
+
+    def _drain(self) -> None:
+        self.wakeups += 1
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for fn, arg in pending:
+            fn(arg)
+
+
+def resolve_future(future: asyncio.Future, result: typing.Any) -> None:
+    # The awaiting task may have been cancelled in the meantime.
+    if not future.done():
+        future.set_result(result)
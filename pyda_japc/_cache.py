@@ -0,0 +1,123 @@
+import collections
+import threading
+import time
+import typing
+
+
+class CacheInfo(typing.NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded least-recently-used cache.
+
+    Unlike :func:`functools.lru_cache`, the cache is keyed explicitly, so it
+    can be used for values which are computed from keys that are cheaper to
+    build than the function arguments themselves (e.g. a schema signature
+    instead of a whole ``MapParameterValue``).
+
+    Hit and miss counters are exposed via :meth:`cache_info`, mirroring
+    :func:`functools.lru_cache`.
+
+    If ``ttl`` is given, entries expire that many seconds after they were
+    stored, and are treated as misses from then on.
+
+    """
+    def __init__(self, maxsize: int = 128, ttl: typing.Optional[float] = None):
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be non-negative, got {maxsize}")
+        self._maxsize = maxsize
+        self.ttl = ttl
+        self._data: "collections.OrderedDict[typing.Hashable, typing.Any]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int):
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be non-negative, got {maxsize}")
+        with self._lock:
+            self._maxsize = maxsize
+            self._trim()
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is not None and expires_at <= time.monotonic():
+                    del self._data[key]
+                    entry = _MISSING
+            if entry is _MISSING:
+                self._misses += 1
+                return default
+            self._hits += 1
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: typing.Hashable, value: typing.Any) -> None:
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            self._trim()
+
+    def get_or_create(
+            self,
+            key: typing.Hashable,
+            factory: typing.Callable[[], typing.Any],
+    ) -> typing.Any:
+        """
+        Return the value for ``key``, calling ``factory`` to build (and store) it on a miss.
+
+        The factory is called without holding the lock, so two threads missing
+        on the same key concurrently may both build the value. The last one
+        to finish wins, which is harmless for the (pure) values cached here.
+
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key: typing.Hashable) -> bool:
+        """Remove ``key`` from the cache, returning whether it was present."""
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._data))
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._hits = self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return False
+        expires_at = entry[1]
+        return expires_at is None or expires_at > time.monotonic()
+
+    def _trim(self) -> None:
+        # NOTE: Must be called with the lock held.
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
@@ -0,0 +1,233 @@
+import collections
+import logging
+import threading
+import time
+import typing
+
+import numpy as np
+
+
+if typing.TYPE_CHECKING:
+    from pyda.data import PropertyRetrievalResponse
+
+
+_LOG = logging.getLogger(__name__)
+
+
+class CorrelatedEvent(typing.NamedTuple):
+    """The updates of the parameters of a :class:`CycleCorrelator` for one cycle."""
+    #: The cycle stamp (ns since the epoch) shared by all the updates.
+    cycle_stamp: int
+    #: The updates received for the cycle, by parameter, in the order the parameters were given.
+    responses: typing.Dict[str, "PropertyRetrievalResponse"]
+    #: The parameters which did not deliver an update for the cycle in time.
+    missing: typing.Tuple[str, ...]
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+    def stack(self, field: str) -> np.ndarray:
+        """
+        The values of ``field`` of all the updates, stacked along a new first
+        axis (one row per parameter in :attr:`responses`), e.g. scalars give
+        a 1D array and 1D arrays a 2D array.
+
+        A ``ValueError`` is raised if the values don't all have the same shape.
+        """
+        values = [np.asarray(response.value[field]) for response in self.responses.values()]
+        if not values:
+            raise ValueError(f"No updates to stack {field} from")
+        shape = values[0].shape
+        for parameter, value in zip(self.responses, values):
+            if value.shape != shape:
+                raise ValueError(f"Field {field} of {parameter} has shape {value.shape}, others have {shape}")
+        return np.stack(values)
+
+    def stacked(self) -> typing.Dict[str, np.ndarray]:
+        """All the fields which can be stacked (see :meth:`stack`), i.e. which all updates have with the same shape."""
+        if not self.responses:
+            return {}
+        values = [response.value for response in self.responses.values()]
+        result = {}
+        for field in values[0].keys():
+            try:
+                result[field] = self.stack(field)
+            except (KeyError, ValueError):
+                pass
+        return result
+
+
+class CorrelationStats(typing.NamedTuple):
+    #: The events emitted with an update from every parameter.
+    complete: int
+    #: The events emitted with some parameters missing.
+    incomplete: int
+    #: The updates dropped as their cycle had already been emitted.
+    late: int
+    #: The updates dropped as they had no cycle stamp (including errors).
+    uncorrelated: int
+
+
+class _PendingCycle:
+    __slots__ = ('deadline', 'responses')
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.responses: typing.Dict[str, "PropertyRetrievalResponse"] = {}
+
+
+class CycleCorrelator:
+    """
+    Assemble the updates of many parameters into one event per cycle, using their cycle stamps.
+
+    Updates are passed to :meth:`add` along with the name of their parameter,
+    and buffered by cycle stamp. Once every parameter has delivered an update
+    for a cycle, the event is passed to ``sink``. If some are still missing
+    ``timeout`` seconds after the first update of the cycle was received, the
+    event is passed on without them (see :attr:`CorrelatedEvent.missing`).
+    At most ``max_pending`` cycles are buffered, the oldest one is passed on
+    as is if more are started.
+
+    Timed out cycles are passed on by a background thread, running between
+    :meth:`start` and :meth:`stop`. The sink is called from that thread, or
+    from the thread calling :meth:`add` which completes a cycle.
+
+    """
+    def __init__(
+            self,
+            parameters: typing.Sequence[str],
+            sink: typing.Callable[[CorrelatedEvent], None],
+            *,
+            timeout: float = 1.,
+            max_pending: int = 16,
+    ):
+        self.parameters = tuple(parameters)
+        if len(set(self.parameters)) != len(self.parameters):
+            raise ValueError("Each parameter can only be correlated once")
+        if max_pending < 1:
+            raise ValueError(f"max_pending must be positive, got {max_pending}")
+        self.timeout = timeout
+        self._sink = sink
+        self._max_pending = max_pending
+        #: The cycles being assembled, oldest first.
+        self._pending: typing.Dict[int, _PendingCycle] = {}
+        #: The cycle stamps emitted most recently, to recognise late updates.
+        self._emitted: "collections.OrderedDict[int, None]" = collections.OrderedDict()
+        self._condition = threading.Condition()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._running = False
+        self._complete = 0
+        self._incomplete = 0
+        self._late = 0
+        self._uncorrelated = 0
+
+    def start(self) -> None:
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='pyda_japc.correlator', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread, and pass on the cycles still being assembled."""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._running = False
+            self._condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        with self._condition:
+            events = [self._pop(cycle_stamp) for cycle_stamp in list(self._pending)]
+        self._emit(events)
+
+    def add(self, parameter: str, response: "PropertyRetrievalResponse") -> None:
+        """Add an update of ``parameter``, passing on the event of its cycle if it is now complete."""
+        cycle_stamp = None
+        if response.exception is None:
+            cycle_stamp = response.value.header.cycle_timestamp
+        events = []
+        with self._condition:
+            if not cycle_stamp:
+                self._uncorrelated += 1
+                return
+            if cycle_stamp in self._emitted:
+                self._late += 1
+                return
+            pending = self._pending.get(cycle_stamp)
+            if pending is None:
+                pending = self._pending[cycle_stamp] = _PendingCycle(time.monotonic() + self.timeout)
+                if len(self._pending) > self._max_pending:
+                    events.append(self._pop(next(iter(self._pending))))
+                # There is a new deadline to wait for.
+                self._condition.notify_all()
+            pending.responses[parameter] = response
+            if len(pending.responses) == len(self.parameters):
+                events.append(self._pop(cycle_stamp))
+        self._emit(events)
+
+    def expire(self, now: typing.Optional[float] = None) -> None:
+        """Pass on the cycles which have timed out (by ``now``, in :func:`time.monotonic` seconds)."""
+        if now is None:
+            now = time.monotonic()
+        with self._condition:
+            events = self._pop_expired(now)
+        self._emit(events)
+
+    def pending(self) -> int:
+        """The number of cycles being assembled."""
+        with self._condition:
+            return len(self._pending)
+
+    def stats(self) -> CorrelationStats:
+        with self._condition:
+            return CorrelationStats(self._complete, self._incomplete, self._late, self._uncorrelated)
+
+    def _pop_expired(self, now: float) -> typing.List[CorrelatedEvent]:
+        # NOTE: Must be called with the lock held.
+        expired = []
+        # All cycles have the same timeout, so they expire in the order they were started.
+        for cycle_stamp, pending in self._pending.items():
+            if pending.deadline > now:
+                break
+            expired.append(cycle_stamp)
+        return [self._pop(cycle_stamp) for cycle_stamp in expired]
+
+    def _pop(self, cycle_stamp: int) -> CorrelatedEvent:
+        # NOTE: Must be called with the lock held.
+        received = self._pending.pop(cycle_stamp).responses
+        event = CorrelatedEvent(
+            cycle_stamp,
+            {parameter: received[parameter] for parameter in self.parameters if parameter in received},
+            tuple(parameter for parameter in self.parameters if parameter not in received),
+        )
+        if event.missing:
+            self._incomplete += 1
+        else:
+            self._complete += 1
+        self._emitted[cycle_stamp] = None
+        while len(self._emitted) > 4 * self._max_pending:
+            self._emitted.popitem(last=False)
+        return event
+
+    def _emit(self, events: typing.Iterable[CorrelatedEvent]) -> None:
+        for event in events:
+            try:
+                self._sink(event)
+            except Exception:  # noqa: B902
+                _LOG.exception("Failed to deliver the correlated event of cycle %s", event.cycle_stamp)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                events = self._pop_expired(time.monotonic())
+                if not events:
+                    delay = None
+                    if self._pending:
+                        delay = max(next(iter(self._pending.values())).deadline - time.monotonic(), 0)
+                    self._condition.wait(delay)
+                    continue
+            self._emit(events)
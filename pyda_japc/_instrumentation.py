@@ -0,0 +1,189 @@
+import collections
+import threading
+import time
+import typing
+
+import numpy as np
+
+
+if typing.TYPE_CHECKING:
+    from pyda.data import PropertyAccessQuery
+
+
+#: The stages of a request (or subscription update), in the order they happen:
+#:
+#: * ``japc``: from issuing a get/set until the JAPC callback is entered.
+#:   Subscription updates are timed from the JAPC callback instead.
+#: * ``queue``: from the JAPC callback until a worker of the conversion
+#:   pipeline picks the update up (subscriptions using a pipeline).
+#: * ``header``: converting the ValueHeader (gets and subscriptions).
+#: * ``value``: converting the value, from Java for gets and subscriptions,
+#:   and to Java (before the request is issued) for sets.
+#: * ``delivery``: handing the response over to the consumer.
+#: * ``total``: from the first to the last of the above.
+STAGES = ('japc', 'queue', 'header', 'value', 'delivery', 'total')
+
+
+class HistogramSummary(typing.NamedTuple):
+    """Summary statistics of a :class:`Histogram`, all in nanoseconds."""
+    count: int
+    min: int
+    mean: float
+    p50: int
+    p90: int
+    p99: int
+    p999: int
+    max: int
+
+
+class Histogram:
+    """
+    A histogram of latencies in nanoseconds, with log-linear (HDR-style) buckets.
+
+    Each power of two is split into ``2 ** (sub_bucket_bits - 1)`` buckets,
+    so that percentiles are accurate to within ``2 ** (1 - sub_bucket_bits)``
+    (0.8% by default) over the whole range, from nanoseconds up to
+    ``2 ** max_bits`` ns (about 18 minutes by default) at which larger values
+    are clamped. Recording is a few integer operations and a dict increment.
+    Only the buckets which were hit are stored, as latencies cluster in a
+    small part of the range.
+
+    """
+    def __init__(self, sub_bucket_bits: int = 8, max_bits: int = 40):
+        self._sub_bits = sub_bucket_bits
+        self._max_value = (1 << max_bits) - 1
+        #: The number of values recorded in each bucket, by bucket index.
+        self._counts: typing.Dict[int, int] = collections.defaultdict(int)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self._sub_bits
+        if shift <= 0:
+            return value
+        return (shift << (self._sub_bits - 1)) + (value >> shift)
+
+    def _value(self, index: int) -> int:
+        # The midpoint of the bucket at ``index``.
+        if index < (1 << self._sub_bits):
+            return index
+        shift = (index >> (self._sub_bits - 1)) - 1
+        return ((index - (shift << (self._sub_bits - 1))) << shift) + (1 << shift) // 2
+
+    def record(self, value: int) -> None:
+        value = min(max(value, 0), self._max_value)
+        self._counts[self._index(value)] += 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "Histogram") -> None:
+        """Add the values recorded in ``other`` (which must have the same bucket layout)."""
+        if other._max_value != self._max_value or other._sub_bits != self._sub_bits:
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        if not other.count:
+            return
+        for index, count in other._counts.items():
+            self._counts[index] += count
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, percentile: float) -> int:
+        return self._percentiles([percentile])[0]
+
+    def _percentiles(self, percentiles: typing.Sequence[float]) -> typing.List[int]:
+        if not self.count:
+            return [0] * len(percentiles)
+        indices = sorted(self._counts)
+        cumulative = np.cumsum([self._counts[index] for index in indices])
+        values = []
+        for percentile in percentiles:
+            rank = max(1, int(np.ceil(percentile / 100 * self.count)))
+            index = indices[int(np.searchsorted(cumulative, rank))]
+            values.append(min(max(self._value(index), self.min), self.max))
+        return values
+
+    def summary(self) -> HistogramSummary:
+        mean = self.total / self.count if self.count else 0.
+        return HistogramSummary(self.count, self.min, mean, *self._percentiles([50, 90, 99, 99.9]), self.max)
+
+
+class Trace:
+    """The stage timings of one request or subscription update (see :meth:`Instrumentation.trace`)."""
+    __slots__ = ('_instrumentation', 'parameter', 'start', '_last', 'stages')
+
+    def __init__(self, instrumentation: "Instrumentation", parameter: str):
+        self._instrumentation = instrumentation
+        self.parameter = parameter
+        self.start = self._last = time.perf_counter_ns()
+        self.stages: typing.List[typing.Tuple[str, int]] = []
+
+    def mark(self, stage: str) -> None:
+        """Record that ``stage`` has just finished (it started when the previous one finished)."""
+        now = time.perf_counter_ns()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def finish(self) -> None:
+        """Record that the response has been delivered, and add the trace to the histograms."""
+        if self.stages:
+            self.mark('delivery')
+        else:
+            # Without any stage marked (e.g. for an exception), only the total is meaningful.
+            self._last = time.perf_counter_ns()
+        self.stages.append(('total', self._last - self.start))
+        self._instrumentation._record(self)
+
+
+class Instrumentation:
+    """
+    Per-parameter latency histograms of each of the :data:`STAGES` of gets, sets and subscriptions.
+
+    The provider creates a :class:`Trace` when a request is issued (or an
+    update is received), the stages are marked along the way, and the trace
+    is recorded with :meth:`Trace.finish` once the response has been delivered.
+
+    """
+    def __init__(self):
+        self._histograms: typing.Dict[str, typing.Dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def trace(self, query: "PropertyAccessQuery") -> Trace:
+        return Trace(self, f'{query.device}/{query.prop}')
+
+    def _record(self, trace: Trace) -> None:
+        with self._lock:
+            histograms = self._histograms.get(trace.parameter)
+            if histograms is None:
+                histograms = self._histograms[trace.parameter] = {stage: Histogram() for stage in STAGES}
+            for stage, duration in trace.stages:
+                histograms[stage].record(duration)
+
+    def report(self) -> typing.Dict[str, typing.Dict[str, HistogramSummary]]:
+        """The summary of each stage (that was seen) of each parameter (``"device/property"``)."""
+        with self._lock:
+            return {
+                parameter: {stage: hist.summary() for stage, hist in histograms.items() if hist.count}
+                for parameter, histograms in self._histograms.items()
+            }
+
+    def totals(self) -> typing.Dict[str, HistogramSummary]:
+        """The summary of each stage (that was seen), over all parameters."""
+        with self._lock:
+            merged: typing.Dict[str, Histogram] = {}
+            for histograms in self._histograms.values():
+                for stage, hist in histograms.items():
+                    if hist.count:
+                        merged.setdefault(stage, Histogram()).merge(hist)
+            return {stage: hist.summary() for stage, hist in merged.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
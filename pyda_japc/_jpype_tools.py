@@ -1,4 +1,8 @@
+import collections
 import functools
+import threading
+import typing
+
 import cmmnbuild_dep_manager
 
 import jpype as jp
@@ -29,8 +33,206 @@ def jscalar_to_scalar(scalar_value: jp.JObject) -> np.ndarray:
     return dtype(scalar_value)
 
 
+@functools.lru_cache()
+def _primitive_array_to_dtype_lookup():
+    # NOTE: Assumes that the JVM has started.
+    ARRAY_DTYPE = {
+        jp.JArray(jp.JByte): np.int8,
+        jp.JArray(jp.JShort): np.int16,
+        jp.JArray(jp.JInt): np.int32,
+        jp.JArray(jp.JLong): np.int64,
+        jp.JArray(jp.JFloat): np.float32,
+        jp.JArray(jp.JDouble): np.float64,
+        jp.JArray(jp.JBoolean): np.bool_,
+    }
+    return ARRAY_DTYPE
+
+
+def jarray_to_ndarray(
+        array_value: jp.JArray,
+        *,
+        borrow: bool = False,
+        dtype: typing.Optional[typing.Type[np.generic]] = None,
+) -> np.ndarray:
+    """
+    Convert a one dimensional Java array into a numpy array.
+
+    Arrays of primitive component types are read through the buffer protocol
+    in a single bulk operation, rather than element by element. By default
+    the result owns its memory (one copy is made). With ``borrow=True`` no
+    copy is made on the Python side and a read-only view onto the buffer
+    exported by JPype is returned instead. This buffer stays pinned for as
+    long as the view (or anything derived from it) is alive, so borrowed
+    arrays must not be held on to beyond the processing of the value.
+
+    Arrays of non-primitive component types (e.g. ``String[]``) are
+    converted element-wise.
+
+    If the ``dtype`` matching the (primitive) array type is already known,
+    it may be passed to skip looking it up.
+
+    """
+    if dtype is None:
+        dtype = _primitive_array_to_dtype_lookup().get(type(array_value))
+    if dtype is None:
+        return np.array(array_value)
+    result = np.frombuffer(memoryview(array_value), dtype=dtype)
+    if not borrow:
+        result = result.copy()
+    return result
+
+
+@functools.lru_cache()
+def _primitive_type_to_dtype_lookup():
+    # NOTE: Assumes that the JVM has started.
+    PRIMITIVE_DTYPE = {
+        jp.JByte: np.int8,
+        jp.JShort: np.int16,
+        jp.JInt: np.int32,
+        jp.JLong: np.int64,
+        jp.JFloat: np.float32,
+        jp.JDouble: np.float64,
+        jp.JBoolean: np.bool_,
+    }
+    return PRIMITIVE_DTYPE
+
+
+def ndarray_to_jarray(
+        value: np.ndarray,
+        jp_type: typing.Type,
+        *,
+        array_pool: typing.Optional["JavaArrayPool"] = None,
+) -> jp.JArray:
+    """
+    Convert a numpy array of any rank into a one dimensional Java array of ``jp_type``.
+
+    Multi-dimensional input is flattened in row-major (C) order, which is
+    the layout expected by JAPC for 2D arrays, independently of the memory
+    layout of the input. C-contiguous input of the right dtype is not copied
+    on the Python side, it is bulk copied directly into the Java array.
+
+    If an ``array_pool`` is given, the Java array is taken from it rather
+    than freshly allocated.
+
+    """
+    dtype = _primitive_type_to_dtype_lookup().get(jp_type)
+    if dtype is None:
+        # Non-primitive component types (e.g. String) are converted element-wise.
+        return jp.JArray(jp_type, 1)(value.ravel())
+    flat = np.asarray(value).astype(dtype, order='C', copy=False).ravel()
+    if array_pool is None:
+        jarr = jp.JArray(jp_type, 1)(flat.size)
+    else:
+        jarr = array_pool.acquire(jp_type, flat.size)
+    jarr[:] = flat
+    return jarr
+
+
+def _scalar_jtype(value: typing.Any) -> typing.Type:
+    if isinstance(value, (bool, np.bool_)):
+        return jp.JBoolean
+    if isinstance(value, np.generic):
+        for jp_type, dtype in _primitive_type_to_dtype_lookup().items():
+            if value.dtype == dtype:
+                return jp_type
+    elif isinstance(value, int):
+        # Python ints are unbounded, use the narrowest of the usual JAPC integer types.
+        return jp.JInt if -2 ** 31 <= value < 2 ** 31 else jp.JLong
+    elif isinstance(value, float):
+        return jp.JDouble
+    if isinstance(value, (str, np.str_)):
+        return jp.JString
+    raise TypeError(f"Cannot convert Python type {type(value)} to a Java type")
+
+
+def to_java_value(value: typing.Any) -> typing.Union[jp.JObject, jp.JArray]:
+    """
+    Convert a Python scalar, sequence or numpy array into an explicitly typed Java value.
+
+    The Java type is inferred from the numpy dtype where there is one. Python
+    ``bool``, ``float`` and ``str`` map to ``boolean``, ``double`` and
+    ``String``, and Python ``int`` maps to ``int`` (or ``long`` if it does not
+    fit in 32 bits). Lists and tuples of Python ``int`` likewise map to
+    ``int[]``, unless one of the values needs ``long[]``.
+
+    """
+    if isinstance(value, (list, tuple)):
+        array = np.asarray(value)
+        if array.dtype == np.int64 and all(isinstance(item, int) for item in np.asarray(value, dtype=object).flat):
+            # As for scalars, only use long if some of the Python ints don't fit in 32 bits.
+            if array.min() >= -2 ** 31 and array.max() < 2 ** 31:
+                array = array.astype(np.int32)
+        value = array
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'U':
+            return ndarray_to_jarray(value, jp.JString)
+        return ndarray_to_jarray(value, _scalar_jtype(value.dtype.type(0)))
+    return _scalar_jtype(value)(value)
+
+
+class JavaArrayPool:
+    """
+    A thread-safe pool of primitive Java arrays, keyed by component type and length.
+
+    Arrays acquired from the pool are owned by the caller until they are
+    released back. They must only be released once nothing (in particular
+    no in-flight JAPC call) refers to them anymore.
+
+    """
+    def __init__(self, max_per_key: int = 4):
+        self._max_per_key = max_per_key
+        self._free: typing.Dict[typing.Tuple[typing.Type, int], typing.List[jp.JArray]] = \
+            collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def acquire(self, jp_type: typing.Type, length: int) -> jp.JArray:
+        array_type = jp.JArray(jp_type, 1)
+        with self._lock:
+            free = self._free.get((array_type, length))
+            if free:
+                return free.pop()
+        return array_type(length)
+
+    def release(self, array: jp.JArray) -> None:
+        with self._lock:
+            free = self._free[(type(array), len(array))]
+            if len(free) < self._max_per_key:
+                free.append(array)
+
+    def lease(self) -> "JavaArrayLease":
+        return JavaArrayLease(self)
+
+
+class JavaArrayLease:
+    """
+    Track the arrays acquired from a :class:`JavaArrayPool` for a single operation.
+
+    All of them are given back to the pool with a single call to
+    :meth:`release` once the operation has completed.
+
+    """
+    def __init__(self, pool: JavaArrayPool):
+        self._pool = pool
+        self._arrays: typing.List[jp.JArray] = []
+
+    def acquire(self, jp_type: typing.Type, length: int) -> jp.JArray:
+        array = self._pool.acquire(jp_type, length)
+        self._arrays.append(array)
+        return array
+
+    def release(self) -> None:
+        arrays, self._arrays = self._arrays, []
+        for array in arrays:
+            self._pool.release(array)
+
+
+_JVM_LOCK = threading.Lock()
+
+
 @functools.lru_cache()
 def cern_pkg() -> "cern":
-    mgr = cmmnbuild_dep_manager.Manager()
-    mgr.jvm_required()
-    return jp.JPackage('cern')
+    # Serialised, as the JVM may be started from a background thread (see :func:`pyda_japc.warmup_in_background`).
+    with _JVM_LOCK:
+        mgr = cmmnbuild_dep_manager.Manager()
+        mgr.jvm_required()
+        return jp.JPackage('cern')
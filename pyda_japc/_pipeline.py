@@ -0,0 +1,223 @@
+import collections
+import concurrent.futures
+import enum
+import logging
+import threading
+import typing
+import weakref
+
+
+_LOG = logging.getLogger(__name__)
+
+
+class BackpressurePolicy(enum.Enum):
+    """What to do with a new item when a channel's queue is full."""
+
+    #: Block the producer (i.e. the JAPC callback thread) until there is room.
+    BLOCK = 'block'
+    #: Discard the oldest queued item to make room for the new one.
+    DROP_OLDEST = 'drop-oldest'
+    #: Discard the new item.
+    DROP_NEWEST = 'drop-newest'
+
+
+class ChannelStats(typing.NamedTuple):
+    name: str
+    policy: BackpressurePolicy
+    queue_size: int
+    #: Number of items accepted into the queue.
+    enqueued: int
+    #: Number of items processed (successfully or not).
+    processed: int
+    #: Number of items discarded because the queue was full.
+    dropped: int
+    #: Number of items whose processing raised an exception.
+    errors: int
+    #: Current number of queued items.
+    depth: int
+    #: Largest number of queued items seen so far.
+    max_depth: int
+
+
+class Channel:
+    """
+    A bounded queue of items processed, in order, by a :class:`ConversionPipeline`'s workers.
+
+    At most one worker processes the items of a channel at any time, so
+    items are processed in the order they were put.
+
+    """
+    #: Number of items a worker processes before yielding to other channels.
+    BATCH_SIZE = 32
+
+    def __init__(
+            self,
+            executor: concurrent.futures.Executor,
+            name: str,
+            process: typing.Callable[[typing.Any], None],
+            queue_size: int,
+            policy: BackpressurePolicy,
+    ):
+        if queue_size < 1:
+            raise ValueError(f"queue_size must be at least 1, got {queue_size}")
+        self.name = name
+        self.policy = policy
+        self.queue_size = queue_size
+        self._executor = executor
+        self._process = process
+        self._items: typing.Deque[typing.Any] = collections.deque()
+        self._cond = threading.Condition()
+        self._scheduled = False
+        self._closed = False
+        self._enqueued = self._processed = self._dropped = self._errors = self._max_depth = 0
+
+    def put(self, item: typing.Any) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._items) >= self.queue_size:
+                if self.policy is BackpressurePolicy.DROP_NEWEST:
+                    self._dropped += 1
+                    return
+                elif self.policy is BackpressurePolicy.DROP_OLDEST:
+                    self._items.popleft()
+                    self._dropped += 1
+                else:
+                    while len(self._items) >= self.queue_size and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return
+            self._items.append(item)
+            self._enqueued += 1
+            self._max_depth = max(self._max_depth, len(self._items))
+            schedule = not self._scheduled
+            self._scheduled = True
+        if schedule:
+            self._executor.submit(self._drain)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        """Discard all queued items, and stop accepting new ones."""
+        with self._cond:
+            self._closed = True
+            self._items.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> ChannelStats:
+        with self._cond:
+            return ChannelStats(
+                name=self.name,
+                policy=self.policy,
+                queue_size=self.queue_size,
+                enqueued=self._enqueued,
+                processed=self._processed,
+                dropped=self._dropped,
+                errors=self._errors,
+                depth=len(self._items),
+                max_depth=self._max_depth,
+            )
+
+    def _drain(self) -> None:
+        for _ in range(self.BATCH_SIZE):
+            with self._cond:
+                if not self._items:
+                    self._scheduled = False
+                    return
+                item = self._items.popleft()
+                self._cond.notify()
+            try:
+                self._process(item)
+            except Exception:  # noqa: B902
+                _LOG.exception("Failed to process an update of %s", self.name)
+                with self._cond:
+                    self._errors += 1
+            with self._cond:
+                self._processed += 1
+        # Give other channels a chance to be processed before continuing.
+        try:
+            self._executor.submit(self._drain)
+        except RuntimeError:
+            # The pipeline has been shut down.
+            with self._cond:
+                self._scheduled = False
+
+
+class ConversionPipeline:
+    """
+    A pool of worker threads which converts and delivers subscription updates.
+
+    When a :class:`pyda_japc.JapcProvider` is given a pipeline, the JAPC
+    callback of each of its subscriptions only puts the raw Java value into
+    the subscription's bounded :class:`Channel`. Conversion to Python and
+    delivery to the consumer then happen on the pipeline's workers, so that
+    a slow consumer or a large value does not hold up the JAPC callback
+    threads (and therefore the delivery of updates for other subscriptions).
+
+    :param workers: The number of worker threads.
+    :param queue_size: The default maximum number of queued updates per subscription.
+    :param policy: The default :class:`BackpressurePolicy` applied when a subscription's queue is full.
+
+    """
+    def __init__(
+            self,
+            workers: int = 4,
+            *,
+            queue_size: int = 64,
+            policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+    ):
+        self.queue_size = queue_size
+        self.policy = policy
+        self._executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='pyda-japc-pipeline')
+        self._channels: "weakref.WeakSet[Channel]" = weakref.WeakSet()
+        self._overrides: typing.Dict[str, typing.Tuple[typing.Optional[BackpressurePolicy], typing.Optional[int]]] = {}
+        self._lock = threading.Lock()
+
+    def configure(
+            self,
+            parameter_name: str,
+            *,
+            policy: typing.Optional[BackpressurePolicy] = None,
+            queue_size: typing.Optional[int] = None,
+    ) -> None:
+        """
+        Override the backpressure policy and/or queue size of the subscriptions
+        to the given ``"device/property"`` created from now on.
+        """
+        with self._lock:
+            self._overrides[parameter_name] = (policy, queue_size)
+
+    def channel(
+            self,
+            parameter_name: str,
+            name: str,
+            process: typing.Callable[[typing.Any], None],
+    ) -> Channel:
+        with self._lock:
+            policy, queue_size = self._overrides.get(parameter_name, (None, None))
+            channel = Channel(
+                self._executor,
+                name,
+                process,
+                queue_size=self.queue_size if queue_size is None else queue_size,
+                policy=self.policy if policy is None else policy,
+            )
+            self._channels.add(channel)
+        return channel
+
+    def stats(self) -> typing.List[ChannelStats]:
+        """The statistics of all the live (i.e. not closed) channels of this pipeline."""
+        with self._lock:
+            for channel in [channel for channel in self._channels if channel.closed]:
+                self._channels.discard(channel)
+            channels = list(self._channels)
+        return [channel.stats() for channel in channels]
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            channels = list(self._channels)
+        for channel in channels:
+            channel.close()
+        self._executor.shutdown(wait=wait)
@@ -1,7 +1,14 @@
+import asyncio
 import functools
+import logging
+import threading
+import time
 import typing
+import warnings
+import weakref
 import jpype as jp
 import concurrent.futures
+import numpy as np
 import pyda.providers
 import pyda.data
 import pyrbac
@@ -9,6 +16,12 @@ import pyrbac
 #  now does not offer complete public API
 import pyda.providers._core
 
+from . import _aio
+from . import _cache
+from . import _correlation
+from . import _instrumentation
+from . import _pipeline
+from . import _recorder
 from . import _transformations
 from . import _jpype_tools
 
@@ -18,26 +31,543 @@ if typing.TYPE_CHECKING:
     cern = jp.JPackage('cern')
 
 
-class JapcPropertyStream(pyda.providers._core.BasePropertyStream):
+_LOG = logging.getLogger(__name__)
 
-    def __init__(self, query: "PropertyAccessQuery"):
-        super().__init__()
+
+class SharedSubscription:
+    """
+    A single JAPC subscription, whose updates are converted once and fanned out to all attached sinks.
+
+    Sinks are callables receiving each :class:`pyda.data.PropertyRetrievalResponse`.
+    The same (immutable) response object is given to every sink, so its
+    arrays are read-only: a sink must copy them to modify them. A sink
+    attached to an already running subscription is immediately given the
+    latest response, as it would have received a first update had it made
+    its own subscription. The latest response can also serve gets (see
+    :meth:`latest`).
+
+    Use a :class:`SubscriptionRegistry` to attach and detach sinks.
+
+    """
+    def __init__(
+            self,
+            key: typing.Optional[typing.Hashable],
+            query: "PropertyAccessQuery",
+            pipeline: typing.Optional[_pipeline.ConversionPipeline] = None,
+            conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+    ):
+        self.key = key
+        self.query = query
+        # The response is shared by all the sinks, none of which may modify it for the others.
+        self._conversion = conversion._replace(readonly=True)
+        self._sinks: typing.Tuple[typing.Callable[["PropertyRetrievalResponse"], None], ...] = ()
+        #: The last response delivered, and when (in :func:`time.monotonic` seconds).
+        self._last_update: typing.Optional[typing.Tuple["PropertyRetrievalResponse", float]] = None
+        self._monitoring = False
+        self._lock = threading.RLock()
+        #: Timing of the conversion and delivery of updates, if enabled.
+        self.instrumentation: typing.Optional[_instrumentation.Instrumentation] = None
 
         param_j = create_param(query)
         selector_j = create_selector(query)
-        listener_j = create_value_listener(query, self._response_received)
+        self._channel: typing.Optional[_pipeline.Channel] = None
+        if pipeline is not None:
+            # Only enqueue the Java values from the JAPC thread, conversion happens on the pipeline's workers.
+            self._channel = pipeline.channel(f'{query.device}/{query.prop}', query_name(query), self._on_queued_update)
+        self._sh_j = param_j.createSubscription(selector_j, create_raw_listener(self._on_japc_update))
+
+    @property
+    def sink_count(self) -> int:
+        return len(self._sinks)
+
+    def add_sink(self, sink: typing.Callable[["PropertyRetrievalResponse"], None]) -> bool:
+        """Add a sink, returning whether it is the first one."""
+        with self._lock:
+            self._sinks += (sink, )
+            return len(self._sinks) == 1
+
+    def remove_sink(self, sink: typing.Callable[["PropertyRetrievalResponse"], None]) -> bool:
+        """Remove a sink, returning whether there are none left."""
+        with self._lock:
+            sinks = list(self._sinks)
+            sinks.remove(sink)
+            self._sinks = tuple(sinks)
+            return not self._sinks
+
+    def start(self) -> None:
+        with self._lock:
+            if self._sinks and not self._monitoring:
+                self._monitoring = True
+                self._sh_j.startMonitoring()
+
+    def stop(self) -> None:
+        with self._lock:
+            if not self._sinks and self._monitoring:
+                self._monitoring = False
+                self._last_update = None
+                self._sh_j.stopMonitoring()
+                if self._channel is not None:
+                    # Drop the updates still queued, nobody is left to deliver them to.
+                    self._channel.close()
+
+    def replay(self, sink: typing.Callable[["PropertyRetrievalResponse"], None]) -> None:
+        with self._lock:
+            if self._last_update is not None:
+                sink(self._last_update[0])
+
+    def latest(self, max_age: float) -> typing.Optional["PropertyRetrievalResponse"]:
+        """The last value delivered, if it was received less than ``max_age`` seconds ago (and isn't an error)."""
+        # Not under the lock, so as not to wait for the delivery of an update to slow sinks.
+        last_update = self._last_update
+        if last_update is None:
+            return None
+        response, received = last_update
+        if response.exception is not None or time.monotonic() - received > max_age:
+            return None
+        return response
+
+    def _on_japc_update(self, raw_update: "RawUpdate") -> None:
+        # The timing starts as soon as the JAPC callback is entered, so that it includes any wait in the pipeline.
+        instrumentation = self.instrumentation
+        trace = None if instrumentation is None else instrumentation.trace(self.query)
+        if self._channel is None:
+            self._on_raw_update(raw_update, trace)
+        else:
+            self._channel.put((raw_update, trace))
+
+    def _on_queued_update(self, item: typing.Tuple["RawUpdate", typing.Optional[_instrumentation.Trace]]) -> None:
+        raw_update, trace = item
+        if trace is not None:
+            trace.mark('queue')
+        self._on_raw_update(raw_update, trace)
+
+    def _on_raw_update(self, raw_update: "RawUpdate", trace: typing.Optional[_instrumentation.Trace]) -> None:
+        if trace is None:
+            self._deliver(raw_update.to_retrieval_response(self.query, self._conversion))
+        else:
+            self._deliver(raw_update.to_retrieval_response(self.query, self._conversion, trace))
+            trace.finish()
+
+    def _deliver(self, response: "PropertyRetrievalResponse") -> None:
+        # Deliver under the lock, so that a sink being attached concurrently
+        # gets its replay and the new responses in order.
+        with self._lock:
+            self._last_update = (response, time.monotonic())
+            for sink in self._sinks:
+                try:
+                    sink(response)
+                except Exception:  # noqa: B902
+                    # Don't let one failing consumer prevent delivery to the others.
+                    _LOG.exception("Failed to deliver an update of %s", query_name(self.query))
 
-        self._sh_j = param_j.createSubscription(selector_j, listener_j)
-        self._sh_j.startMonitoring()
+
+def subscription_key(query: "PropertyAccessQuery") -> typing.Optional[typing.Hashable]:
+    """The key identifying identical subscriptions (and gets), or None if the query cannot be keyed."""
+    try:
+        return (query.device, query.prop, str(query.selector) if query.selector else '',
+                _data_filter_key(query.data_filters))
+    except TypeError:
+        return None
+
+
+class SubscriptionRegistry:
+    """
+    Reference-counted registry of the active JAPC subscriptions of a provider.
+
+    Streams of identical queries (same device, property, selector and data
+    filter) converted the same way attach to the same :class:`SharedSubscription`. The JAPC
+    subscription is started when the first sink attaches, and stopped (and
+    forgotten) when the last one detaches.
+
+    """
+    def __init__(self, pipeline: typing.Optional[_pipeline.ConversionPipeline] = None):
+        self._pipeline = pipeline
+        self._subscriptions: typing.Dict[typing.Hashable, SharedSubscription] = {}
+        self._lock = threading.Lock()
+        self._instrumentation: typing.Optional[_instrumentation.Instrumentation] = None
+
+    @property
+    def instrumentation(self) -> typing.Optional[_instrumentation.Instrumentation]:
+        return self._instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, instrumentation: typing.Optional[_instrumentation.Instrumentation]) -> None:
+        with self._lock:
+            self._instrumentation = instrumentation
+            for subscription in self._subscriptions.values():
+                subscription.instrumentation = instrumentation
+
+    def attach(
+            self,
+            query: "PropertyAccessQuery",
+            sink: typing.Callable[["PropertyRetrievalResponse"], None],
+            conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+            *,
+            replay: bool = True,
+    ) -> SharedSubscription:
+        # Unless ``replay`` is false, a sink joining an active subscription is first given its last response.
+        key = subscription_key(query)
+        if key is not None:
+            # Streams converting differently (e.g. a different field projection) can't share the conversion.
+            key = (key, conversion)
+        with self._lock:
+            subscription = None if key is None else self._subscriptions.get(key)
+            if subscription is None:
+                subscription = SharedSubscription(key, query, self._pipeline, conversion)
+                subscription.instrumentation = self._instrumentation
+                if key is not None:
+                    self._subscriptions[key] = subscription
+            first = subscription.add_sink(sink)
+        if first:
+            subscription.start()
+        elif replay:
+            subscription.replay(sink)
+        return subscription
+
+    def detach(
+            self,
+            subscription: SharedSubscription,
+            sink: typing.Callable[["PropertyRetrievalResponse"], None],
+    ) -> None:
+        with self._lock:
+            empty = subscription.remove_sink(sink)
+            if empty and self._subscriptions.get(subscription.key) is subscription:
+                del self._subscriptions[subscription.key]
+        if empty:
+            subscription.stop()
+
+    def latest(
+            self,
+            query: "PropertyAccessQuery",
+            conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+            *,
+            max_age: float,
+    ) -> typing.Optional["PropertyRetrievalResponse"]:
+        """
+        The last value of the active subscription identical to ``query`` (and
+        converted the same way), if received less than ``max_age`` seconds ago.
+        """
+        key = subscription_key(query)
+        if key is None:
+            return None
+        with self._lock:
+            subscription = self._subscriptions.get((key, conversion))
+        return None if subscription is None else subscription.latest(max_age)
+
+    def active(self) -> typing.Dict[str, int]:
+        """The number of attached sinks for each shared subscription."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        return {query_name(sub.query): sub.sink_count for sub in subscriptions}
+
+
+class JapcPropertyStream(pyda.providers._core.BasePropertyStream):
+
+    def __init__(
+            self,
+            query: "PropertyAccessQuery",
+            registry: typing.Optional[SubscriptionRegistry] = None,
+            conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+    ):
+        super().__init__()
+        self._query = query
+        self._registry = SubscriptionRegistry() if registry is None else registry
+        self._conversion = conversion
+        self._subscription: typing.Optional[SharedSubscription] = None
+        self._recorders: typing.Tuple[_recorder.Recorder, ...] = ()
+        self._attach()
+
+    def add_recorder(self, recorder: _recorder.Recorder) -> _recorder.Recorder:
+        """Record the updates of this stream (from now on) into ``recorder``, returning it."""
+        self._recorders += (recorder, )
+        return recorder
+
+    def remove_recorder(self, recorder: _recorder.Recorder) -> None:
+        recorders = list(self._recorders)
+        recorders.remove(recorder)
+        self._recorders = tuple(recorders)
+
+    def _response_received(self, response):
+        for recorder in self._recorders:
+            try:
+                recorder.record(response)
+            except Exception:  # noqa: B902
+                _LOG.exception("Failed to record an update of %s", query_name(self._query))
+        super()._response_received(response)
 
     def start(self, stream_handler):
         super().start(stream_handler)
-        self._sh_j.startMonitoring()
+        self._attach()
 
     def stop(self, stream_handler):
-        self._sh_j.stopMonitoring()
+        self._detach()
         super().stop(stream_handler)
 
+    def _attach(self):
+        if self._subscription is None:
+            self._subscription = self._registry.attach(self._query, self._response_received, self._conversion)
+
+    def _detach(self):
+        subscription, self._subscription = self._subscription, None
+        if subscription is not None:
+            self._registry.detach(subscription, self._response_received)
+
+
+class AsyncPropertyStream:
+    """
+    A subscription whose responses are consumed with ``async for``.
+
+    Responses are handed over to the event loop directly from the JAPC
+    listener (see :class:`_aio.LoopBridge`). Monitoring starts when entering
+    the ``async with`` block (or calling :meth:`start`), and stops when
+    leaving it (or calling :meth:`stop`), at which point iteration ends.
+
+    """
+    _STOP = object()
+
+    def __init__(
+            self,
+            query: "PropertyAccessQuery",
+            bridge: _aio.LoopBridge,
+            registry: SubscriptionRegistry,
+            conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+    ):
+        self.query = query
+        self._conversion = conversion
+        self._queue: "asyncio.Queue[typing.Any]" = asyncio.Queue()
+        self._registry = registry
+        self._sink = functools.partial(bridge.call, self._queue.put_nowait)
+        self._subscription: typing.Optional[SharedSubscription] = None
+
+    def start(self) -> None:
+        if self._subscription is None:
+            self._subscription = self._registry.attach(self.query, self._sink, self._conversion)
+
+    def stop(self) -> None:
+        subscription, self._subscription = self._subscription, None
+        if subscription is not None:
+            self._registry.detach(subscription, self._sink)
+        self._queue.put_nowait(self._STOP)
+
+    async def __aenter__(self) -> "AsyncPropertyStream":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.stop()
+
+    def __aiter__(self) -> "AsyncPropertyStream":
+        return self
+
+    async def __anext__(self) -> "PropertyRetrievalResponse":
+        response = await self._queue.get()
+        if response is self._STOP:
+            raise StopAsyncIteration
+        return response
+
+
+class SinkSubscription:
+    """
+    A subscription passing each update to a sink (see :meth:`JapcProvider.subscribe_sink`
+    and :meth:`JapcProvider.subscribe_raw`).
+
+    Monitoring starts when entering the ``with`` block (or calling
+    :meth:`start`), and stops when leaving it (or calling :meth:`stop`).
+    """
+    def __init__(
+            self,
+            query: "PropertyAccessQuery",
+            conversion: _transformations.ConversionOptions,
+            registry: SubscriptionRegistry,
+            sink: typing.Callable[[typing.Any], None],
+    ):
+        self.query = query
+        self._conversion = conversion
+        self._registry = registry
+        self._sink = sink
+        self._subscription: typing.Optional[SharedSubscription] = None
+
+    def start(self) -> None:
+        if self._subscription is None:
+            self._subscription = self._registry.attach(self.query, self._sink, self._conversion)
+
+    def stop(self) -> None:
+        subscription, self._subscription = self._subscription, None
+        if subscription is not None:
+            self._registry.detach(subscription, self._sink)
+
+    def __enter__(self) -> "SinkSubscription":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class CorrelatedSubscription:
+    """
+    Subscriptions to many parameters sharing a selector, whose updates are
+    assembled into one :class:`_correlation.CorrelatedEvent` per cycle (see
+    :meth:`JapcProvider.subscribe_correlated`).
+
+    Monitoring starts when entering the ``with`` block (or calling
+    :meth:`start`), and stops when leaving it (or calling :meth:`stop`), at
+    which point the cycles still being assembled are passed on as they are.
+
+    """
+    def __init__(
+            self,
+            queries: typing.Sequence["PropertyAccessQuery"],
+            conversions: typing.Sequence[_transformations.ConversionOptions],
+            registry: SubscriptionRegistry,
+            sink: typing.Callable[[_correlation.CorrelatedEvent], None],
+            *,
+            timeout: float = 1.,
+            max_pending: int = 16,
+    ):
+        self.queries = tuple(queries)
+        self._conversions = tuple(conversions)
+        self._registry = registry
+        self.correlator = _correlation.CycleCorrelator(
+            [f'{query.device}/{query.prop}' for query in self.queries], sink, timeout=timeout, max_pending=max_pending,
+        )
+        self._sinks = [functools.partial(self.correlator.add, parameter) for parameter in self.correlator.parameters]
+        self._subscriptions: typing.List[SharedSubscription] = []
+
+    def start(self) -> None:
+        if self._subscriptions:
+            return
+        self.correlator.start()
+        for query, conversion, sink in zip(self.queries, self._conversions, self._sinks):
+            # A replayed response would open a cycle which the other parameters have already delivered.
+            self._subscriptions.append(self._registry.attach(query, sink, conversion, replay=False))
+
+    def stop(self) -> None:
+        subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription, sink in zip(subscriptions, self._sinks):
+            self._registry.detach(subscription, sink)
+        self.correlator.stop()
+
+    def __enter__(self) -> "CorrelatedSubscription":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> _correlation.CorrelationStats:
+        return self.correlator.stats()
+
+
+class ConflationStats(typing.NamedTuple):
+    #: The updates received from JAPC.
+    received: int
+    #: The updates replaced by a newer one (of the same selector) before being pulled.
+    conflated: int
+
+
+class ConflatedPropertyStream:
+    """
+    A subscription for slow consumers, keeping only the latest update of each selector.
+
+    Updates are kept as they are received from JAPC, and only converted when
+    the consumer pulls them (see :meth:`pull`), so that a consumer falling
+    behind neither builds up a backlog nor costs conversions of values it
+    will never see. Updates of different selectors (e.g. for a ``.ALL``
+    selector) are pulled in the order in which they were first left pending::
+
+        with provider.subscribe_conflated(query) as stream:
+            for response in stream:
+                ...
+
+    Monitoring starts when entering the ``with`` block (or calling
+    :meth:`start`), and stops when leaving it (or calling :meth:`stop`), at
+    which point pending updates are dropped and iteration ends. The JAPC
+    subscription is not shared with other streams.
+
+    """
+    def __init__(
+            self,
+            query: "PropertyAccessQuery",
+            conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+    ):
+        self.query = query
+        self._conversion = conversion
+        #: The latest update of each selector not pulled yet, in the order they were first left pending.
+        self._pending: typing.Dict[str, RawUpdate] = {}
+        self._condition = threading.Condition()
+        self._monitoring = False
+        self._received = 0
+        self._conflated = 0
+        self._sh_j = create_param(query).createSubscription(
+            create_selector(query), create_raw_listener(self._on_raw_update),
+        )
+
+    def start(self) -> None:
+        with self._condition:
+            if self._monitoring:
+                return
+            self._monitoring = True
+        self._sh_j.startMonitoring()
+
+    def stop(self) -> None:
+        with self._condition:
+            if not self._monitoring:
+                return
+            self._monitoring = False
+            self._pending.clear()
+            self._condition.notify_all()
+        self._sh_j.stopMonitoring()
+
+    def __enter__(self) -> "ConflatedPropertyStream":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def __iter__(self) -> typing.Iterator["PropertyRetrievalResponse"]:
+        while True:
+            response = self.pull()
+            if response is None:
+                return
+            yield response
+
+    def pull(self, timeout: typing.Optional[float] = None) -> typing.Optional["PropertyRetrievalResponse"]:
+        """
+        Convert and return the oldest pending update, waiting for one if there is none.
+
+        Returns None if the stream is stopped, or nothing arrived within ``timeout`` seconds.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending or not self._monitoring, timeout)
+            if not self._pending:
+                return None
+            raw_update = self._pending.pop(next(iter(self._pending)))
+        # Converted outside of the lock, so as not to hold up the JAPC thread.
+        return raw_update.to_retrieval_response(self.query, self._conversion)
+
+    def pending(self) -> int:
+        """The number of updates waiting to be pulled (at most one per selector)."""
+        with self._condition:
+            return len(self._pending)
+
+    def stats(self) -> ConflationStats:
+        with self._condition:
+            return ConflationStats(self._received, self._conflated)
+
+    def _on_raw_update(self, raw_update: "RawUpdate") -> None:
+        selector_id = raw_update.selector_id()
+        with self._condition:
+            if not self._monitoring:
+                return
+            self._received += 1
+            if selector_id in self._pending:
+                self._conflated += 1
+            # Replacing an update keeps its position, the selector has been waiting since the first one.
+            self._pending[selector_id] = raw_update
+            self._condition.notify()
+
 
 _SKIP_TOKEN = object()
 
@@ -47,12 +577,58 @@ class JapcProvider(pyda.providers.BaseProvider):
             self,
             *,
             rbac_token: typing.Union[pyrbac.Token, bytes, None] = _SKIP_TOKEN,
+            reuse_set_arrays: bool = False,
+            conversion_pipeline: typing.Optional[_pipeline.ConversionPipeline] = None,
+            lazy_values: bool = False,
+            coalesce_gets: bool = False,
+            max_age: typing.Optional[float] = None,
             # For now people can "from pyda_japc._provider import enable_inca" to achieve this
             # incaify: bool = False,  # TODO: Think of a proper interface to enable IncA in the future
     ):
+        """
+        :param rbac_token: The RBAC token to use for all JAPC calls (see :attr:`rbac_token`).
+        :param reuse_set_arrays: Recycle the Java arrays used to send array
+            settings once each set has completed (i.e. its own response
+            has arrived), rather than allocating new ones for every set.
+            Only enable this if nothing (e.g. a mock recording its
+            invocations) keeps hold of set values.
+        :param conversion_pipeline: Convert and deliver subscription updates
+            on the workers of this pipeline, rather than on the JAPC callback
+            threads (see :class:`ConversionPipeline`).
+        :param lazy_values: Deliver acquired values as
+            :class:`LazyDataTypeValue` instances, which only convert the
+            fields that are actually accessed.
+        :param coalesce_gets: Let concurrent gets of the same query share a
+            single JAPC call, and therefore the same response (see
+            :meth:`coalescing_stats`). The arrays of such responses are
+            read-only, so that no caller can modify them for the others.
+        :param max_age: Serve gets from the last update of an identical
+            active subscription (made through this provider), if it was
+            received less than this many seconds ago, rather than making a
+            JAPC call. By default, every get makes a JAPC call. Gets can
+            override this with their own ``max_age``. The arrays of the
+            responses served this way are read-only, as they are shared
+            with the consumers of the subscription.
+        """
         super().__init__()
         if rbac_token is not _SKIP_TOKEN:
             self.rbac_token = rbac_token
+        self._set_array_pool: typing.Optional[_jpype_tools.JavaArrayPool] = (
+            _jpype_tools.JavaArrayPool() if reuse_set_arrays else None
+        )
+        self._lazy_values = lazy_values
+        self._field_projections: typing.Dict[str, typing.Tuple[str, ...]] = {}
+        self._subscriptions = SubscriptionRegistry(conversion_pipeline)
+        self._get_dispatcher = ListenerDispatcher(_get_response, retrieval_exception_response)
+        self._set_dispatcher = ListenerDispatcher(update_response, update_exception_response, share=False)
+        self._loop_bridges: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _aio.LoopBridge]" = \
+            weakref.WeakKeyDictionary()
+        self._loop_bridges_lock = threading.Lock()
+        self._latencies = _instrumentation.Instrumentation()
+        #: Where gets, sets and subscription updates are timed, if instrumentation is enabled.
+        self._instrumentation: typing.Optional[_instrumentation.Instrumentation] = None
+        self._get_flights: typing.Optional[SingleFlight] = SingleFlight() if coalesce_gets else None
+        self._max_age = max_age
 
         # TODO: In the future, this must become a singleton (due to inca one-timeness)
         # if incaify:
@@ -83,19 +659,477 @@ class JapcProvider(pyda.providers.BaseProvider):
             raise ValueError("pyrbac Token cannot be converted to Java") from e
         token_holder.setRbaToken(token_j)
 
-    def _get_property(self, query: "PropertyAccessQuery"):
+    def invalidate_parameter_cache(self, device: typing.Optional[str] = None, prop: typing.Optional[str] = None):
+        """
+        Drop cached JAPC parameters, so that they are re-created on next use.
+
+        With no arguments, the whole cache is cleared. Otherwise, both the
+        device and property of the parameter to drop must be given.
+        """
+        if device is None and prop is None:
+            param_cache().cache_clear()
+        elif device is None or prop is None:
+            raise ValueError("Both device and prop must be given to invalidate a single parameter")
+        else:
+            param_cache().invalidate(f'{device}/{prop}')
+
+    def enable_instrumentation(self) -> None:
+        """
+        Start timing each stage of gets, sets and subscription updates (see :meth:`latency_report`).
+
+        Instrumentation is disabled by default, in which case none of the
+        timing code runs.
+        """
+        self._instrumentation = self._latencies
+        self._subscriptions.instrumentation = self._instrumentation
+
+    def disable_instrumentation(self) -> None:
+        """Stop timing requests. The latencies recorded so far are kept."""
+        self._instrumentation = None
+        self._subscriptions.instrumentation = None
+
+    def latency_report(self) -> typing.Dict[str, typing.Dict[str, _instrumentation.HistogramSummary]]:
+        """
+        The latency (in ns) of each stage of the requests timed so far, per ``"device/property"``.
+
+        See :data:`_instrumentation.STAGES` for the stages. Only the stages
+        seen for a parameter are reported (e.g. ``japc`` is not reported for
+        subscription updates).
+        """
+        return self._latencies.report()
+
+    def latency_totals(self) -> typing.Dict[str, _instrumentation.HistogramSummary]:
+        """The latency (in ns) of each stage of the requests timed so far, over all parameters."""
+        return self._latencies.totals()
+
+    def reset_latency_report(self) -> None:
+        self._latencies.reset()
+
+    def project_fields(self, device: str, prop: str, fields: typing.Optional[typing.Iterable[str]]) -> None:
+        """
+        Only convert the given fields of the values of ``device/prop``.
+
+        This applies to all gets and subscriptions made through this provider
+        from now on (unless a request gives its own ``fields``), and cuts the
+        conversion cost when only few fields of a large property are needed.
+        Pass ``None`` to convert all fields again.
+        """
+        name = f'{device}/{prop}'
+        if fields is None:
+            self._field_projections.pop(name, None)
+        else:
+            self._field_projections[name] = tuple(fields)
+
+    def _conversion_for(
+            self,
+            query: "PropertyAccessQuery",
+            fields: typing.Optional[typing.Iterable[str]] = None,
+            raw: bool = False,
+    ) -> _transformations.ConversionOptions:
+        if fields is None:
+            fields = self._field_projections.get(f'{query.device}/{query.prop}')
+        else:
+            fields = tuple(fields)
+        if raw:
+            return _transformations.ConversionOptions(fields=fields, raw=True)
+        if fields is None and not self._lazy_values:
+            return _transformations.DEFAULT_CONVERSION
+        return _transformations.ConversionOptions(lazy=self._lazy_values, fields=fields)
+
+    async def aget(
+            self,
+            query: "PropertyAccessQuery",
+            *,
+            fields: typing.Optional[typing.Iterable[str]] = None,
+            max_age: typing.Optional[float] = None,
+    ) -> "PropertyRetrievalResponse":
+        """
+        Get a property from within a coroutine.
+
+        The response is handed to the running event loop directly from the
+        JAPC listener, without going through a ``concurrent.futures.Future``
+        and an executor thread. With ``coalesce_gets``, it is coalesced with
+        identical gets in flight, whether made from a coroutine or not.
+
+        If ``fields`` is given, only those fields are converted (see :meth:`project_fields`).
+        If ``max_age`` is given, it overrides the ``max_age`` of the provider
+        (responses served from a subscription have read-only arrays).
+        """
+        conversion = self._conversion_for(query, fields)
+        response = self._recent_response(query, conversion, max_age)
+        if response is not None:
+            return response
+        coalesced = self._coalesced_get(query, conversion)
+        if coalesced is not None:
+            return await asyncio.wrap_future(coalesced)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        bridge = self._loop_bridge(loop)
+        self._submit_get(
+            query,
+            functools.partial(bridge.call, functools.partial(_aio.resolve_future, future)),
+            conversion=conversion,
+        )
+        return await future
+
+    async def aset(self, query: "PropertyAccessQuery", value: typing.Any) -> "PropertyUpdateResponse":
+        """Set a property from within a coroutine. See :meth:`aget`."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        bridge = self._loop_bridge(loop)
+        mpv, lease, trace = self._traced_convert_for_set(query, value)
+        self._submit_set(
+            query, mpv, lease, functools.partial(bridge.call, functools.partial(_aio.resolve_future, future)), trace=trace,
+        )
+        return await future
+
+    def asubscribe(
+            self,
+            query: "PropertyAccessQuery",
+            *,
+            fields: typing.Optional[typing.Iterable[str]] = None,
+    ) -> AsyncPropertyStream:
+        """
+        Subscribe to a property from within a coroutine::
+
+            async with provider.asubscribe(query) as stream:
+                async for response in stream:
+                    ...
+
+        If ``fields`` is given, only those fields are converted (see :meth:`project_fields`).
+        """
+        return AsyncPropertyStream(
+            query,
+            self._loop_bridge(asyncio.get_running_loop()),
+            self._subscriptions,
+            self._conversion_for(query, fields),
+        )
+
+    def subscribe_conflated(
+            self,
+            query: "PropertyAccessQuery",
+            *,
+            fields: typing.Optional[typing.Iterable[str]] = None,
+    ) -> ConflatedPropertyStream:
+        """
+        Subscribe to a property, keeping only the latest update of each selector until it is pulled.
+
+        Use this rather than :meth:`subscribe` for consumers which may not
+        keep up with the rate of updates (see :class:`ConflatedPropertyStream`).
+
+        If ``fields`` is given, only those fields are converted (see :meth:`project_fields`).
+        """
+        return ConflatedPropertyStream(query, self._conversion_for(query, fields))
+
+    def subscribe_raw(
+            self,
+            query: "PropertyAccessQuery",
+            sink: typing.Callable[["RawResponse"], None],
+            *,
+            fields: typing.Optional[typing.Iterable[str]] = None,
+    ) -> "SinkSubscription":
+        """
+        Subscribe to a property, passing each update to ``sink`` as a :class:`RawResponse`::
+
+            with provider.subscribe_raw(query, on_update):
+                ...
+
+        ``sink`` is called from the JAPC threads (or the workers of the
+        conversion pipeline), and should return quickly. The subscription is
+        shared with other raw subscriptions of the same query (see
+        :class:`SubscriptionRegistry`). See :meth:`get_raw` for ``fields``.
+        """
+        return SinkSubscription(query, self._conversion_for(query, fields, raw=True), self._subscriptions, sink)
+
+    def subscribe_sink(
+            self,
+            query: "PropertyAccessQuery",
+            sink: typing.Callable[["PropertyRetrievalResponse"], None],
+            *,
+            fields: typing.Optional[typing.Iterable[str]] = None,
+    ) -> SinkSubscription:
+        """
+        Subscribe to a property, passing each update to ``sink``::
+
+            with provider.subscribe_sink(query, on_update):
+                ...
+
+        As for :meth:`subscribe_raw`, ``sink`` is called from the JAPC threads
+        (or the workers of the conversion pipeline). The subscription is shared
+        with the other streams of the same query (see :class:`SubscriptionRegistry`).
+
+        If ``fields`` is given, only those fields are converted (see :meth:`project_fields`).
+        """
+        return SinkSubscription(query, self._conversion_for(query, fields), self._subscriptions, sink)
+
+    def subscribe_correlated(
+            self,
+            queries: typing.Iterable["PropertyAccessQuery"],
+            sink: typing.Callable[[_correlation.CorrelatedEvent], None],
+            *,
+            timeout: float = 1.,
+            max_pending: int = 16,
+            fields: typing.Optional[typing.Iterable[str]] = None,
+    ) -> CorrelatedSubscription:
+        """
+        Subscribe to many parameters sharing a selector, and receive their updates assembled by cycle::
+
+            def on_cycle(event):
+                positions = event.stack('position')  # One row per device
+                ...
+
+            with provider.subscribe_correlated(queries, on_cycle, timeout=0.5):
+                ...
+
+        ``sink`` is given one :class:`_correlation.CorrelatedEvent` per cycle,
+        as soon as all the parameters have delivered an update for that cycle
+        (according to their cycle stamps), or ``timeout`` seconds after the
+        first of them did, listing the missing ones (see
+        :class:`_correlation.CycleCorrelator`). Errors, and updates without a
+        cycle stamp, are dropped.
+
+        The subscriptions are shared with other streams of the same queries
+        (see :class:`SubscriptionRegistry`). If ``fields`` is given, only those
+        fields are converted (see :meth:`project_fields`).
+        """
+        queries = list(queries)
+        selectors = {str(query.selector) if query.selector else '' for query in queries}
+        if len(selectors) != 1 or '' in selectors:
+            raise ValueError(f"Correlated queries must all have the same (non-empty) selector, got {sorted(selectors)}")
+        if fields is not None:
+            fields = tuple(fields)
+        return CorrelatedSubscription(
+            queries,
+            [self._conversion_for(query, fields) for query in queries],
+            self._subscriptions,
+            sink,
+            timeout=timeout,
+            max_pending=max_pending,
+        )
+
+    def _loop_bridge(self, loop: asyncio.AbstractEventLoop) -> _aio.LoopBridge:
+        with self._loop_bridges_lock:
+            bridge = self._loop_bridges.get(loop)
+            if bridge is None:
+                bridge = self._loop_bridges[loop] = _aio.LoopBridge(loop)
+            return bridge
+
+    def get_many(
+            self,
+            queries: typing.Iterable["PropertyAccessQuery"],
+            *,
+            fields: typing.Optional[typing.Iterable[str]] = None,
+            max_age: typing.Optional[float] = None,
+    ) -> "BatchFutures":
+        """
+        Issue non-blocking gets for many queries at once.
+
+        Queries sharing a selector (and data filter) share a single Java
+        selector, and all JAPC calls are issued back to back before any
+        response is waited for, so that the total time is close to a single
+        round trip rather than one per query.
+
+        Returns one future per query (in the order given), plus an aggregate
+        future resolving to the list of all responses once every one of them
+        has arrived.
+
+        If ``fields`` is given, only those fields are converted (see :meth:`project_fields`).
+        If ``max_age`` is given, it overrides the ``max_age`` of the provider
+        (responses served from a subscription have read-only arrays).
+
+        """
+        if fields is not None:
+            fields = tuple(fields)
+        selectors: typing.Dict[typing.Hashable, typing.Any] = {}
+        futures = []
+        for query in queries:
+            future = concurrent.futures.Future()
+            conversion = self._conversion_for(query, fields)
+            response = self._recent_response(query, conversion, max_age)
+            if response is not None:
+                future.set_result(response)
+                futures.append(future)
+                continue
+            try:
+                self._submit_get(
+                    query,
+                    future.set_result,
+                    selector_j=_batch_selector(query, selectors),
+                    conversion=conversion,
+                )
+            except Exception as err:  # noqa: B902
+                # Don't let one failing request prevent the others from being issued.
+                future.set_exception(err)
+            futures.append(future)
+        return BatchFutures(futures, _aggregate_futures(futures))
+
+    def _get_property(self, query: "PropertyAccessQuery", *, max_age: typing.Optional[float] = None):
         # A non-blocking get.
-        future = concurrent.futures.Future()
+        return self._get(query, self._conversion_for(query), max_age)
 
-        param_j = create_param(query)
-        selector_j = create_selector(query)
-        listener_j = create_value_listener(query, future.set_result)
+    def get_raw(
+            self,
+            query: "PropertyAccessQuery",
+            *,
+            fields: typing.Optional[typing.Iterable[str]] = None,
+            max_age: typing.Optional[float] = None,
+    ) -> concurrent.futures.Future:
+        """
+        A non-blocking get, resolving to a :class:`RawResponse` rather than a pyda response.
+
+        The value is converted straight into a dict of NumPy arrays and
+        scalars, skipping :mod:`pyds_model` altogether, which is considerably
+        cheaper for consumers which don't need the pyda data model.
+
+        If ``fields`` is given, only those fields are converted (see :meth:`project_fields`).
+        If ``max_age`` is given, it overrides the ``max_age`` of the provider
+        (only raw subscriptions can serve raw gets, with read-only arrays).
+        """
+        return self._get(query, self._conversion_for(query, fields, raw=True), max_age)
 
-        param_j.getValue(selector_j, listener_j)
+    def _get(
+            self,
+            query: "PropertyAccessQuery",
+            conversion: _transformations.ConversionOptions,
+            max_age: typing.Optional[float],
+    ) -> concurrent.futures.Future:
+        response = self._recent_response(query, conversion, max_age)
+        if response is not None:
+            future = concurrent.futures.Future()
+            future.set_result(response)
+            return future
+        future = self._coalesced_get(query, conversion)
+        if future is None:
+            future = concurrent.futures.Future()
+            self._submit_get(query, future.set_result, conversion=conversion)
         return future
 
+    def _coalesced_get(
+            self,
+            query: "PropertyAccessQuery",
+            conversion: _transformations.ConversionOptions,
+    ) -> typing.Optional[concurrent.futures.Future]:
+        # The future of the get, coalesced with any identical get in flight, or None if it can't be coalesced.
+        if self._get_flights is None:
+            return None
+        key = subscription_key(query)
+        if key is None:
+            # The filter contains values which we cannot reliably key on, so don't coalesce.
+            return None
+        # The response is shared by all the callers, none of which may modify it for the others.
+        conversion = conversion._replace(readonly=True)
+        return self._get_flights.submit(
+            (key, conversion), lambda callback: self._submit_get(query, callback, conversion=conversion),
+        )
+
+    def _recent_response(
+            self,
+            query: "PropertyAccessQuery",
+            conversion: _transformations.ConversionOptions,
+            max_age: typing.Optional[float],
+    ) -> typing.Optional["PropertyRetrievalResponse"]:
+        # The response of an active subscription which can serve a get, if any.
+        if max_age is None:
+            max_age = self._max_age
+        if not max_age:
+            return None
+        return self._subscriptions.latest(query, conversion, max_age=max_age)
+
+    def coalescing_stats(self) -> "CoalescingStats":
+        """
+        The number of gets issued to JAPC, and coalesced into one already in flight.
+
+        Only gets made while ``coalesce_gets`` is enabled are counted.
+        """
+        if self._get_flights is None:
+            return CoalescingStats(0, 0)
+        return self._get_flights.stats()
+
+    def _submit_get(
+            self,
+            query: "PropertyAccessQuery",
+            callback: typing.Callable[["PropertyRetrievalResponse"], None],
+            *,
+            selector_j=None,
+            conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+    ) -> None:
+        param_j = create_param(query)
+        if selector_j is None:
+            selector_j = create_selector(query)
+        instrumentation = self._instrumentation
+        if instrumentation is None:
+            listener_j, token = self._get_dispatcher.register(param_j, query, callback, conversion)
+        else:
+            trace = instrumentation.trace(query)
+            callback = functools.partial(_deliver_traced, trace, callback)
+            listener_j, token = self._get_dispatcher.register(param_j, query, callback, conversion, trace)
+
+        try:
+            param_j.getValue(selector_j, listener_j)
+        except Exception:  # noqa: B902
+            self._get_dispatcher.discard(token)
+            raise
+
+    def active_subscriptions(self) -> typing.Dict[str, int]:
+        """
+        The JAPC subscriptions currently held by this provider, with the
+        number of streams sharing each of them.
+        """
+        return self._subscriptions.active()
+
     def _create_property_stream(self, query: "PropertyAccessQuery"):
-        return JapcPropertyStream(query)
+        return JapcPropertyStream(query, self._subscriptions, self._conversion_for(query))
+
+    def set_many(
+            self,
+            requests: typing.Iterable[typing.Tuple["PropertyAccessQuery", typing.Any]],
+            *,
+            executor: typing.Optional[concurrent.futures.Executor] = None,
+    ) -> "BatchFutures":
+        """
+        Issue non-blocking sets for many ``(query, value)`` pairs at once.
+
+        All values are converted to JAPC values up front (in parallel on
+        ``executor`` if one is given), and the JAPC calls are then issued back
+        to back, so that e.g. a coordinated multi-device trim is sent out as
+        close to simultaneously as possible, and its total time is close to a
+        single round trip.
+
+        Returns one future of :class:`pyda.data.PropertyUpdateResponse` per
+        request (in the order given), plus an aggregate future resolving to
+        the list of all responses. A request whose value cannot be converted
+        has the conversion error set on its future, and is not sent.
+
+        """
+        requests = list(requests)
+
+        def convert(request):
+            try:
+                return self._traced_convert_for_set(*request), None
+            except Exception as err:  # noqa: B902
+                return None, err
+
+        if executor is None:
+            converted = [convert(request) for request in requests]
+        else:
+            converted = list(executor.map(convert, requests))
+
+        selectors: typing.Dict[typing.Hashable, typing.Any] = {}
+        futures = []
+        for (query, _), (prepared, error) in zip(requests, converted):
+            future = concurrent.futures.Future()
+            futures.append(future)
+            if error is not None:
+                future.set_exception(error)
+                continue
+            mpv, lease, trace = prepared
+            try:
+                self._submit_set(
+                    query, mpv, lease, future.set_result, selector_j=_batch_selector(query, selectors), trace=trace,
+                )
+            except Exception as err:  # noqa: B902
+                future.set_exception(err)
+        return BatchFutures(futures, _aggregate_futures(futures))
 
     def _set_property(
             self,
@@ -104,24 +1138,125 @@ class JapcProvider(pyda.providers.BaseProvider):
     ):
         # A non-blocking set.
         future = concurrent.futures.Future()
+        mpv, lease, trace = self._traced_convert_for_set(query, value)
+        self._submit_set(query, mpv, lease, future.set_result, trace=trace)
+        return future
+
+    def _traced_convert_for_set(
+            self,
+            query: "PropertyAccessQuery",
+            value: typing.Any,
+    ) -> typing.Tuple[
+        "cern.japc.value.MapParameterValue",
+        typing.Optional[_jpype_tools.JavaArrayLease],
+        typing.Optional[_instrumentation.Trace],
+    ]:
+        # As _convert_for_set, starting the trace of the set if instrumentation is enabled.
+        instrumentation = self._instrumentation
+        trace = None if instrumentation is None else instrumentation.trace(query)
+        mpv, lease = self._convert_for_set(query, value)
+        if trace is not None:
+            trace.mark('value')
+        return mpv, lease, trace
+
+    def _convert_for_set(
+            self,
+            query: "PropertyAccessQuery",
+            value: typing.Any,
+    ) -> typing.Tuple["cern.japc.value.MapParameterValue", typing.Optional[_jpype_tools.JavaArrayLease]]:
         value = self._prepare_value_for_set(query, value)
+        lease = None if self._set_array_pool is None else self._set_array_pool.lease()
 
+        # TODO: This should also be able to convert a simple dictionary
+        #  (or other arbitrary types in future DSF)
+        # NOTE: value at this point could also be an AnyData.
+        try:
+            mpv = _transformations.DataTypeValue_to_MapParameterValue(value, array_pool=lease)
+        except Exception:  # noqa: B902
+            if lease is not None:
+                lease.release()
+            raise
+        return mpv, lease
+
+    def _submit_set(
+            self,
+            query: "PropertyAccessQuery",
+            mpv: "cern.japc.value.MapParameterValue",
+            lease: typing.Optional[_jpype_tools.JavaArrayLease],
+            callback: typing.Callable[["PropertyUpdateResponse"], None],
+            *,
+            selector_j=None,
+            trace: typing.Optional[_instrumentation.Trace] = None,
+    ) -> None:
         param_j = create_param(query)
-        selector_j = create_selector(query)
+        if selector_j is None:
+            selector_j = create_selector(query)
+
+        def on_set_done(response: "PropertyUpdateResponse"):
+            # Only ever called with the response of this very set (sets don't
+            # share their listener), so JAPC is done with the leased arrays.
+            if trace is not None:
+                trace.mark('japc')
+            if lease is not None:
+                lease.release()
+            callback(response)
+            if trace is not None:
+                trace.finish()
 
         # FIXME: This listener probably has to have a different valueReceived implementation
         #  because the received object from japc is mostly dummy (it returns the same data that
         #  was set), and we need to produce a
         #  PropertyUpdateResponse (same type for exception actually)
-        listener_j = create_set_value_listener(query, future.set_result)
+        listener_j, token = self._set_dispatcher.register(param_j, query, on_set_done)
 
-        # TODO: This should also be able to convert a simple dictionary
-        #  (or other arbitrary types in future DSF)
-        # NOTE: value at this point could also be an AnyData.
-        mpv = _transformations.DataTypeValue_to_MapParameterValue(value)
+        try:
+            param_j.setValue(selector_j, mpv, listener_j)
+        except Exception:  # noqa: B902
+            self._set_dispatcher.discard(token)
+            if lease is not None:
+                lease.release()
+            raise
+
+
+class BatchFutures(typing.NamedTuple):
+    #: One future per request, in the order the requests were given.
+    futures: typing.List[concurrent.futures.Future]
+    #: A future resolving to the list of all responses, once all have arrived.
+    aggregate: concurrent.futures.Future
+
+
+def _batch_selector(query: "PropertyAccessQuery", selectors: typing.Dict[typing.Hashable, typing.Any]):
+    # Share one Java selector between all the requests of a batch with the same selector and data filter.
+    try:
+        key = (str(query.selector), _data_filter_key(query.data_filters))
+    except TypeError:
+        return create_selector(query)
+    selector_j = selectors.get(key)
+    if selector_j is None:
+        selector_j = selectors[key] = create_selector(query)
+    return selector_j
 
-        param_j.setValue(selector_j, mpv, listener_j)
-        return future
+
+def _aggregate_futures(futures: typing.Sequence[concurrent.futures.Future]) -> concurrent.futures.Future:
+    aggregate = concurrent.futures.Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            aggregate.set_result([future.result() for future in futures])
+        except Exception as err:  # noqa: B902
+            aggregate.set_exception(err)
+
+    if not futures:
+        aggregate.set_result([])
+    for future in futures:
+        future.add_done_callback(on_done)
+    return aggregate
 
 
 def enable_inca():
@@ -143,47 +1278,265 @@ def get_token_holder():
 
 
 def create_param(query: "PropertyAccessQuery"):
-    factory = param_factory()
-    param = factory.newParameter(f'{query.device}/{query.prop}')
-    return param
+    name = f'{query.device}/{query.prop}'
+    return param_cache().get_or_create(name, lambda: param_factory().newParameter(name))
 
 
 def create_selector(query: "PropertyAccessQuery"):
     cern = _jpype_tools.cern_pkg()
     if not query.selector and not query.data_filters:
         return cern.japc.core.Selectors.NO_SELECTOR
+    try:
+        key = (str(query.selector), _data_filter_key(query.data_filters))
+    except TypeError:
+        # The filter contains values which we cannot reliably key on, so don't cache.
+        return _new_selector(query)
+    return selector_cache().get_or_create(key, lambda: _new_selector(query))
+
+
+def _new_selector(query: "PropertyAccessQuery"):
+    cern = _jpype_tools.cern_pkg()
     if query.data_filters:
         data_filter_j = create_data_filter(query.data_filters)
         return cern.japc.core.factory.SelectorFactory.newSelector(str(query.selector), data_filter_j)
     return cern.japc.core.factory.SelectorFactory.newSelector(str(query.selector))
 
 
-def create_value_listener(query: "PropertyAccessQuery", callback: typing.Callable[["PropertyRetrievalResponse"], None]):
-    cern = _jpype_tools.cern_pkg()
+def _data_filter_key(
+        py_filter: typing.Optional[typing.Mapping[str, typing.Any]],
+) -> typing.Tuple[typing.Tuple[str, typing.Hashable], ...]:
+    """
+    Build a hashable, canonical form of the given data filter.
 
-    def on_exception(_, __, exception_j: "cern.japc.core.ParameterException"):
-        _, notification_type = _transformations.ValueHeader_to_ctx_notif_pair(exception_j.getHeader())
+    Values are keyed together with their type so that e.g. ``True``, ``1``
+    and ``1.0`` (which compare equal in Python but map to different Java
+    types) produce different keys. Raises ``TypeError`` for values which
+    cannot be keyed.
+
+    """
+    if not py_filter:
+        return ()
+    return tuple(sorted((key, _filter_value_key(val)) for key, val in py_filter.items()))
+
+
+def _filter_value_key(value: typing.Any) -> typing.Hashable:
+    if isinstance(value, np.ndarray):
+        return (np.ndarray, value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_filter_value_key(item) for item in value))
+    hash(value)
+    return (type(value), value)
+
+
+class RawResponse:
+    """
+    A compact alternative to :class:`pyda.data.PropertyRetrievalResponse`, for throughput-critical consumers.
+
+    The value is a plain dict of NumPy arrays and scalars (None for errors),
+    and the header is flattened into the stamps (ns since the epoch, 0 if
+    not applicable) and selector ('' for none). It is built directly from
+    the JAPC value, without going through :mod:`pyds_model` (see
+    :meth:`JapcProvider.get_raw` and :meth:`JapcProvider.subscribe_raw`).
+
+    """
+    __slots__ = (
+        'query', 'notification_type', 'value', 'acq_stamp', 'cycle_stamp', 'set_stamp', 'selector', 'exception',
+    )
+
+    def __init__(
+            self,
+            query: "PropertyAccessQuery",
+            notification_type: str,
+            value: typing.Optional[typing.Dict[str, typing.Any]] = None,
+            acq_stamp: int = 0,
+            cycle_stamp: int = 0,
+            set_stamp: int = 0,
+            selector: str = '',
+            exception: typing.Optional[Exception] = None,
+    ):
+        self.query = query
+        self.notification_type = notification_type
+        self.value = value
+        self.acq_stamp = acq_stamp
+        self.cycle_stamp = cycle_stamp
+        self.set_stamp = set_stamp
+        self.selector = selector
+        self.exception = exception
+
+    def __repr__(self) -> str:
+        if self.exception is not None:
+            return f'<RawResponse {query_name(self.query)}: {self.exception!r}>'
+        return (
+            f'<RawResponse {query_name(self.query)}: acq_stamp={self.acq_stamp}, cycle_stamp={self.cycle_stamp}, '
+            f'set_stamp={self.set_stamp}, selector={self.selector!r}, fields={list(self.value)}>'
+        )
+
+
+def _error_response(
+        query: "PropertyAccessQuery",
+        notification_type: str,
+        error: pyda.data.PropertyAccessError,
+        conversion: _transformations.ConversionOptions,
+):
+    if conversion.raw:
+        return RawResponse(query, notification_type, exception=error)
+    return pyda.data.PropertyRetrievalResponse(
+        query=query,
+        notification_type=notification_type,
+        exception=error,
+    )
+
+
+def retrieval_exception_response(
+        query: "PropertyAccessQuery",
+        exception_j: "cern.japc.core.ParameterException",
+        conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+        trace: typing.Optional[_instrumentation.Trace] = None,
+) -> typing.Union["PropertyRetrievalResponse", RawResponse]:
+    notification_type = _transformations.ValueHeader_to_notification_type(exception_j.getHeader())
+    try:
+        # Raise a ``PropertyAccessError``, and then immediately catch it and present it to the ``PropertyUpdateResponse``.
+        # TODO: Investigate if there is a better way to construct an exception with a correct
+        #  ``__cause__`` without having to try & except like this.
+        raise pyda.data.PropertyAccessError(exception_j.getMessage()) from exception_j
+    except pyda.data.PropertyAccessError as error:
+        return _error_response(query, notification_type, error, conversion)
+
+
+def raw_response(
+        query: "PropertyAccessQuery",
+        apv_j: "cern.japc.core.AcquiredParameterValue",
+        conversion: _transformations.ConversionOptions,
+        trace: typing.Optional[_instrumentation.Trace] = None,
+) -> RawResponse:
+    header_j = apv_j.getHeader()
+    notification_type = _transformations.ValueHeader_to_notification_type(header_j)
+    acq_stamp, cycle_stamp, set_stamp, selector = _transformations.ValueHeader_to_stamps(header_j)
+    if trace is not None:
+        trace.mark('header')
+    value = _transformations.MapParameterValue_to_dict(
+        apv_j.getValue(),
+        borrow_arrays=conversion.borrow_arrays,
+        fields=conversion.fields,
+        readonly=conversion.readonly,
+    )
+    if trace is not None:
+        trace.mark('value')
+    return RawResponse(query, notification_type, value, acq_stamp, cycle_stamp, set_stamp, selector)
+
+
+def retrieval_response(
+        query: "PropertyAccessQuery",
+        apv_j: "cern.japc.core.AcquiredParameterValue",
+        conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+        trace: typing.Optional[_instrumentation.Trace] = None,
+) -> typing.Union["PropertyRetrievalResponse", RawResponse]:
+    try:
+        if conversion.raw:
+            return raw_response(query, apv_j, conversion, trace)
+        value, notification_type = _transformations.AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(
+            apv_j,
+            borrow_arrays=conversion.borrow_arrays,
+            lazy=conversion.lazy,
+            fields=conversion.fields,
+            readonly=conversion.readonly,
+            trace=trace,
+        )
+    except KeyError as err:
+        if conversion.fields is None:
+            raise
+        # A projected field which the device doesn't publish: report it to the caller rather
+        # than losing it in the JAPC listener thread.
+        notification_type = _transformations.ValueHeader_to_notification_type(apv_j.getHeader())
         try:
-            # Raise a ``PropertyAccessError``, and then immediately catch it and present it to the ``PropertyUpdateResponse``.
-            # TODO: Investigate if there is a better way to construct an exception with a correct
-            #  ``__cause__`` without having to try & except like this.
-            raise pyda.data.PropertyAccessError(exception_j.getMessage()) from exception_j
+            raise pyda.data.PropertyAccessError(str(err.args[0])) from err
         except pyda.data.PropertyAccessError as error:
-            response = pyda.data.PropertyRetrievalResponse(
-                query=query,
-                notification_type=notification_type,
-                exception=error,
-            )
-            callback(response)
+            return _error_response(query, notification_type, error, conversion)
+    return pyda.data.PropertyRetrievalResponse(
+        query=query,
+        notification_type=notification_type,
+        value=value,
+    )
 
-    def on_val_recv(_, apv_j):
-        value, notification_type = _transformations.AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(apv_j)
-        response = pyda.data.PropertyRetrievalResponse(
+
+def _get_response(
+        query: "PropertyAccessQuery",
+        apv_j: "cern.japc.core.AcquiredParameterValue",
+        conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+        trace: typing.Optional[_instrumentation.Trace] = None,
+) -> "PropertyRetrievalResponse":
+    if trace is not None:
+        # The JAPC callback of the get has just been entered.
+        trace.mark('japc')
+    return retrieval_response(query, apv_j, conversion, trace)
+
+
+def _deliver_traced(trace: _instrumentation.Trace, callback: typing.Callable[[typing.Any], None], response) -> None:
+    callback(response)
+    trace.finish()
+
+
+def update_exception_response(
+        query: "PropertyAccessQuery",
+        exception_j: "cern.japc.core.ParameterException",
+) -> "PropertyUpdateResponse":
+    try:
+        # Raise a ``PropertyAccessError``, and then immediately catch it and present it to the ``PropertyUpdateResponse``.
+        # TODO: Investigate if there is a better way to construct an exception with a correct
+        #  ``__cause__`` without having to try & except like this.
+        raise pyda.data.PropertyAccessError(exception_j.getMessage()) from exception_j
+    except pyda.data.PropertyAccessError as error:
+        return pyda.data.PropertyUpdateResponse(
             query=query,
-            notification_type=notification_type,
-            value=value,
+            exception=error,
         )
-        callback(response)
+
+
+# TODO: Maybe this is not needed at all (if PropertyAccessReponse can be used for SET)?
+def update_response(
+        query: "PropertyAccessQuery",
+        apv_j: "cern.japc.core.AcquiredParameterValue",
+) -> "PropertyUpdateResponse":
+    selector = apv_j.getHeader().getSelector().getId()
+    header = pyda.data.UpdateHeader(selector)
+    return pyda.data.PropertyUpdateResponse(
+        query=query,
+        header=header,
+    )
+
+
+class RawUpdate(typing.NamedTuple):
+    """A value or exception received from JAPC, not yet converted to Python."""
+    value_j: typing.Optional["cern.japc.core.AcquiredParameterValue"] = None
+    exception_j: typing.Optional["cern.japc.core.ParameterException"] = None
+
+    def to_retrieval_response(
+            self,
+            query: "PropertyAccessQuery",
+            conversion: _transformations.ConversionOptions = _transformations.DEFAULT_CONVERSION,
+            trace: typing.Optional[_instrumentation.Trace] = None,
+    ) -> "PropertyRetrievalResponse":
+        if self.exception_j is not None:
+            return retrieval_exception_response(query, self.exception_j, conversion)
+        return retrieval_response(query, self.value_j, conversion, trace)
+
+    def selector_id(self) -> str:
+        """The id of the selector in the header, or an empty string if there is none."""
+        header_j = self.value_j.getHeader() if self.exception_j is None else self.exception_j.getHeader()
+        if header_j is None:
+            return ''
+        selector_j = header_j.getSelector()
+        return '' if selector_j is None else str(selector_j.getId())
+
+
+def create_raw_listener(callback: typing.Callable[[RawUpdate], None]):
+    cern = _jpype_tools.cern_pkg()
+
+    def on_exception(_, __, exception_j: "cern.japc.core.ParameterException"):
+        callback(RawUpdate(exception_j=exception_j))
+
+    def on_val_recv(_, apv_j):
+        callback(RawUpdate(value_j=apv_j))
 
     return jp.JProxy(
         cern.japc.core.ParameterValueListener,
@@ -194,51 +1547,276 @@ def create_value_listener(query: "PropertyAccessQuery", callback: typing.Callabl
     )
 
 
-# TODO: Maybe this is not needed at all (if PropertyAccessReponse can be used for SET)?
-def create_set_value_listener(query: "PropertyAccessQuery", callback: typing.Callable[["PropertyUpdateResponse"], None]):
-    cern = _jpype_tools.cern_pkg()
+def query_name(query: "PropertyAccessQuery") -> str:
+    name = f'{query.device}/{query.prop}'
+    if query.selector:
+        name = f'{name}@{query.selector}'
+    return name
 
-    def on_exception(_, __, exception_j: "cern.japc.core.ParameterException"):
-        try:
-            # Raise a ``PropertyAccessError``, and then immediately catch it and present it to the ``PropertyUpdateResponse``.
-            # TODO: Investigate if there is a better way to construct an exception with a correct
-            #  ``__cause__`` without having to try & except like this.
-            raise pyda.data.PropertyAccessError(exception_j.getMessage()) from exception_j
-        except pyda.data.PropertyAccessError as error:
-            response = pyda.data.PropertyUpdateResponse(
-                query=query,
-                exception=error,
-            )
-            callback(response)
 
-    def on_val_recv(_, apv_j):
-        selector = apv_j.getHeader().getSelector().getId()
-        header = pyda.data.UpdateHeader(selector)
-        response = pyda.data.PropertyUpdateResponse(
-            query=query,
-            header=header,
-        )
-        callback(response)
+class _PendingRequest(typing.NamedTuple):
+    #: The selector of the request, if it can be answered through the shared listener.
+    selector_id: typing.Optional[str]
+    query: "PropertyAccessQuery"
+    callback: typing.Callable[[typing.Any], None]
+    #: Extra arguments for building the value response (e.g. conversion options).
+    response_args: typing.Tuple[typing.Any, ...]
 
+
+def _listener_proxy(
+        on_value: typing.Callable[[str, "cern.japc.core.AcquiredParameterValue"], None],
+        on_exception: typing.Callable[[str, str, "cern.japc.core.ParameterException"], None],
+) -> "cern.japc.core.ParameterValueListener":
+    cern = _jpype_tools.cern_pkg()
     return jp.JProxy(
         cern.japc.core.ParameterValueListener,
         {
             'exceptionOccured': on_exception,
-            'valueReceived': on_val_recv
+            'valueReceived': on_value,
         }
     )
 
 
+class ListenerDispatcher:
+    """
+    The JAPC ``ParameterValueListener`` of one-shot requests, sharing a single, long-lived one where possible.
+
+    Rather than creating a new ``JProxy`` per request, gets are registered
+    in a correlation table keyed by the JAPC parameter name, and answered
+    through a shared listener in the order they were issued. The callback
+    only tells the parameter, and the value header tells neither the data
+    filter nor the requested selector (e.g. a ``.ALL`` selector is answered
+    with a more specific one), so only requests without a data filter and
+    of a single selector may be pending on the shared listener for each
+    parameter. These are identical requests, answered in order.
+
+    Any other request (a different selector while some are pending, a data
+    filter, or any request if ``share`` is false, as for sets whose outcome
+    must not be swapped) gets a listener of its own.
+
+    """
+    def __init__(
+            self,
+            value_response: typing.Callable[["PropertyAccessQuery", "cern.japc.core.AcquiredParameterValue"], typing.Any],
+            exception_response: typing.Callable[["PropertyAccessQuery", "cern.japc.core.ParameterException"], typing.Any],
+            *,
+            share: bool = True,
+    ):
+        self._value_response = value_response
+        self._exception_response = exception_response
+        self._share = share
+        #: The requests pending on the shared listener, by parameter name, oldest first.
+        self._pending: typing.Dict[str, typing.List[_PendingRequest]] = {}
+        self._lock = threading.Lock()
+        self._listener_j = None
+
+    @property
+    def listener_j(self) -> "cern.japc.core.ParameterValueListener":
+        with self._lock:
+            if self._listener_j is None:
+                self._listener_j = _listener_proxy(self._on_val_recv, self._on_exception)
+            return self._listener_j
+
+    def register(
+            self,
+            param_j: "cern.japc.core.Parameter",
+            query: "PropertyAccessQuery",
+            callback: typing.Callable[[typing.Any], None],
+            *response_args: typing.Any,
+    ) -> typing.Tuple["cern.japc.core.ParameterValueListener", typing.Hashable]:
+        """
+        Register a request, returning the listener to pass to JAPC, and a
+        token with which the request can be discarded (see :meth:`discard`)
+        if it could not be issued.
+
+        Any ``response_args`` are passed on to the response builders.
+        """
+        selector_id = None
+        if self._share and not query.data_filters:
+            selector_id = str(query.selector) if query.selector else ''
+        request = _PendingRequest(selector_id, query, callback, response_args)
+        if selector_id is not None:
+            listener_j = self.listener_j
+            name = param_j.getName()
+            with self._lock:
+                pending = self._pending.setdefault(name, [])
+                if not pending or pending[0].selector_id == selector_id:
+                    pending.append(request)
+                    return listener_j, (name, request)
+        return self._request_listener(request), None
+
+    def discard(self, token: typing.Hashable) -> None:
+        if token is None:
+            # The request had a listener of its own.
+            return
+        name, request = token
+        with self._lock:
+            pending = self._pending.get(name, [])
+            for idx, candidate in enumerate(pending):
+                if candidate is request:
+                    del pending[idx]
+                    break
+            if not pending:
+                self._pending.pop(name, None)
+
+    def pending_count(self) -> int:
+        """The number of requests pending on the shared listener."""
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def _request_listener(self, request: _PendingRequest) -> "cern.japc.core.ParameterValueListener":
+        return _listener_proxy(
+            lambda _, apv_j: self._respond(request, apv_j),
+            lambda _, __, exception_j: self._respond_exception(request, exception_j),
+        )
+
+    def _respond(self, request: _PendingRequest, apv_j: "cern.japc.core.AcquiredParameterValue") -> None:
+        request.callback(self._value_response(request.query, apv_j, *request.response_args))
+
+    def _respond_exception(self, request: _PendingRequest, exception_j: "cern.japc.core.ParameterException") -> None:
+        request.callback(self._exception_response(request.query, exception_j, *request.response_args))
+
+    def _pop(self, name: str) -> typing.Optional[_PendingRequest]:
+        with self._lock:
+            pending = self._pending.get(name)
+            if not pending:
+                return None
+            request = pending.pop(0)
+            if not pending:
+                del self._pending[name]
+            return request
+
+    def _on_val_recv(self, name, apv_j):
+        request = self._pop(name)
+        if request is None:
+            warnings.warn(f'Received a value for {name} which does not correspond to a pending request')
+            return
+        self._respond(request, apv_j)
+
+    def _on_exception(self, name, _, exception_j: "cern.japc.core.ParameterException"):
+        request = self._pop(name)
+        if request is None:
+            warnings.warn(f'Received an exception for {name} which does not correspond to a pending request')
+            return
+        self._respond_exception(request, exception_j)
+
+
+class CoalescingStats(typing.NamedTuple):
+    #: The requests actually issued.
+    issued: int
+    #: The requests which were attached to an identical one in flight instead.
+    coalesced: int
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical requests, so that only one of them is issued at a time.
+
+    Requests are identified by a key. While a request is in flight, any
+    identical request is given the response of the one in flight, rather
+    than being issued. Once the response has arrived, the next request for
+    that key is issued again.
+
+    """
+    def __init__(self):
+        self._in_flight: typing.Dict[typing.Hashable, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._coalesced = 0
+
+    def submit(
+            self,
+            key: typing.Hashable,
+            issue: typing.Callable[[typing.Callable[[typing.Any], None]], None],
+    ) -> concurrent.futures.Future:
+        """
+        Return a future of the response of the request in flight for ``key``,
+        or issue a new one by calling ``issue`` with the callback to pass the
+        response to.
+
+        Each caller is given its own future, so that cancelling it doesn't
+        affect the other callers (nor the request in flight).
+
+        If ``issue`` raises, the exception is propagated, and set on the
+        future of any request which was coalesced into it in the meantime.
+        """
+        with self._lock:
+            shared = self._in_flight.get(key)
+            if shared is not None:
+                self._coalesced += 1
+                return _chained_future(shared)
+            shared = self._in_flight[key] = concurrent.futures.Future()
+            self._issued += 1
+        future = _chained_future(shared)
+        # Registered before issuing, as the response may be delivered before ``issue`` returns.
+        shared.add_done_callback(functools.partial(self._done, key))
+        try:
+            issue(shared.set_result)
+        except Exception as err:  # noqa: B902
+            shared.set_exception(err)
+            raise
+        return future
+
+    def _done(self, key: typing.Hashable, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def stats(self) -> CoalescingStats:
+        with self._lock:
+            return CoalescingStats(self._issued, self._coalesced)
+
+
+def _chained_future(source: concurrent.futures.Future) -> concurrent.futures.Future:
+    # A future resolved with the outcome of ``source``, unless it is cancelled first.
+    future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def copy_outcome(done: concurrent.futures.Future) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        error = done.exception()
+        if error is None:
+            future.set_result(done.result())
+        else:
+            future.set_exception(error)
+
+    source.add_done_callback(copy_outcome)
+    return future
+
+
 def create_data_filter(py_filter: typing.Mapping[str, typing.Any]):
     cern = _jpype_tools.cern_pkg()
     res = cern.japc.core.factory.MapParameterValueFactory.newValue()
     for key, val in py_filter.items():
-        # FIXME: This conversion needs to carefully
-        #  convert all to Java types
-        res.put(key, val)
+        spv = cern.japc.core.factory.SimpleParameterValueFactory.newValue(_jpype_tools.to_java_value(val))
+        res.put(key, spv)
     return res
 
 
+@functools.lru_cache()
+def selector_cache() -> _cache.LRUCache:
+    """
+    The cache of JAPC ``Selector`` objects (including their data filters),
+    keyed by the selector string and the canonical form of the data filter.
+    """
+    return _cache.LRUCache(maxsize=1024)
+
+
+@functools.lru_cache()
+def param_cache() -> _cache.LRUCache:
+    """
+    The cache of JAPC ``Parameter`` objects, keyed by ``"device/property"``.
+
+    The cache is shared by all providers. Its size and time-to-live can be
+    tuned through the ``maxsize`` and ``ttl`` attributes.
+    """
+    return _cache.LRUCache(maxsize=4096)
+
+
 @functools.lru_cache()
 def param_factory() -> "cern.japc.core.factory.ParameterFactory":
     cern = _jpype_tools.cern_pkg()
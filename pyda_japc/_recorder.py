@@ -0,0 +1,203 @@
+import threading
+import typing
+
+import numpy as np
+
+
+if typing.TYPE_CHECKING:
+    from pyda.data import PropertyRetrievalResponse
+
+
+class RingBuffer:
+    """
+    A fixed-capacity ring buffer of equally shaped items, readable as contiguous NumPy views.
+
+    Storage is allocated once, at twice the capacity, and every item is
+    written both at its slot and at its slot plus the capacity. The last
+    ``n`` items are therefore always a contiguous slice of the storage, and
+    can be viewed (oldest first) without copying or re-ordering.
+
+    A view of ``n`` items is not modified by the next ``capacity - n``
+    appends, after which it starts seeing newer items. Copy it if it has to
+    be kept for longer.
+
+    """
+    def __init__(self, capacity: int, dtype: typing.Any, item_shape: typing.Tuple[int, ...] = ()):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self._capacity = capacity
+        self._data = np.zeros((2 * capacity, ) + tuple(item_shape), dtype=dtype)
+        self._next = 0
+        self._count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._data.dtype
+
+    @property
+    def item_shape(self) -> typing.Tuple[int, ...]:
+        return self._data.shape[1:]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, item: typing.Any) -> None:
+        idx = self._next
+        self._data[idx] = item
+        self._data[idx + self._capacity] = item
+        self._next = (idx + 1) % self._capacity
+        self._count = min(self._count + 1, self._capacity)
+
+    def view(self, last: typing.Optional[int] = None) -> np.ndarray:
+        """A read-only view of the ``last`` items (all of them by default), oldest first."""
+        count = self._count if last is None else max(0, min(last, self._count))
+        end = self._next + self._capacity
+        result = self._data[end - count:end]
+        result.flags.writeable = False
+        return result
+
+    def clear(self) -> None:
+        self._next = 0
+        self._count = 0
+
+
+class RecordedStamps(typing.NamedTuple):
+    """The header columns of a :class:`Recorder`, oldest update first."""
+    #: The acquisition stamps (ns since the epoch).
+    acq_stamp: np.ndarray
+    #: The cycle stamps (ns since the epoch), 0 for updates which aren't cycle bound.
+    cycle_stamp: np.ndarray
+    #: The selectors, as strings ('' for no selector).
+    selector: np.ndarray
+
+
+class Recorder:
+    """
+    Record the updates of a subscription into columnar ring buffers.
+
+    Each recorded field (all of them by default, or just ``fields``) gets a
+    :class:`RingBuffer` of ``capacity`` updates, whose dtype and item shape
+    are taken from the first recorded value. Scalars give 1D columns, 1D
+    arrays give 2D columns, and so on. The acquisition stamp, cycle stamp
+    and selector of each update are recorded alongside (see :meth:`stamps`).
+
+    Attach a recorder to a stream with :meth:`JapcPropertyStream.add_recorder`,
+    or call :meth:`record` with responses directly. Exception responses are
+    not recorded, but counted in :attr:`errors`.
+
+    The views returned by :meth:`view` and :meth:`stamps` are zero-copy (see
+    :class:`RingBuffer` for how long they remain valid).
+
+    """
+    def __init__(self, capacity: int, fields: typing.Optional[typing.Iterable[str]] = None):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self._capacity = capacity
+        self._fields: typing.Optional[typing.Tuple[str, ...]] = None if fields is None else tuple(fields)
+        self._columns: typing.Dict[str, RingBuffer] = {}
+        self._acq_stamps = RingBuffer(capacity, np.int64)
+        self._cycle_stamps = RingBuffer(capacity, np.int64)
+        self._selectors = RingBuffer(capacity, object)
+        self._lock = threading.Lock()
+        #: The number of updates recorded since creation (or the last :meth:`clear`).
+        self.recorded = 0
+        #: The number of exception responses received (and not recorded).
+        self.errors = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def fields(self) -> typing.Tuple[str, ...]:
+        """The names of the recorded fields (empty until the first update if not given upfront)."""
+        if self._fields is None:
+            return tuple(self._columns)
+        return self._fields
+
+    def __len__(self) -> int:
+        return len(self._acq_stamps)
+
+    def __call__(self, response: "PropertyRetrievalResponse") -> None:
+        self.record(response)
+
+    def record(self, response: "PropertyRetrievalResponse") -> None:
+        """
+        Record one response.
+
+        A ``ValueError`` is raised (and nothing recorded) if a field is
+        missing, or if its shape differs from that of the first update.
+        """
+        if response.exception is not None:
+            with self._lock:
+                self.errors += 1
+            return
+        data = response.value
+        header = data.header
+        # Read the header before anything is recorded, so that a bad header leaves the columns aligned.
+        stamps = (
+            header.acquisition_timestamp,
+            # There is no cycle stamp for updates which aren't cycle bound.
+            header.cycle_timestamp or 0,
+            '' if header.selector is None else str(header.selector),
+        )
+        with self._lock:
+            if not self._columns:
+                self._create_columns(data)
+            values = []
+            for name, column in self._columns.items():
+                value = np.asarray(data[name])
+                if value.shape != column.item_shape:
+                    raise ValueError(
+                        f"Field {name} has shape {value.shape}, but {column.item_shape} was recorded so far",
+                    )
+                values.append((column, value))
+            for column, value in values:
+                # Unwrap scalars, which would otherwise be stored as 0d arrays in object columns.
+                column.append(value if value.ndim else value[()])
+            acq_stamp, cycle_stamp, selector = stamps
+            self._acq_stamps.append(acq_stamp)
+            self._cycle_stamps.append(cycle_stamp)
+            self._selectors.append(selector)
+            self.recorded += 1
+
+    def _create_columns(self, data: typing.Mapping[str, typing.Any]) -> None:
+        # NOTE: Must be called with the lock held.
+        for name in (data.keys() if self._fields is None else self._fields):
+            value = np.asarray(data[name])
+            # Strings are kept as Python objects, rather than fixed width unicode.
+            dtype = object if value.dtype.kind == 'U' else value.dtype
+            self._columns[name] = RingBuffer(self._capacity, dtype, value.shape)
+
+    def view(self, field: str, last: typing.Optional[int] = None) -> np.ndarray:
+        """A read-only view of the ``last`` recorded values of ``field`` (all of them by default), oldest first."""
+        with self._lock:
+            try:
+                column = self._columns[field]
+            except KeyError:
+                raise KeyError(f"Field {field} is not recorded (recorded fields: {list(self.fields)})") from None
+            return column.view(last)
+
+    def stamps(self, last: typing.Optional[int] = None) -> RecordedStamps:
+        """Read-only views of the header columns of the ``last`` recorded updates, oldest first."""
+        with self._lock:
+            return RecordedStamps(
+                self._acq_stamps.view(last),
+                self._cycle_stamps.view(last),
+                self._selectors.view(last),
+            )
+
+    def clear(self) -> None:
+        """Forget all recorded updates (the columns keep their dtype and shape)."""
+        with self._lock:
+            for column in self._columns.values():
+                column.clear()
+            self._acq_stamps.clear()
+            self._cycle_stamps.clear()
+            self._selectors.clear()
+            self.recorded = 0
+            self.errors = 0
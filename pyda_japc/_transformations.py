@@ -1,4 +1,6 @@
+import collections.abc
 import functools
+import sys
 import typing
 import warnings
 
@@ -7,10 +9,12 @@ import numpy as np
 import pyds_model as model
 import pyda.data
 
+from . import _cache
 from . import _jpype_tools
 
 
 if typing.TYPE_CHECKING:
+    from . import _instrumentation
     cern = jp.JPackage("cern")
 
 
@@ -64,18 +68,78 @@ def ValueType_to_BasicType(value_type: "cern.japc.value.ValueType") -> model.Bas
     return basic_type_lookup[value_type]
 
 
-def MapParameterValue_to_DataTypeValue(param_value: "cern.japc.value.MapParameterValue") -> model.DataTypeValue:
+#: Converts a SimpleParameterValue to Python, given whether arrays may be borrowed.
+_FieldReader = typing.Callable[["cern.japc.value.SimpleParameterValue", bool], typing.Any]
+
+
+class _Schema(typing.NamedTuple):
+    data_type: model.DataType
+    basic_types: typing.Dict[str, model.BasicType]
+    #: The field names as Python strings, in the order of the signature.
+    names: typing.Tuple[str, ...]
+    #: The converter of each field, chosen once for the schema rather than for every value.
+    readers: typing.Dict[str, _FieldReader]
+
+
+def _scalar_reader(basic_type: model.BasicType) -> _FieldReader:
+    if basic_type == model.BasicType.STRING:
+        # JPype already converts java strings to python strings for us.
+        convert = str
+    elif basic_type == model.BasicType.BOOL:
+        convert = bool
+    else:
+        # We need to convert scalars explicitly because of https://github.com/jpype-project/jpype/issues/997.
+        convert = _jpype_tools._primitive_type_to_dtype_lookup()[_BasicTypes_to_JPype_Types()[basic_type]]
+
+    def read(value, borrow_arrays):
+        return convert(value.getObject())
+    return read
+
+
+def _array_reader(basic_type: model.BasicType, rank: int) -> _FieldReader:
+    # None for non-primitive (i.e. String) arrays, which are converted element-wise.
+    dtype = _jpype_tools._primitive_type_to_dtype_lookup().get(_BasicTypes_to_JPype_Types()[basic_type])
+    jarray_to_ndarray = _jpype_tools.jarray_to_ndarray
+
+    if rank == 1:
+        def read(value, borrow_arrays):
+            return jarray_to_ndarray(value.getObject(), borrow=borrow_arrays, dtype=dtype)
+    else:
+        def read(value, borrow_arrays):
+            array_2d = value.getObject()
+            return jarray_to_ndarray(array_2d.getArray1D(), borrow=borrow_arrays, dtype=dtype) \
+                .reshape(array_2d.getRowCount(), array_2d.getColumnCount())
+    return read
+
+
+#: Bounded cache of schemas, keyed by the signature of a MapParameterValue
+#: (its field names and their ValueTypes).
+_SCHEMA_CACHE = _cache.LRUCache(maxsize=512)
+
+
+def schema_cache() -> _cache.LRUCache:
+    """
+    The cache of :class:`pyds_model.DataType` instances used by :func:`MapParameterValue_to_DataTypeValue`.
+
+    Use ``schema_cache().cache_info()`` to inspect the hit/miss counters, and
+    set ``schema_cache().maxsize`` to tune the number of schemas retained.
+    """
+    return _SCHEMA_CACHE
+
+
+def _build_schema(
+        signature: typing.Tuple[typing.Tuple[str, "cern.japc.value.ValueType"], ...],
+) -> _Schema:
     # Build a device class and property so that we can get hold of an empty
     # DataType instance (no better way currently).
     dc = model.DeviceClass.create(name='name', version='0.1')
     prop = dc.create_acquisition_property('delme')
     dtype: model.DataType = prop.data_type
+    basic_types = {}
+    readers = {}
 
     # Build up the datatype based on the given MapParameterValue types.
-    for name in param_value.getNames():
-        value: cern.japc.value.SimpleParameterValue = param_value.get(name)
-        value_type = value.getValueType()
-
+    for name, value_type in signature:
         if value_type.isArray2d():
             array_rank = 2
         elif value_type.isArray():
@@ -85,101 +149,336 @@ def MapParameterValue_to_DataTypeValue(param_value: "cern.japc.value.MapParamete
 
         basic_type = ValueType_to_BasicType(value_type.getComponentType())
         dtype.create_basic_item(name, type=basic_type, rank=array_rank)
+        basic_types[name] = basic_type
+        readers[name] = _array_reader(basic_type, array_rank) if array_rank else _scalar_reader(basic_type)
+    return _Schema(dtype, basic_types, tuple(str(name) for name, _ in signature), readers)
+
+
+def _schema_and_fields(
+        param_value: "cern.japc.value.MapParameterValue",
+        projection: typing.Optional[typing.Sequence[str]] = None,
+) -> typing.Tuple[_Schema, typing.List[typing.Tuple[str, "cern.japc.value.SimpleParameterValue"]]]:
+    if projection is None:
+        fields = [(name, param_value.get(name)) for name in param_value.getNames()]
+    else:
+        fields = [(name, param_value.get(name)) for name in projection]
+        missing = [name for name, value in fields if value is None]
+        if missing:
+            available = sorted(str(name) for name in param_value.getNames())
+            raise KeyError(f"Field(s) {', '.join(missing)} not found in {available}")
+    signature = tuple((name, value.getValueType()) for name, value in fields)
+    return _SCHEMA_CACHE.get_or_create(signature, lambda: _build_schema(signature)), fields
+
+
+def _read_only(value: typing.Any) -> typing.Any:
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    return value
+
+
+def MapParameterValue_to_DataTypeValue(
+        param_value: "cern.japc.value.MapParameterValue",
+        *,
+        borrow_arrays: bool = False,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        readonly: bool = False,
+) -> model.DataTypeValue:
+    """
+    Convert a JAPC MapParameterValue into a :class:`pyds_model.DataTypeValue`.
+
+    Arrays of primitive types are converted in bulk. If ``borrow_arrays`` is
+    true, they are not copied but are exposed as read-only views onto the
+    Java array data (see :func:`_jpype_tools.jarray_to_ndarray`), in which
+    case the caller must not hold on to them beyond processing the value.
+
+    If ``fields`` is given, only those fields are converted (and the
+    DataType only describes those fields). The other fields of the value are
+    never touched. A ``KeyError`` is raised if any of the fields is missing.
+
+    If ``readonly`` is true, the arrays are made read-only, e.g. for values
+    shared by several consumers.
+
+    The DataType and the converter of each field are only determined the
+    first time a given schema is seen (see :func:`schema_cache`).
+
+    """
+    schema, fields = _schema_and_fields(param_value, fields)
 
     # Create a DataTypeValue for the DataType we have just built-up.
     # TODO: How to determine partial-ness. Is that entirely from CCDB?
-    data = dtype.create_empty_value(accepts_partial=True)
+    data = schema.data_type.create_empty_value(accepts_partial=True)
+    readers = schema.readers
+    for name, value in fields:
+        field_value = readers[name](value, borrow_arrays)
+        data[name] = _read_only(field_value) if readonly else field_value
+    return data
 
-    cern = jp.JPackage("cern")
-    for name in param_value.getNames():
-        value: cern.japc.value.SimpleParameterValue = param_value.get(name)
-        actual_value = value.getObject()
-        if isinstance(actual_value, cern.japc.value.Array2D):
-            actual_value = np.array(actual_value.getArray1D()) \
-                .reshape(actual_value.getRowCount(), actual_value.getColumnCount())
-        elif isinstance(actual_value, jp.JArray):
-            actual_value = np.array(actual_value)
-        elif isinstance(actual_value, str):
-            # JPype already converts java strings to python strings for us.
+
+def MapParameterValue_to_dict(
+        param_value: "cern.japc.value.MapParameterValue",
+        *,
+        borrow_arrays: bool = False,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        readonly: bool = False,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Convert a JAPC MapParameterValue into a plain dict of NumPy arrays and scalars.
+
+    This skips building a :class:`pyds_model.DataTypeValue`, but is otherwise
+    the same as :func:`MapParameterValue_to_DataTypeValue`.
+    """
+    schema, fields = _schema_and_fields(param_value, fields)
+    readers = schema.readers
+    result = {py_name: readers[name](value, borrow_arrays) for py_name, (name, value) in zip(schema.names, fields)}
+    if readonly:
+        for value in result.values():
+            _read_only(value)
+    return result
+
+
+class LazyDataTypeValue(collections.abc.Mapping):
+    """
+    A read-only, :class:`pyds_model.DataTypeValue`-like mapping which converts fields on first access.
+
+    The JAPC MapParameterValue is kept, and each field is only converted to
+    Python the first time it is accessed (the result is then cached). Fields
+    which are never accessed therefore cost nothing to convert. Use
+    :meth:`to_data_type_value` to get hold of a real DataTypeValue. With
+    ``readonly``, the arrays are made read-only as they are converted.
+
+    """
+    def __init__(
+            self,
+            param_value: "cern.japc.value.MapParameterValue",
+            fields: typing.Optional[typing.Sequence[str]] = None,
+            readonly: bool = False,
+    ):
+        self._schema, fields = _schema_and_fields(param_value, fields)
+        self._readonly = readonly
+        self._fields: typing.Dict[str, "cern.japc.value.SimpleParameterValue"] = dict(fields)
+        self._converted: typing.Dict[str, typing.Any] = {}
+
+    def __getitem__(self, name: str) -> typing.Any:
+        try:
+            return self._converted[name]
+        except KeyError:
             pass
-        else:
-            # We need to special case scalars because of https://github.com/jpype-project/jpype/issues/997.
-            actual_value = _jpype_tools.jscalar_to_scalar(actual_value)
-        data[name] = actual_value
-    return data
+        value = self._schema.readers[name](self._fields[name], False)
+        if self._readonly:
+            _read_only(value)
+        self._converted[name] = value
+        return value
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._fields)
 
+    def __len__(self) -> int:
+        return len(self._fields)
 
-def DataTypeValue_to_MapParameterValue(dtv: model.DataTypeValue) -> "cern.japc.value.MapParameterValue":
+    def __contains__(self, name: object) -> bool:
+        return name in self._fields
+
+    def get_type(self, name: str) -> model.BasicType:
+        return self._schema.basic_types[name]
+
+    @property
+    def converted_fields(self) -> typing.FrozenSet[str]:
+        """The names of the fields which have been converted so far."""
+        return frozenset(self._converted)
+
+    def to_data_type_value(self) -> model.DataTypeValue:
+        data = self._schema.data_type.create_empty_value(accepts_partial=True)
+        for name in self._fields:
+            data[name] = self[name]
+        return data
+
+    def __repr__(self) -> str:
+        return f'<{type(self).__name__} fields={list(self._fields)} converted={sorted(self._converted)}>'
+
+
+#: Converts a Python value to a SimpleParameterValue, given the array pool to take Java arrays from.
+_FieldWriter = typing.Callable[[typing.Any, typing.Any], typing.Optional["cern.japc.value.SimpleParameterValue"]]
+
+
+#: Bounded cache of conversion plans for :func:`DataTypeValue_to_MapParameterValue`, keyed by
+#: the field names, BasicTypes and array ranks of a DataTypeValue.
+_WRITE_PLAN_CACHE = _cache.LRUCache(maxsize=512)
+
+
+def write_plan_cache() -> _cache.LRUCache:
+    """
+    The cache of conversion plans used by :func:`DataTypeValue_to_MapParameterValue`.
+
+    Use ``write_plan_cache().cache_info()`` to inspect the hit/miss counters.
+    """
+    return _WRITE_PLAN_CACHE
+
+
+def _field_writer(name: str, basic_type: model.BasicType, rank: int) -> _FieldWriter:
+    jp_type = _BasicTypes_to_JPype_Types()[basic_type]
+    new_value = jp.JPackage("cern").japc.core.factory.SimpleParameterValueFactory.newValue
+    ndarray_to_jarray = _jpype_tools.ndarray_to_jarray
+
+    if rank == 0:
+        def write(val, array_pool):
+            return new_value(jp_type(val))
+    elif rank == 1:
+        def write(val, array_pool):
+            return new_value(ndarray_to_jarray(val, jp_type, array_pool=array_pool))
+    elif rank == 2:
+        shape_type = jp.JArray(jp.JInt)
+
+        def write(val, array_pool):
+            return new_value(ndarray_to_jarray(val, jp_type, array_pool=array_pool), shape_type(val.shape))
+    else:
+        def write(val, array_pool):
+            warnings.warn(f'Unsupported number of dimensions ({rank}) in array "{name}". Won\'t be transformed.')
+            return None
+    return write
+
+
+def _build_write_plan(
+        signature: typing.Tuple[typing.Tuple[str, model.BasicType, int], ...],
+) -> typing.Tuple[_FieldWriter, ...]:
+    return tuple(_field_writer(name, basic_type, rank) for name, basic_type, rank in signature)
+
+
+def DataTypeValue_to_MapParameterValue(
+        dtv: model.DataTypeValue,
+        *,
+        array_pool: typing.Union[_jpype_tools.JavaArrayPool, _jpype_tools.JavaArrayLease, None] = None,
+) -> "cern.japc.value.MapParameterValue":
+    """
+    Convert a :class:`pyds_model.DataTypeValue` into a JAPC MapParameterValue.
+
+    Arrays are bulk copied into primitive Java arrays. These are taken from
+    ``array_pool`` if given, in which case they must not be released back to
+    the pool until the returned value is no longer in use.
+
+    The converter of each field is chosen once per combination of field
+    names, types and array ranks (see :func:`write_plan_cache`).
+
+    """
     cern = jp.JPackage("cern")
     mpv = cern.japc.core.factory.MapParameterValueFactory.newValue()
-    for name, val in dtv.items():
-        basic_type = dtv.get_type(name)
-        jp_type = _BasicTypes_to_JPype_Types()[basic_type]
-        if isinstance(val, np.ndarray):
-            jarr = jp.JArray(jp_type, 1)(val.flatten())
-            if val.ndim == 1:
-                spv = cern.japc.core.factory.SimpleParameterValueFactory.newValue(jarr)
-            elif val.ndim == 2:
-                shape = jp.JArray(jp.JInt)(val.shape)
-                spv = cern.japc.core.factory.SimpleParameterValueFactory.newValue(jarr, shape)
-            else:
-                warnings.warn(f'Unsupported number of dimensions ({val.ndim}) in array "{name}". Won\'t be transformed.')
-        else:
-            jval = jp_type(val)
-            spv = cern.japc.core.factory.SimpleParameterValueFactory.newValue(jval)
-        mpv.put(name, spv)
+    items = list(dtv.items())
+    signature = tuple(
+        (name, dtv.get_type(name), val.ndim if isinstance(val, np.ndarray) else 0)
+        for name, val in items
+    )
+    plan = _WRITE_PLAN_CACHE.get_or_create(signature, lambda: _build_write_plan(signature))
+    for (name, val), write in zip(items, plan):
+        spv = write(val, array_pool)
+        if spv is not None:
+            mpv.put(name, spv)
     return mpv
 
 
+class _HeaderContexts(typing.NamedTuple):
+    """The context constructors for the headers of one selector (see :func:`_header_contexts`)."""
+    #: The interned selector id.
+    selector: str
+    #: Whether acquisitions are cycle bound, i.e. whether they need the cycle stamp.
+    cycle_bound: bool
+    #: Called with ``acquisition_stamp`` (and ``cycle_stamp`` if ``cycle_bound``).
+    acquisition: typing.Callable[..., model.AnyContext]
+    #: Called with ``acquisition_stamp`` and ``set_stamp``.
+    setting: typing.Callable[..., model.AnyContext]
+
+
+@functools.lru_cache(maxsize=1024)
+def _header_contexts(selector: str) -> _HeaderContexts:
+    # There are few distinct selectors (in the order of the number of timing
+    # users), so the selector id is interned and the context constructors
+    # bound to it once, rather than on every update.
+    selector = sys.intern(selector)
+    if not selector:
+        return _HeaderContexts(selector, False, model.AcquisitionContext, model.SettingContext)
+    return _HeaderContexts(
+        selector,
+        True,
+        functools.partial(model.CycleBoundAcquisitionContext, selector=selector),
+        functools.partial(model.MultiplexedSettingContext, selector=selector),
+    )
+
+
+def ValueHeader_to_notification_type(header: "cern.japc.core.ValueHeader") -> str:
+    # TODO: Use the Enum from DSF for this once mapped.
+    # TOOD: We need to be more nuanced than this. It could equally be SERVER_UPDATE.
+    return 'FIRST_UPDATE' if header.isFirstUpdate() else 'SETTING_UPDATE'
+
+
 def ValueHeader_to_ctx_notif_pair(
         header: "cern.japc.core.ValueHeader"
 ) -> typing.Tuple[model.AnyContext, str]:
     # TODO: The logic in this function to be reviewed by a DSF & JAPC expert.
+    notification_type = ValueHeader_to_notification_type(header)
 
-    if header.isFirstUpdate():
-        # TODO: Use the Enum from DSF for this once mapped.
-        notification_type = 'FIRST_UPDATE'
+    # This is called for every update, so it makes as few calls into Java as
+    # possible: the cycle stamp is only fetched for cycle bound acquisitions,
+    # and everything derived from the selector is cached (see _header_contexts).
+    acq_stamp = int(header.getAcqStamp())
+    set_stamp = int(header.getSetStamp())
+    contexts = _header_contexts(str(header.getSelector().getId()))
+
+    if set_stamp != 0:
+        context = contexts.setting(acquisition_stamp=acq_stamp, set_stamp=set_stamp)
+    elif contexts.cycle_bound:
+        context = contexts.acquisition(acquisition_stamp=acq_stamp, cycle_stamp=int(header.getCycleStamp()))
     else:
-        # TOOD: We need to be more nuanced than this. It could equally be SERVER_UPDATE.
-        notification_type = 'SETTING_UPDATE'
+        context = contexts.acquisition(acquisition_stamp=acq_stamp)
+    return context, notification_type
 
+
+def ValueHeader_to_stamps(header: "cern.japc.core.ValueHeader") -> typing.Tuple[int, int, int, str]:
+    """
+    The acquisition, cycle and set stamps, and the selector of a header,
+    without building a context (see :func:`ValueHeader_to_ctx_notif_pair`).
+
+    The cycle stamp is 0 for headers without a selector and for settings.
+    """
     acq_stamp = int(header.getAcqStamp())
     set_stamp = int(header.getSetStamp())
+    contexts = _header_contexts(str(header.getSelector().getId()))
+    cycle_stamp = int(header.getCycleStamp()) if contexts.cycle_bound and set_stamp == 0 else 0
+    return acq_stamp, cycle_stamp, set_stamp, contexts.selector
 
-    selector = header.getSelector().getId()
-    has_selector = selector != ''
 
-    if not has_selector:
-        if set_stamp == 0:
-            context = model.AcquisitionContext(
-                acquisition_stamp=acq_stamp,
-            )
-        else:
-            context = model.SettingContext(
-                acquisition_stamp=acq_stamp,
-                set_stamp=set_stamp,
-            )
-    else:
-        if set_stamp == 0:
-            context = model.CycleBoundAcquisitionContext(
-                acquisition_stamp=acq_stamp,
-                selector=selector,
-                cycle_stamp=int(header.getCycleStamp()),
-            )
-        else:
-            context = model.MultiplexedSettingContext(
-                acquisition_stamp=acq_stamp,
-                selector=selector,
-                set_stamp=set_stamp,
-            )
-    return context, notification_type
+class ConversionOptions(typing.NamedTuple):
+    """Options controlling how acquired values are converted to Python."""
+    #: Read-only views onto the Java array data instead of copies (see :func:`MapParameterValue_to_DataTypeValue`).
+    borrow_arrays: bool = False
+    #: Convert fields on first access (see :class:`LazyDataTypeValue`).
+    lazy: bool = False
+    #: Only convert these fields, if given (see :func:`MapParameterValue_to_DataTypeValue`).
+    fields: typing.Optional[typing.Tuple[str, ...]] = None
+    #: Deliver compact records rather than pyda responses (see :meth:`JapcProvider.get_raw`).
+    raw: bool = False
+    #: Make the arrays read-only, for values shared by several consumers.
+    readonly: bool = False
+
+
+DEFAULT_CONVERSION = ConversionOptions()
 
 
 def AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(
-        apv: "cern.japc.core.AcquiredParameterValue"
+        apv: "cern.japc.core.AcquiredParameterValue",
+        *,
+        borrow_arrays: bool = False,
+        lazy: bool = False,
+        fields: typing.Optional[typing.Sequence[str]] = None,
+        readonly: bool = False,
+        trace: typing.Optional["_instrumentation.Trace"] = None,
 ) -> typing.Tuple[pyda.data.AcquiredPropertyData, str]:
     ctx, notification_type = ValueHeader_to_ctx_notif_pair(apv.getHeader())
+    if trace is not None:
+        trace.mark('header')
     value_j = apv.getValue()
-    dtv = MapParameterValue_to_DataTypeValue(value_j)
+    if lazy:
+        dtv = LazyDataTypeValue(value_j, fields, readonly=readonly)
+    else:
+        dtv = MapParameterValue_to_DataTypeValue(value_j, borrow_arrays=borrow_arrays, fields=fields, readonly=readonly)
+    if trace is not None:
+        trace.mark('value')
     header = pyda.data.Header(ctx)
     return pyda.data.AcquiredPropertyData(dtv, header), notification_type
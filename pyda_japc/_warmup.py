@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+import typing
+
+import jpype as jp
+import numpy as np
+
+from . import _jpype_tools
+from . import _provider
+from . import _transformations
+
+
+_LOG = logging.getLogger(__name__)
+
+#: The Java classes used when getting, setting and subscribing (see :func:`warmup`).
+_CLASSES = (
+    'cern.japc.core.AcquiredParameterValue',
+    'cern.japc.core.Parameter',
+    'cern.japc.core.ParameterException',
+    'cern.japc.core.ParameterValueListener',
+    'cern.japc.core.Selectors',
+    'cern.japc.core.ValueHeader',
+    'cern.japc.core.factory.AcquiredParameterValueFactory',
+    'cern.japc.core.factory.MapParameterValueFactory',
+    'cern.japc.core.factory.ParameterFactory',
+    'cern.japc.core.factory.SelectorFactory',
+    'cern.japc.core.factory.SimpleParameterValueFactory',
+    'cern.japc.core.factory.ValueHeaderFactory',
+    'cern.japc.value.Array2D',
+    'cern.japc.value.MapParameterValue',
+    'cern.japc.value.SimpleParameterValue',
+    'cern.japc.value.ValueType',
+)
+
+_WARMUP_SELECTOR = 'WARMUP.USER.ALL'
+
+
+class WarmupReport(typing.NamedTuple):
+    """The time (in s) spent in each step of :func:`warmup`."""
+    jvm: float
+    classes: float
+    caches: float
+    conversions: float
+
+    @property
+    def total(self) -> float:
+        return self.jvm + self.classes + self.caches + self.conversions
+
+
+_LOCK = threading.Lock()
+_REPORT: typing.Optional[WarmupReport] = None
+_THREAD: typing.Optional[threading.Thread] = None
+
+
+def warmup(*, iterations: int = 100) -> WarmupReport:
+    """
+    Pay the one-off startup costs of pyda_japc upfront, rather than on the first request.
+
+    This starts the JVM, loads the Java classes used by the provider,
+    fills the lookup tables, and runs every conversion path (all value
+    types, as scalars, 1D and 2D arrays, in both directions, as well as
+    the header conversion) ``iterations`` times so that it is JIT compiled.
+
+    Only the first call does the work, later calls (including concurrent
+    ones, e.g. while :func:`warmup_in_background` is running) wait for it
+    to be done and return the same report. No parameter is created, and no
+    device or service is contacted.
+
+    """
+    global _REPORT
+    with _LOCK:
+        if _REPORT is not None:
+            return _REPORT
+
+        start = time.perf_counter()
+        _jpype_tools.cern_pkg()
+        jvm_done = time.perf_counter()
+
+        for name in _CLASSES:
+            try:
+                jp.JClass(name)
+            except Exception:  # noqa: B902
+                # A class missing from the classpath will fail in the same way on first use, don't fail here.
+                _LOG.debug("Could not load %s", name, exc_info=True)
+        classes_done = time.perf_counter()
+
+        _transformations._ValueTypes_To_BasicTypes()
+        _transformations._BasicTypes_to_JPype_Types()
+        _jpype_tools._scalar_to_dtype_lookup()
+        _jpype_tools._primitive_array_to_dtype_lookup()
+        _jpype_tools._primitive_type_to_dtype_lookup()
+        _provider.param_cache()
+        _provider.selector_cache()
+        caches_done = time.perf_counter()
+
+        _warm_conversions(iterations)
+        conversions_done = time.perf_counter()
+
+        _REPORT = WarmupReport(
+            jvm=jvm_done - start,
+            classes=classes_done - jvm_done,
+            caches=caches_done - classes_done,
+            conversions=conversions_done - caches_done,
+        )
+        _LOG.debug("Warm-up done in %.2f s: %s", _REPORT.total, _REPORT)
+        return _REPORT
+
+
+def warmup_in_background(*, iterations: int = 100) -> threading.Thread:
+    """
+    Run :func:`warmup` in a daemon thread, returning the (started) thread.
+
+    Only one thread is ever started. The JVM is started from that thread,
+    so this should be called before anything else uses the JVM.
+    """
+    global _THREAD
+    with _LOCK:
+        if _THREAD is None:
+            _THREAD = threading.Thread(
+                target=_warmup_logging_errors,
+                kwargs={'iterations': iterations},
+                name='pyda_japc.warmup',
+                daemon=True,
+            )
+            _THREAD.start()
+        return _THREAD
+
+
+def _warmup_logging_errors(iterations: int) -> None:
+    try:
+        warmup(iterations=iterations)
+    except Exception:  # noqa: B902
+        # The first request will fail in the same way, and report it to the caller.
+        _LOG.exception("Background warm-up of pyda_japc failed")
+
+
+def _warm_conversions(iterations: int) -> None:
+    cern = _jpype_tools.cern_pkg()
+    factory = cern.japc.core.factory
+    new_value = factory.SimpleParameterValueFactory.newValue
+
+    mpv = factory.MapParameterValueFactory.newValue()
+    for jp_type, dtype in [
+        (jp.JBoolean, np.bool_), (jp.JByte, np.int8), (jp.JShort, np.int16), (jp.JInt, np.int32),
+        (jp.JLong, np.int64), (jp.JFloat, np.float32), (jp.JDouble, np.float64), (jp.JString, str),
+    ]:
+        name = jp_type.__name__
+        data = np.arange(6).astype(dtype)
+        mpv.put(f'{name}_scalar', new_value(jp_type(data[1].item())))
+        mpv.put(f'{name}_1d', new_value(jp.JArray(jp_type)(data)))
+        mpv.put(f'{name}_2d', new_value(jp.JArray(jp_type)(data), jp.JArray(jp.JInt)([2, 3])))
+
+    headers = [
+        factory.ValueHeaderFactory.newAcquisitionRegularUpdateHeader(1, 0, ''),
+        factory.ValueHeaderFactory.newAcquisitionRegularUpdateHeader(1, 2, _WARMUP_SELECTOR),
+        factory.ValueHeaderFactory.newSettingFirstUpdateHeader(1, 2, ''),
+        factory.ValueHeaderFactory.newSettingImmediateUpdateHeader(1, 2, _WARMUP_SELECTOR),
+    ]
+    apv = factory.AcquiredParameterValueFactory.newAcquiredParameterValue('warmup/warmup', headers[1], mpv)
+
+    for _ in range(iterations):
+        dtv = _transformations.MapParameterValue_to_DataTypeValue(mpv)
+        _transformations.DataTypeValue_to_MapParameterValue(dtv)
+        _transformations.LazyDataTypeValue(mpv).to_data_type_value()
+        _transformations.MapParameterValue_to_dict(mpv)
+        _transformations.AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(apv)
+        for header in headers:
+            _transformations.ValueHeader_to_ctx_notif_pair(header)
+            _transformations.ValueHeader_to_stamps(header)
+
+    # The first JProxy of an interface is costly to create.
+    _provider.create_raw_listener(lambda update: None)
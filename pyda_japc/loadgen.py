@@ -0,0 +1,328 @@
+"""
+Sustained load generator for :class:`pyda_japc.JapcProvider`, running against mocked JAPC parameters.
+
+N parameters are mocked with japc-ext-mockito and published on a mocked
+supercycle. They are then subscribed to, and get/set at configurable rates,
+through a ``JapcProvider``, while throughput, latency percentiles, dropped
+updates, GIL contention and Java heap usage are reported at regular
+intervals::
+
+    python -m pyda_japc.loadgen --parameters 200 --cycle-ms 100 --get-rate 500 --set-rate 50 --duration 60
+
+No real device is accessed. Use ``--json`` to store the reports.
+
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import typing
+
+import cmmnbuild_dep_manager
+import jpype as jp
+import numpy as np
+import pyda.data
+
+from . import _instrumentation
+from . import _jpype_tools
+from . import _pipeline
+from ._provider import JapcProvider
+
+
+def _parse_args(argv: typing.Optional[typing.Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m pyda_japc.loadgen', description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--parameters', type=int, default=100, help="the number of mocked parameters")
+    parser.add_argument('--fields', type=int, default=10, help="the number of scalar fields of each parameter")
+    parser.add_argument('--array-size', type=int, default=0, help="the size of an extra array field (0 for none)")
+    parser.add_argument(
+        '--subscribe', type=int, default=None,
+        help="the number of parameters to subscribe to (default: all of them)",
+    )
+    parser.add_argument('--cycle-ms', type=int, default=1000, help="the length of the mocked cycle, in ms")
+    parser.add_argument('--selector', default='LOADGEN.USER.ALL', help="the selector of the mocked cycle")
+    parser.add_argument('--get-rate', type=float, default=0, help="gets per second, over all parameters")
+    parser.add_argument('--set-rate', type=float, default=0, help="sets per second, over all parameters")
+    parser.add_argument(
+        '--pipeline-workers', type=int, default=0,
+        help="convert updates on a ConversionPipeline with this many workers (default: on the JAPC threads)",
+    )
+    parser.add_argument('--duration', type=float, default=30, help="the duration of the run, in s")
+    parser.add_argument('--interval', type=float, default=5, help="the reporting interval, in s")
+    parser.add_argument('--json', metavar='PATH', help="store the reports in this JSON file")
+    return parser.parse_args(argv)
+
+
+class _Counters:
+    """The counts and latencies of one reporting interval, shared between the load and the reporting threads."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.updates = 0
+        self.gets = 0
+        self.sets = 0
+        self.errors = 0
+        self.get_latency = _instrumentation.Histogram()
+        self.set_latency = _instrumentation.Histogram()
+
+    def update_received(self, response: "pyda.data.PropertyRetrievalResponse") -> None:
+        with self._lock:
+            self.updates += 1
+            if response.exception is not None:
+                self.errors += 1
+
+    def request_done(self, kind: str, start_ns: int, future) -> None:
+        latency = time.perf_counter_ns() - start_ns
+        failed = future.exception() is not None or future.result().exception is not None
+        with self._lock:
+            if kind == 'get':
+                self.gets += 1
+                self.get_latency.record(latency)
+            else:
+                self.sets += 1
+                self.set_latency.record(latency)
+            if failed:
+                self.errors += 1
+
+    def take(self) -> typing.Dict[str, typing.Any]:
+        """The counters accumulated since the last call."""
+        with self._lock:
+            result = {
+                'updates': self.updates,
+                'gets': self.gets,
+                'sets': self.sets,
+                'errors': self.errors,
+                'get_latency': self.get_latency.summary(),
+                'set_latency': self.set_latency.summary(),
+            }
+            self._reset()
+        return result
+
+
+class _GilProbe(threading.Thread):
+    """
+    Estimate GIL contention, by measuring how late a thread sleeping for 1 ms wakes up.
+
+    The lateness is dominated by the time spent waiting for the GIL to be
+    released by the other threads (it also includes OS scheduling jitter).
+    """
+    _SLEEP = 0.001
+
+    def __init__(self, stop: threading.Event):
+        super().__init__(name='pyda_japc.loadgen.gil_probe', daemon=True)
+        self._stop_event = stop
+        self._lock = threading.Lock()
+        self._lateness = _instrumentation.Histogram()
+
+    def run(self) -> None:
+        sleep_ns = int(self._SLEEP * 1e9)
+        while not self._stop_event.is_set():
+            start = time.perf_counter_ns()
+            time.sleep(self._SLEEP)
+            lateness = time.perf_counter_ns() - start - sleep_ns
+            with self._lock:
+                self._lateness.record(lateness)
+
+    def take(self) -> _instrumentation.HistogramSummary:
+        with self._lock:
+            lateness, self._lateness = self._lateness, _instrumentation.Histogram()
+        return lateness.summary()
+
+
+def _paced(stop: threading.Event, rate: float, action: typing.Callable[[], None]) -> None:
+    # Call action ``rate`` times per second (on average) until stopped.
+    period = 1 / rate
+    deadline = time.perf_counter()
+    while not stop.is_set():
+        action()
+        deadline += period
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            stop.wait(delay)
+        elif delay < -1:
+            # More than a second behind: don't try to catch up in one burst.
+            deadline = time.perf_counter()
+
+
+def _start_jvm() -> None:
+    mgr = cmmnbuild_dep_manager.Manager()
+    if not mgr.is_resolved():
+        mgr.resolve()
+    if not jp.isJVMStarted():
+        mgr.start_jpype_jvm()
+
+
+def _mock_parameters(
+        cern, mock, args: argparse.Namespace,
+) -> typing.Tuple[typing.List["pyda.data.PropertyAccessQuery"], typing.List["cern.japc.core.Parameter"]]:
+    factory = cern.japc.core.factory
+    simple = cern.japc.value.spi.value.simple
+    header = factory.ValueHeaderFactory.newAcquisitionRegularUpdateHeader(0, 0, args.selector)
+    names = [f'field_{idx}' for idx in range(args.fields)]
+    values = [simple.DoubleValue(float(idx)) for idx in range(args.fields)]
+    if args.array_size:
+        names.append('array')
+        values.append(simple.DoubleArrayValue(np.linspace(0, 1, args.array_size)))
+    mpv = mock.mpv(names, values)
+
+    queries, params = [], []
+    for idx in range(args.parameters):
+        device, prop = f'LoadGenDevice{idx}', 'Acquisition'
+        param = mock.mockParameter(f'{device}/{prop}')
+        params.append(param)
+        apv = factory.AcquiredParameterValueFactory.newAcquiredParameterValue(f'{device}/{prop}', header, mpv)
+        mock.whenGetValueThen(param, mock.sel(args.selector), apv)
+        queries.append(
+            pyda.data.PropertyAccessQuery(device=device, prop=prop, selector=args.selector, data_filters=None),
+        )
+    return queries, params
+
+
+def _setting_value(args: argparse.Namespace) -> typing.Dict[str, typing.Any]:
+    value: typing.Dict[str, typing.Any] = {f'field_{idx}': float(idx) for idx in range(args.fields)}
+    if args.array_size:
+        value['array'] = np.linspace(0, 1, args.array_size)
+    return value
+
+
+def _summary_ms(summary: _instrumentation.HistogramSummary) -> typing.Dict[str, float]:
+    return {'p50': summary.p50 / 1e6, 'p99': summary.p99 / 1e6, 'max': summary.max / 1e6}
+
+
+def _format(report: typing.Dict[str, typing.Any]) -> str:
+    def latency(name):
+        summary = report[name]
+        return f"{summary['p50']:.2f}/{summary['p99']:.2f}"
+    return (
+        f"[{report['elapsed_s']:7.1f} s] "
+        f"updates/s {report['updates_per_s']:8.1f}  gets/s {report['gets_per_s']:7.1f}  "
+        f"sets/s {report['sets_per_s']:7.1f}  "
+        f"get p50/p99 {latency('get_latency_ms')} ms  set p50/p99 {latency('set_latency_ms')} ms  "
+        f"dropped {report['dropped']}  errors {report['errors']}  "
+        f"GIL wait p99 {report['gil_wait_ms']['p99']:.2f} ms  "
+        f"heap {report['java_heap_used_mb']:.0f}/{report['java_heap_max_mb']:.0f} MB"
+    )
+
+
+def run(args: argparse.Namespace) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Run the load described by ``args``, printing and returning one report per interval."""
+    _start_jvm()
+    cern = _jpype_tools.cern_pkg()
+    mock = cern.japc.ext.mockito.JapcMock
+    runtime = jp.java.lang.Runtime.getRuntime()
+    mockito = jp.JClass('org.mockito.Mockito')
+
+    pipeline = _pipeline.ConversionPipeline(args.pipeline_workers) if args.pipeline_workers else None
+    provider = JapcProvider(conversion_pipeline=pipeline)
+    provider.enable_instrumentation()
+    counters = _Counters()
+    stop = threading.Event()
+    gil_probe = _GilProbe(stop)
+    threads = [gil_probe]
+    reports = []
+    subscriptions = []
+
+    mock.mockAllServices()
+    supercycle = mock.newSuperCycle(cern.japc.ext.mockito.Cycle(args.selector, args.cycle_ms))
+    try:
+        queries, params = _mock_parameters(cern, mock, args)
+        n_subscribed = len(queries) if args.subscribe is None else args.subscribe
+        for query in queries[:n_subscribed]:
+            subscription = provider.subscribe_sink(query, counters.update_received)
+            subscription.start()
+            subscriptions.append(subscription)
+
+        def request(kind: str, submit: typing.Callable[["pyda.data.PropertyAccessQuery"], typing.Any]):
+            position = [0]
+
+            def action():
+                query = queries[position[0] % len(queries)]
+                position[0] += 1
+                start = time.perf_counter_ns()
+                future = submit(query)
+                future.add_done_callback(lambda done: counters.request_done(kind, start, done))
+            return action
+
+        setting_value = _setting_value(args)
+
+        # Through the provider's public non-blocking API, one request per batch.
+        def get(query):
+            return provider.get_many([query]).futures[0]
+
+        def set_(query):
+            return provider.set_many([(query, setting_value)]).futures[0]
+
+        if args.get_rate:
+            threads.append(threading.Thread(
+                target=_paced, args=(stop, args.get_rate, request('get', get)), daemon=True,
+            ))
+        if args.set_rate:
+            threads.append(threading.Thread(
+                target=_paced, args=(stop, args.set_rate, request('set', set_)), daemon=True,
+            ))
+
+        supercycle.start()
+        for thread in threads:
+            thread.start()
+        start = last = time.perf_counter()
+        dropped_before = 0
+        while True:
+            remaining = args.duration - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            time.sleep(min(args.interval, remaining))
+            now = time.perf_counter()
+            period, last = now - last, now
+            counts = counters.take()
+            # The mocked parameters record all their invocations, which would
+            # otherwise grow the Java heap for the whole run.
+            mockito.clearInvocations(*params)
+            dropped = sum(stats.dropped for stats in pipeline.stats()) if pipeline is not None else 0
+            report = {
+                'elapsed_s': now - start,
+                'updates_per_s': counts['updates'] / period,
+                'gets_per_s': counts['gets'] / period,
+                'sets_per_s': counts['sets'] / period,
+                'get_latency_ms': _summary_ms(counts['get_latency']),
+                'set_latency_ms': _summary_ms(counts['set_latency']),
+                'provider_stages_ms': {
+                    stage: _summary_ms(summary) for stage, summary in provider.latency_totals().items()
+                },
+                'dropped': dropped - dropped_before,
+                'errors': counts['errors'],
+                'gil_wait_ms': _summary_ms(gil_probe.take()),
+                'java_heap_used_mb': (runtime.totalMemory() - runtime.freeMemory()) / 2 ** 20,
+                'java_heap_max_mb': runtime.maxMemory() / 2 ** 20,
+            }
+            dropped_before = dropped
+            provider.reset_latency_report()
+            reports.append(report)
+            print(_format(report), flush=True)
+    finally:
+        stop.set()
+        for thread in threads:
+            if thread.is_alive():
+                thread.join()
+        supercycle.stop()
+        for subscription in subscriptions:
+            subscription.stop()
+        if pipeline is not None:
+            pipeline.shutdown()
+        mock.resetToDefault()
+        mock.mockNoService()
+    return reports
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    reports = run(args)
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'args': vars(args), 'reports': reports}, fh, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
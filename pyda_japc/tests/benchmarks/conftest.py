@@ -0,0 +1,145 @@
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import typing
+
+import jpype as jp
+import numpy as np
+import pytest
+
+import pyda_japc
+
+
+#: The results of all benchmarks run in the session, written out as JSON at the end of it.
+_RESULTS: typing.List["BenchmarkResult"] = []
+
+
+def pytest_collection_modifyitems(config, items):
+    # Benchmarks are slow and only meaningful on a quiet machine, so they are
+    # opt-in: set PYDA_JAPC_BENCHMARKS=1 to run them.
+    if os.environ.get('PYDA_JAPC_BENCHMARKS'):
+        return
+    skip = pytest.mark.skip(reason="Benchmarks only run if PYDA_JAPC_BENCHMARKS is set")
+    for item in items:
+        if 'benchmarks' in item.nodeid.split('/'):
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    # Set PYDA_JAPC_BENCHMARK_JSON to a file name to store the results, e.g.
+    # to compare them release over release.
+    path = os.environ.get('PYDA_JAPC_BENCHMARK_JSON')
+    if not path or not _RESULTS:
+        return
+    document = {
+        'metadata': {
+            'pyda_japc': pyda_japc.__version__,
+            'python': sys.version,
+            'numpy': np.__version__,
+            'jpype': jp.__version__,
+            'platform': platform.platform(),
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        'results': [result._asdict() for result in _RESULTS],
+    }
+    with open(path, 'w') as fh:
+        json.dump(document, fh, indent=2)
+
+
+class BenchmarkResult(typing.NamedTuple):
+    #: The test which ran the benchmark.
+    test: str
+    name: str
+    params: typing.Dict[str, typing.Any]
+    repeats: int
+    #: Latencies are per operation (i.e. divided by the batch size), in ns.
+    mean_ns: float
+    p50_ns: float
+    p99_ns: float
+    min_ns: float
+    max_ns: float
+    ops_per_s: float
+    #: The peak traced memory allocated during one call.
+    alloc_peak_bytes: int
+    #: The traced memory still allocated after one call, while its result is alive.
+    alloc_retained_bytes: int
+
+
+class Bench:
+    """Time a callable and record the result (see :func:`bench`)."""
+    def __init__(self, test: str):
+        self._test = test
+
+    def __call__(
+            self,
+            name: str,
+            fn: typing.Callable[[], typing.Any],
+            *,
+            repeats: int = 100,
+            batch: int = 1,
+            **params: typing.Any,
+    ) -> BenchmarkResult:
+        """
+        Run ``fn`` once to warm up, then ``repeats`` times timing each call,
+        and once more tracing its memory allocations.
+
+        If each call performs ``batch`` operations (e.g. ``batch`` gets), the
+        latencies and throughput are reported per operation. Any ``params``
+        are stored alongside the result, to tell the variants of a benchmark
+        apart.
+
+        """
+        fn()
+        latencies = np.empty(repeats, dtype=np.int64)
+        for idx in range(repeats):
+            start = time.perf_counter_ns()
+            fn()
+            latencies[idx] = time.perf_counter_ns() - start
+        per_op = latencies / batch
+
+        tracemalloc.start()
+        try:
+            result = fn()
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+
+        benchmark = BenchmarkResult(
+            test=self._test,
+            name=name,
+            params=params,
+            repeats=repeats,
+            mean_ns=float(per_op.mean()),
+            p50_ns=float(np.percentile(per_op, 50)),
+            p99_ns=float(np.percentile(per_op, 99)),
+            min_ns=float(per_op.min()),
+            max_ns=float(per_op.max()),
+            ops_per_s=float(batch * repeats / (latencies.sum() / 1e9)),
+            alloc_peak_bytes=peak,
+            alloc_retained_bytes=retained,
+        )
+        _RESULTS.append(benchmark)
+        params_repr = ', '.join(f'{key}={value}' for key, value in params.items())
+        print(
+            f"\n{name}({params_repr}): p50 {benchmark.p50_ns / 1e3:.1f} us, p99 {benchmark.p99_ns / 1e3:.1f} us, "
+            f"{benchmark.ops_per_s:.0f} ops/s, peak alloc {peak / 1e6:.2f} MB",
+        )
+        return benchmark
+
+
+@pytest.fixture
+def bench(request) -> Bench:
+    """
+    Time a callable, reporting p50/p99 latency, throughput and allocations::
+
+        def test_bench_something(bench):
+            result = bench('something', lambda: do_something(), repeats=100, size=10)
+
+    All results are stored as JSON if ``PYDA_JAPC_BENCHMARK_JSON`` is set.
+    """
+    return Bench(request.node.nodeid)
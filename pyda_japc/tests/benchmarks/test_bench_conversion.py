@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import pyda_japc._transformations as trans
+
+
+#: The number of elements converted by one benchmark call is capped, to keep the run time sane.
+MAX_ELEMENTS = 10 ** 7
+
+
+@pytest.fixture(params=[1, 10, 100], ids=lambda n: f'{n}_fields')
+def n_fields(request):
+    return request.param
+
+
+@pytest.fixture(params=[0, 10, 1_000, 1_000_000], ids=lambda n: 'scalar' if not n else f'{n}_elements')
+def size(request):
+    return request.param
+
+
+@pytest.fixture
+def mpv(japc_mock, cern, n_fields, size):
+    """A value of ``n_fields`` fields, each a double or an array of ``size`` doubles."""
+    if n_fields * size > MAX_ELEMENTS:
+        pytest.skip(f"More than {MAX_ELEMENTS} elements")
+    simple = cern.japc.value.spi.value.simple
+    names, values = [], []
+    for idx in range(n_fields):
+        names.append(f"field_{idx}")
+        if size:
+            values.append(simple.DoubleArrayValue(np.linspace(0, 1, size)))
+        else:
+            values.append(simple.DoubleValue(float(idx)))
+    return japc_mock.mpv(names, values)
+
+
+def _repeats(n_fields, size):
+    return int(np.clip(MAX_ELEMENTS // (10 * n_fields * max(size, 1)), 5, 1_000))
+
+
+def test_bench_mpv_to_dtv(bench, mpv, n_fields, size):
+    bench(
+        'mpv_to_dtv', lambda: trans.MapParameterValue_to_DataTypeValue(mpv),
+        repeats=_repeats(n_fields, size), fields=n_fields, size=size,
+    )
+
+
+def test_bench_dtv_to_mpv(bench, mpv, n_fields, size):
+    dtv = trans.MapParameterValue_to_DataTypeValue(mpv)
+    bench(
+        'dtv_to_mpv', lambda: trans.DataTypeValue_to_MapParameterValue(dtv),
+        repeats=_repeats(n_fields, size), fields=n_fields, size=size,
+    )
@@ -0,0 +1,86 @@
+import jpype as jp
+import numpy as np
+import pytest
+
+import pyda_japc._jpype_tools as jpype_tools
+import pyda_japc._transformations as trans
+
+
+N_REPEATS = 2_000
+N_FIELDS = 10
+ARRAY_SHAPE = (4, 25)
+
+TYPES = {
+    'BOOLEAN': (jp.JBoolean, np.bool_),
+    'BYTE': (jp.JByte, np.int8),
+    'SHORT': (jp.JShort, np.int16),
+    'INT': (jp.JInt, np.int32),
+    'LONG': (jp.JLong, np.int64),
+    'FLOAT': (jp.JFloat, np.float32),
+    'DOUBLE': (jp.JDouble, np.float64),
+    'STRING': (jp.JString, str),
+}
+
+
+def _java_value(cern, type_name, rank):
+    jp_type, dtype = TYPES[type_name]
+    new_value = cern.japc.core.factory.SimpleParameterValueFactory.newValue
+    if rank == 0:
+        return new_value(jp_type(dtype(1)))
+    data = np.arange(np.prod(ARRAY_SHAPE)).astype(dtype)
+    if rank == 1:
+        return new_value(jp.JArray(jp_type)(data))
+    return new_value(jp.JArray(jp_type)(data), jp.JArray(jp.JInt)(ARRAY_SHAPE))
+
+
+def reference_SimpleParameterValue_to_value(value):
+    # The per-value dispatch which the conversion plans replaced, kept for comparison.
+    cern = jp.JPackage("cern")
+    actual_value = value.getObject()
+    if isinstance(actual_value, cern.japc.value.Array2D):
+        return jpype_tools.jarray_to_ndarray(actual_value.getArray1D()) \
+            .reshape(actual_value.getRowCount(), actual_value.getColumnCount())
+    elif isinstance(actual_value, jp.JArray):
+        return jpype_tools.jarray_to_ndarray(actual_value)
+    elif isinstance(actual_value, str):
+        return actual_value
+    return jpype_tools.jscalar_to_scalar(actual_value)
+
+
+@pytest.fixture(params=[0, 1, 2], ids=['scalar', '1d', '2d'])
+def rank(request):
+    return request.param
+
+
+@pytest.fixture(params=list(TYPES))
+def type_name(request):
+    return request.param
+
+
+@pytest.fixture
+def mpv(cern, type_name, rank):
+    """A value of ``N_FIELDS`` fields, all of the same type and rank."""
+    result = cern.japc.core.factory.MapParameterValueFactory.newValue()
+    for idx in range(N_FIELDS):
+        result.put(f"field_{idx}", _java_value(cern, type_name, rank))
+    return result
+
+
+def test_bench_mpv_to_dtv(bench, mpv, type_name, rank):
+    def dynamic():
+        # The per-value dispatch which the plan replaces.
+        return {name: reference_SimpleParameterValue_to_value(mpv.get(name)) for name in mpv.getNames()}
+
+    def planned():
+        return trans.MapParameterValue_to_DataTypeValue(mpv)
+
+    bench('mpv_to_dtv.dynamic', dynamic, repeats=N_REPEATS, type=type_name, rank=rank)
+    bench('mpv_to_dtv.planned', planned, repeats=N_REPEATS, type=type_name, rank=rank)
+
+
+def test_bench_dtv_to_mpv(bench, mpv, type_name, rank):
+    dtv = trans.MapParameterValue_to_DataTypeValue(mpv)
+    bench(
+        'dtv_to_mpv.planned', lambda: trans.DataTypeValue_to_MapParameterValue(dtv),
+        repeats=N_REPEATS, type=type_name, rank=rank,
+    )
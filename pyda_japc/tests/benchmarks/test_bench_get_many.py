@@ -0,0 +1,39 @@
+import pyda
+import pyda.data
+import pytest
+
+import pyda_japc
+
+
+N_DEVICES = 800
+
+
+@pytest.fixture
+def mocked_fleet(mock_acq_param, japc_mock):
+    devices = [f"MockedDevice{idx}" for idx in range(N_DEVICES)]
+    for idx, dev in enumerate(devices):
+        mock_acq_param(dev, "MockedProperty", "", japc_mock.mpv(["field1", "field2"], [idx, 2 * idx]))
+    return [
+        pyda.data.PropertyAccessQuery(device=dev, prop="MockedProperty", selector="", data_filters=None)
+        for dev in devices
+    ]
+
+
+def test_bench_get_many_vs_sequential(bench, mocked_fleet):
+    provider = pyda_japc.JapcProvider()
+    client = pyda.SimpleClient(provider=provider)
+    # Warm up the parameter, selector and schema caches for both variants.
+    provider.get_many(mocked_fleet).aggregate.result(timeout=60)
+
+    def sequential():
+        # One blocking get after the other, as through a pyda client.
+        return [
+            client.get(device=query.device, prop=query.prop, selector=query.selector) for query in mocked_fleet
+        ]
+
+    def batched():
+        return provider.get_many(mocked_fleet).aggregate.result(timeout=60)
+
+    assert len(batched()) == N_DEVICES
+    bench('get.sequential', sequential, repeats=5, batch=N_DEVICES, devices=N_DEVICES)
+    bench('get.get_many', batched, repeats=5, batch=N_DEVICES, devices=N_DEVICES)
@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+import pyds_model as model
+import pytest
+
+import pyda_japc._transformations as trans
+
+
+#: The rate at which headers are converted in the paced benchmark, as for a busy set of subscriptions.
+RATE = 10_000
+DURATION = 2.
+N_SELECTORS = 32
+N_HEADERS = 1_000
+
+
+def reference_ValueHeader_to_ctx_notif_pair(header):
+    # The implementation before the per-selector context constructors were cached, kept for comparison.
+    if header.isFirstUpdate():
+        notification_type = 'FIRST_UPDATE'
+    else:
+        notification_type = 'SETTING_UPDATE'
+
+    acq_stamp = int(header.getAcqStamp())
+    set_stamp = int(header.getSetStamp())
+
+    selector = header.getSelector().getId()
+    has_selector = selector != ''
+
+    if not has_selector:
+        if set_stamp == 0:
+            context = model.AcquisitionContext(acquisition_stamp=acq_stamp)
+        else:
+            context = model.SettingContext(acquisition_stamp=acq_stamp, set_stamp=set_stamp)
+    else:
+        if set_stamp == 0:
+            context = model.CycleBoundAcquisitionContext(
+                acquisition_stamp=acq_stamp, selector=selector, cycle_stamp=int(header.getCycleStamp()),
+            )
+        else:
+            context = model.MultiplexedSettingContext(
+                acquisition_stamp=acq_stamp, selector=selector, set_stamp=set_stamp,
+            )
+    return context, notification_type
+
+
+IMPLEMENTATIONS = {
+    'reference': reference_ValueHeader_to_ctx_notif_pair,
+    'cached': trans.ValueHeader_to_ctx_notif_pair,
+}
+
+
+@pytest.fixture(params=['acquisition', 'setting', 'no_selector'])
+def headers(request, cern):
+    vhf = cern.japc.core.factory.ValueHeaderFactory
+    result = []
+    for idx in range(N_HEADERS):
+        selector = '' if request.param == 'no_selector' else f'BENCH.USER.U{idx % N_SELECTORS}'
+        if request.param == 'setting':
+            result.append(vhf.newSettingImmediateUpdateHeader(1_000 + idx, 2_000 + idx, selector))
+        else:
+            result.append(vhf.newAcquisitionRegularUpdateHeader(1_000 + idx, 2_000 + idx, selector))
+    return result
+
+
+@pytest.mark.parametrize('implementation', list(IMPLEMENTATIONS))
+def test_bench_header_throughput(bench, headers, implementation):
+    convert = IMPLEMENTATIONS[implementation]
+
+    def convert_all():
+        for header in headers:
+            convert(header)
+
+    bench(
+        f'header_to_ctx.{implementation}', convert_all,
+        repeats=20, batch=len(headers), kind=headers[0].getClass().getSimpleName(),
+    )
+
+
+@pytest.mark.parametrize('implementation', list(IMPLEMENTATIONS))
+def test_bench_header_paced(headers, implementation):
+    # Convert RATE headers per second, as a subscription-heavy process would,
+    # and report the CPU time this takes, as well as the conversion latencies.
+    convert = IMPLEMENTATIONS[implementation]
+    n_total = int(RATE * DURATION)
+    latencies = np.empty(n_total, dtype=np.int64)
+    period = 1 / RATE
+    cpu_start = time.process_time()
+    deadline = start = time.perf_counter()
+    for idx in range(n_total):
+        begin = time.perf_counter_ns()
+        convert(headers[idx % len(headers)])
+        latencies[idx] = time.perf_counter_ns() - begin
+        deadline += period
+        while time.perf_counter() < deadline:
+            pass
+    elapsed = time.perf_counter() - start
+    # The busy-wait is CPU time too, so only count the conversions themselves.
+    cpu_fraction = latencies.sum() / 1e9 / elapsed
+    print(
+        f"\nheader_to_ctx.{implementation} at {n_total / elapsed:.0f} headers/s: "
+        f"p50 {np.percentile(latencies, 50) / 1e3:.1f} us, p99 {np.percentile(latencies, 99) / 1e3:.1f} us, "
+        f"{cpu_fraction:.1%} of a core (process CPU {time.process_time() - cpu_start:.2f} s)",
+    )
+    assert n_total / elapsed > 0.9 * RATE, "The conversion cannot keep up with the target rate"
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import pyda_japc._transformations as trans
+
+
+N_REPEATS = 200
+
+
+@pytest.fixture
+def wide_mpv(japc_mock, cern):
+    """A 50 field value: 40 scalars and 10 arrays of 10^5 doubles."""
+    simple = cern.japc.value.spi.value.simple
+    names, values = [], []
+    for idx in range(40):
+        names.append(f"scalar_{idx}")
+        values.append(simple.DoubleValue(float(idx)))
+    for idx in range(10):
+        names.append(f"array_{idx}")
+        values.append(simple.DoubleArrayValue(np.arange(100_000, dtype=np.float64)))
+    return japc_mock.mpv(names, values)
+
+
+def test_bench_lazy_vs_eager(bench, wide_mpv):
+    def eager():
+        value = trans.MapParameterValue_to_DataTypeValue(wide_mpv)
+        value['scalar_0'], value['array_0']
+        return value
+
+    def lazy():
+        value = trans.LazyDataTypeValue(wide_mpv)
+        value['scalar_0'], value['array_0']
+        return value
+
+    # Reading 2 of 50 fields.
+    eager_result = bench('mpv_to_dtv.eager', eager, repeats=N_REPEATS, fields_read=2)
+    lazy_result = bench('mpv_to_dtv.lazy', lazy, repeats=N_REPEATS, fields_read=2)
+    assert lazy_result.alloc_retained_bytes < eager_result.alloc_retained_bytes
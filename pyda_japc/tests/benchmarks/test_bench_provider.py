@@ -0,0 +1,74 @@
+import numpy as np
+import pyda
+import pyda.data
+import pytest
+
+import pyda_japc
+from pyda_japc import _provider
+
+
+N_OPERATIONS = 500
+DEV = "MockedDevice"
+PROP = "MockedProperty"
+
+
+@pytest.fixture(params=[0, 1_000, 100_000], ids=lambda n: 'scalar' if not n else f'{n}_elements')
+def size(request):
+    return request.param
+
+
+@pytest.fixture
+def value(size):
+    return {"field1": 1.5, "field2": np.linspace(0, 1, size) if size else 2.5}
+
+
+@pytest.fixture
+def query():
+    return pyda.data.PropertyAccessQuery(device=DEV, prop=PROP, selector="", data_filters=None)
+
+
+@pytest.fixture
+def acq_value(japc_mock, value):
+    return japc_mock.mpv(list(value), list(value.values()))
+
+
+def test_bench_get_throughput(bench, mock_acq_param, acq_value, query, size):
+    mock_acq_param(DEV, PROP, "", acq_value)
+    client = pyda.SimpleClient(provider=pyda_japc.JapcProvider())
+    bench('get', lambda: client.get(device=DEV, prop=PROP, selector=""), repeats=N_OPERATIONS, size=size)
+
+
+def test_bench_set_throughput(bench, japc_mock, value, query, size):
+    japc_mock.mockParameter(f"{DEV}/{PROP}")
+    provider = pyda_japc.JapcProvider()
+    # Through the public (non-blocking) set_many, which takes the values as plain dicts, one set per batch.
+    bench(
+        'set', lambda: provider.set_many([(query, value)]).futures[0].result(timeout=5),
+        repeats=N_OPERATIONS, size=size,
+    )
+
+
+@pytest.mark.parametrize("n_streams", [1, 10])
+def test_bench_subscription_updates(bench, cern, acq_value, query, size, n_streams):
+    # The mocked supercycle can't publish faster than a few updates per second, so
+    # updates are pushed into the shared subscription directly, as the JAPC listener would.
+    header = cern.japc.core.factory.ValueHeaderFactory.newAcquisitionRegularUpdateHeader(0, 0, "")
+    apv = cern.japc.core.factory.AcquiredParameterValueFactory.newAcquiredParameterValue(
+        f"{DEV}/{PROP}", header, acq_value,
+    )
+    update = _provider.RawUpdate(value_j=apv)
+    registry = _provider.SubscriptionRegistry()
+    received = []
+    sinks = [received.append for _ in range(n_streams)]
+    subscription = None
+    for sink in sinks:
+        subscription = registry.attach(query, sink)
+    try:
+        bench(
+            'subscription_update', lambda: subscription._on_raw_update(update),
+            repeats=N_OPERATIONS, size=size, streams=n_streams,
+        )
+    finally:
+        for sink in sinks:
+            registry.detach(subscription, sink)
+    assert len(received) >= N_OPERATIONS * n_streams
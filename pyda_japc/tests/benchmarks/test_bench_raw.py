@@ -0,0 +1,66 @@
+import numpy as np
+import pyda.data
+import pytest
+
+import pyda_japc._provider as provider
+import pyda_japc._transformations as trans
+
+
+N_REPEATS = 2_000
+
+RAW = trans.ConversionOptions(raw=True)
+
+
+@pytest.fixture(params=[1, 10, 100], ids=lambda n: f'{n}_fields')
+def n_fields(request):
+    return request.param
+
+
+@pytest.fixture(params=[0, 1_000], ids=lambda n: 'scalar' if not n else f'{n}_elements')
+def size(request):
+    return request.param
+
+
+@pytest.fixture
+def apv(japc_mock, cern, n_fields, size):
+    """An acquired value of ``n_fields`` fields, each a double or an array of ``size`` doubles."""
+    simple = cern.japc.value.spi.value.simple
+    names, values = [], []
+    for idx in range(n_fields):
+        names.append(f"field_{idx}")
+        if size:
+            values.append(simple.DoubleArrayValue(np.linspace(0, 1, size)))
+        else:
+            values.append(simple.DoubleValue(float(idx)))
+    factory = cern.japc.core.factory
+    header = factory.ValueHeaderFactory.newAcquisitionRegularUpdateHeader(1, 2, 'BENCH.USER.ALL')
+    return factory.AcquiredParameterValueFactory.newAcquiredParameterValue(
+        'BenchDevice/Acquisition', header, japc_mock.mpv(names, values),
+    )
+
+
+@pytest.fixture
+def query():
+    return pyda.data.PropertyAccessQuery(
+        device='BenchDevice', prop='Acquisition', selector='BENCH.USER.ALL', data_filters=None,
+    )
+
+
+def test_bench_apv_conversion(bench, apv, query, n_fields, size):
+    # Both build a complete response, as delivered to a get or a subscription.
+    bench(
+        'apv_to_response.pyds_model', lambda: provider.retrieval_response(query, apv),
+        repeats=N_REPEATS, fields=n_fields, size=size,
+    )
+    bench(
+        'apv_to_response.raw', lambda: provider.retrieval_response(query, apv, RAW),
+        repeats=N_REPEATS, fields=n_fields, size=size,
+    )
+
+
+def test_bench_apv_to_property_data(bench, apv, n_fields, size):
+    # The conversion step alone, without the response around it.
+    bench(
+        'apv_to_property_data', lambda: trans.AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(apv),
+        repeats=N_REPEATS, fields=n_fields, size=size,
+    )
@@ -0,0 +1,45 @@
+import concurrent.futures
+
+import numpy as np
+import pyda.data
+import pytest
+
+import pyda_japc
+
+
+N_DEVICES = 200
+
+
+@pytest.fixture
+def mocked_magnets(japc_mock):
+    devices = [f"MockedMagnet{idx}" for idx in range(N_DEVICES)]
+    for dev in devices:
+        japc_mock.mockParameter(f"{dev}/MockedProperty")
+    return [
+        (
+            pyda.data.PropertyAccessQuery(device=dev, prop="MockedProperty", selector="", data_filters=None),
+            {"current": float(idx), "function": np.linspace(0, idx, 1000)},
+        )
+        for idx, dev in enumerate(devices)
+    ]
+
+
+@pytest.mark.parametrize("workers", [None, 4])
+def test_bench_set_many_vs_sequential(bench, mocked_magnets, workers):
+    provider = pyda_japc.JapcProvider()
+    provider.set_many(mocked_magnets).aggregate.result(timeout=60)
+
+    def sequential():
+        # Each set waits for the previous one to complete.
+        return [
+            provider.set_many([(query, value)]).futures[0].result(timeout=5) for query, value in mocked_magnets
+        ]
+
+    with concurrent.futures.ThreadPoolExecutor(workers or 1) as executor:
+        def batched():
+            batch = provider.set_many(mocked_magnets, executor=executor if workers else None)
+            return batch.aggregate.result(timeout=60)
+
+        assert len(batched()) == N_DEVICES
+        bench('set.sequential', sequential, repeats=5, batch=N_DEVICES, devices=N_DEVICES)
+        bench('set.set_many', batched, repeats=5, batch=N_DEVICES, devices=N_DEVICES, workers=workers)
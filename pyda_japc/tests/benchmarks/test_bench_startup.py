@@ -0,0 +1,51 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+
+#: Run in a fresh interpreter: time a first get, after an explicit warm-up or not.
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import pyda
+import pyda_japc
+from pyda_japc import _jpype_tools
+
+warmup = sys.argv[1] == 'warm'
+if warmup:
+    pyda_japc.warmup()
+warmed_up = time.perf_counter()
+
+cern = _jpype_tools.cern_pkg()
+mock = cern.japc.ext.mockito.JapcMock
+mock.mockAllServices()
+factory = cern.japc.core.factory
+header = factory.ValueHeaderFactory.newAcquisitionRegularUpdateHeader(0, 0, '')
+mpv = mock.mpv(['field1', 'field2'], [1, 2.5])
+param = mock.mockParameter('MockedDevice/MockedProperty')
+apv = factory.AcquiredParameterValueFactory.newAcquiredParameterValue('MockedDevice/MockedProperty', header, mpv)
+mock.whenGetValueThen(param, cern.japc.ext.mockito.JapcMatchers.anySelectorMatcher(), apv)
+client = pyda.SimpleClient(provider=pyda_japc.JapcProvider())
+mocked = time.perf_counter()
+
+client.get(device='MockedDevice', prop='MockedProperty', selector='')
+done = time.perf_counter()
+print(json.dumps({'warmup_s': warmed_up - start, 'first_get_s': done - mocked, 'total_s': done - start}))
+"""
+
+
+def _startup(mode):
+    result = subprocess.run(
+        [sys.executable, '-c', SCRIPT, mode], check=True, stdout=subprocess.PIPE, universal_newlines=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("mode", ["cold", "warm"])
+def test_bench_startup(bench, mode):
+    timings = []
+    bench('startup.first_get', lambda: timings.append(_startup(mode)), repeats=3, mode=mode)
+    first_gets = sorted(timing['first_get_s'] for timing in timings)
+    print(f"\nFirst get ({mode}): median {first_gets[len(first_gets) // 2] * 1e3:.1f} ms")
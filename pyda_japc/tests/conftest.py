@@ -4,6 +4,7 @@ import jpype as jp
 import pytest
 import pyds_model
 from pyda_japc import _jpype_tools
+from pyda_japc import _provider
 
 
 @pytest.fixture(scope='session')
@@ -44,12 +45,16 @@ def japc_mock(jvm, cern):
     """
     mock = cern.japc.ext.mockito.JapcMock
 
+    # Parameters are cached by the provider, make sure that the mocked ones are picked up.
+    _provider.param_cache().cache_clear()
+    _provider.selector_cache().cache_clear()
     try:
         mock.mockAllServices()
         yield mock
     finally:
         mock.resetToDefault()
         mock.mockNoService()
+        _provider.param_cache().cache_clear()
 
 
 @pytest.fixture
@@ -0,0 +1,21 @@
+import json
+
+from pyda_japc import loadgen
+
+
+def test_loadgen__short_run(jvm, tmp_path, capsys):
+    output = tmp_path / 'loadgen.json'
+    assert loadgen.main([
+        '--parameters', '3', '--array-size', '100', '--cycle-ms', '100',
+        '--get-rate', '50', '--set-rate', '10', '--duration', '2', '--interval', '1',
+        '--json', str(output),
+    ]) == 0
+    result = json.loads(output.read_text())
+    assert result['args']['parameters'] == 3
+    assert len(result['reports']) == 2
+    last = result['reports'][-1]
+    assert last['gets_per_s'] > 0
+    assert last['sets_per_s'] > 0
+    assert last['updates_per_s'] > 0
+    assert last['errors'] == 0
+    assert 'updates/s' in capsys.readouterr().out
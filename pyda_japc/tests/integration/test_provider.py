@@ -1,3 +1,5 @@
+import time
+
 import jpype as jp
 import numpy as np
 import pytest
@@ -144,3 +146,494 @@ def test__JapcProvider__set_exception(japc_mock, selector, cern, setting_data_ty
     assert str(response.exception) == "Test error"
     assert isinstance(response.exception.__cause__, cern.japc.core.ParameterException)
     assert response.exception.__cause__.getMessage() == "Test error"
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__set_reusing_arrays(japc_mock, selector, cern):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    japc_mock.mockParameter(f"{dev}/{prop}")
+
+    provider = pyda_japc.JapcProvider(reuse_set_arrays=True)
+    client = pyda.SimpleClient(provider=provider)
+
+    for offset in range(3):
+        input_val = {'field1': np.asfortranarray(np.arange(6, dtype=np.float64).reshape(2, 3) + offset)}
+        response = client.set(device=dev, prop=prop, selector=selector, value=input_val)
+        assert isinstance(response, pyda.data.PropertyUpdateResponse)
+        assert response.exception is None
+
+
+def test__JapcProvider__reuses_parameters(mock_acq_param, japc_mock):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, "", japc_mock.mpv(["field1"], [123]))
+    provider = pyda_japc.JapcProvider()
+    client = pyda.SimpleClient(provider=provider)
+
+    for _ in range(3):
+        assert client.get(device=dev, prop=prop).value["field1"] == 123
+    info = pyda_japc._provider.param_cache().cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test__JapcProvider__invalidate_parameter_cache(mock_acq_param, japc_mock):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, "", japc_mock.mpv(["field1"], [123]))
+    provider = pyda_japc.JapcProvider()
+    client = pyda.SimpleClient(provider=provider)
+    client.get(device=dev, prop=prop)
+    assert f"{dev}/{prop}" in pyda_japc._provider.param_cache()
+
+    provider.invalidate_parameter_cache(dev, prop)
+    assert f"{dev}/{prop}" not in pyda_japc._provider.param_cache()
+
+    with pytest.raises(ValueError, match="Both device and prop"):
+        provider.invalidate_parameter_cache(dev)
+
+
+def test__JapcProvider__get_property__many_concurrent(mock_acq_param, japc_mock):
+    dev = "MockedDevice"
+    mock_acq_param(dev, "PropA", "", japc_mock.mpv(["field1"], [1]))
+    mock_acq_param(dev, "PropB", "", japc_mock.mpv(["field1"], [2]))
+    provider = pyda_japc.JapcProvider()
+
+    futures = [
+        provider._get_property(query)
+        for query in [
+            pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector=None, data_filters=None)
+            for prop in ["PropA", "PropB"] * 10
+        ]
+    ]
+    results = [future.result(timeout=5) for future in futures]
+    assert [r.value["field1"] for r in results] == [1, 2] * 10
+    assert all(r.query.prop == ("PropA", "PropB")[i % 2] for i, r in enumerate(results))
+    assert provider._get_dispatcher.pending_count() == 0
+
+
+def test__JapcProvider__get_property__coalesced(mock_acq_param, japc_mock):
+    dev = "MockedDevice"
+    mock_acq_param(dev, "PropA", "", japc_mock.mpv(["field1"], [1]))
+    provider = pyda_japc.JapcProvider(coalesce_gets=True)
+    query = pyda.data.PropertyAccessQuery(device=dev, prop="PropA", selector=None, data_filters=None)
+
+    futures = [provider._get_property(query) for _ in range(10)]
+    results = [future.result(timeout=5) for future in futures]
+    assert [r.value["field1"] for r in results] == [1] * 10
+    stats = provider.coalescing_stats()
+    assert stats.issued + stats.coalesced == 10
+    assert provider._get_dispatcher.pending_count() == 0
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__get_many(mock_acq_param, japc_mock, selector):
+    devices = [f"MockedDevice{idx}" for idx in range(5)]
+    for idx, dev in enumerate(devices):
+        mock_acq_param(dev, "MockedProperty", selector, japc_mock.mpv(["field1"], [idx]))
+    provider = pyda_japc.JapcProvider()
+
+    queries = [
+        pyda.data.PropertyAccessQuery(device=dev, prop="MockedProperty", selector=selector, data_filters=None)
+        for dev in devices
+    ]
+    batch = provider.get_many(queries)
+    assert len(batch.futures) == len(devices)
+    for idx, future in enumerate(batch.futures):
+        response = future.result(timeout=5)
+        assert response.query.device == devices[idx]
+        assert response.value["field1"] == idx
+    responses = batch.aggregate.result(timeout=5)
+    assert [r.value["field1"] for r in responses] == list(range(len(devices)))
+
+
+def test__JapcProvider__get_many__empty(jvm):
+    batch = pyda_japc.JapcProvider().get_many([])
+    assert batch.futures == []
+    assert batch.aggregate.result(timeout=0) == []
+
+
+def test__JapcProvider__get_many__exception(mock_acq_param, japc_mock):
+    mock_acq_param("Good", "MockedProperty", "", japc_mock.mpv(["field1"], [1]))
+    mock_acq_param("Bad", "MockedProperty", "", Exception("Test error"))
+    provider = pyda_japc.JapcProvider()
+
+    batch = provider.get_many([
+        pyda.data.PropertyAccessQuery(device=dev, prop="MockedProperty", selector="", data_filters=None)
+        for dev in ["Good", "Bad"]
+    ])
+    good, bad = batch.aggregate.result(timeout=5)
+    assert good.value["field1"] == 1
+    assert str(bad.exception) == "Test error"
+
+
+@pytest.mark.parametrize("use_executor", [False, True])
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__set_many(japc_mock, selector, use_executor):
+    import concurrent.futures
+
+    devices = [f"MockedMagnet{idx}" for idx in range(5)]
+    params = [japc_mock.mockParameter(f"{dev}/MockedProperty") for dev in devices]
+    org = jp.JPackage("org")
+    provider = pyda_japc.JapcProvider()
+
+    requests = [
+        (
+            pyda.data.PropertyAccessQuery(device=dev, prop="MockedProperty", selector=selector, data_filters=None),
+            {"current": float(idx)},
+        )
+        for idx, dev in enumerate(devices)
+    ]
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        batch = provider.set_many(requests, executor=executor if use_executor else None)
+        responses = batch.aggregate.result(timeout=5)
+
+    assert len(responses) == len(devices)
+    for idx, (param, response) in enumerate(zip(params, responses)):
+        assert isinstance(response, pyda.data.PropertyUpdateResponse)
+        assert response.query.device == devices[idx]
+        org.mockito.Mockito.verify(param).setValue(
+            japc_mock.sel(selector), japc_mock.mpv(["current"], [float(idx)]),
+        )
+
+
+def test__JapcProvider__set_many__conversion_error(japc_mock):
+    japc_mock.mockParameter("MockedMagnet/MockedProperty")
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device="MockedMagnet", prop="MockedProperty", selector="", data_filters=None)
+
+    batch = provider.set_many([(query, {"current": object()}), (query, {"current": 1.0})])
+    with pytest.raises(Exception):
+        batch.futures[0].result(timeout=5)
+    assert isinstance(batch.futures[1].result(timeout=5), pyda.data.PropertyUpdateResponse)
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__aget(mock_acq_param, japc_mock, selector):
+    import asyncio
+
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector=selector, data_filters=None)
+
+    async def main():
+        return await asyncio.gather(*[provider.aget(query) for _ in range(10)])
+
+    responses = asyncio.run(main())
+    assert len(responses) == 10
+    for response in responses:
+        assert isinstance(response, pyda.data.PropertyRetrievalResponse)
+        assert response.value["field1"] == 123
+        assert response.value["field2"] == 456
+
+
+def test__JapcProvider__aset(japc_mock):
+    import asyncio
+
+    param = japc_mock.mockParameter("MockedDevice/MockedProperty")
+    org = jp.JPackage("org")
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device="MockedDevice", prop="MockedProperty", selector="", data_filters=None)
+
+    response = asyncio.run(provider.aset(query, {"field1": "one"}))
+    assert isinstance(response, pyda.data.PropertyUpdateResponse)
+    org.mockito.Mockito.verify(param).setValue(japc_mock.sel(""), japc_mock.mpv(["field1"], ["one"]))
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__asubscribe(japc_mock, selector, supercycle_mock, mock_acq_param):
+    import asyncio
+
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector=selector, data_filters=None)
+
+    async def main():
+        received = []
+        async with provider.asubscribe(query) as stream:
+            async for response in stream:
+                received.append(response)
+                if len(received) == 2:
+                    break
+        return received
+
+    with supercycle_mock(selector):
+        responses = asyncio.run(asyncio.wait_for(main(), 10))
+    for response in responses:
+        assert response.value["field1"] == 123
+        assert response.value["field2"] == 456
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__subscriptions__conversion_pipeline(japc_mock, selector, supercycle_mock, mock_acq_param):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+
+    pipeline = pyda_japc.ConversionPipeline(workers=2)
+    provider = pyda_japc.JapcProvider(conversion_pipeline=pipeline)
+    client = pyda.SimpleClient(provider=provider)
+
+    try:
+        with supercycle_mock(selector):
+            sub = client.subscribe(device=dev, prop=prop, selector=selector)
+            sub.start()
+            with sub:
+                for response in sub:
+                    assert isinstance(response, pyda.data.PropertyRetrievalResponse)
+                    assert response.value["field1"] == 123
+                    assert response.value["field2"] == 456
+                    break
+        [stats] = pipeline.stats()
+        assert stats.name.startswith(f"{dev}/{prop}")
+        assert stats.processed >= 1
+    finally:
+        pipeline.shutdown()
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__subscriptions__shared(japc_mock, selector, supercycle_mock, mock_acq_param):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+
+    provider = pyda_japc.JapcProvider()
+    client = pyda.SimpleClient(provider=provider)
+
+    with supercycle_mock(selector):
+        sub1 = client.subscribe(device=dev, prop=prop, selector=selector)
+        sub2 = client.subscribe(device=dev, prop=prop, selector=selector)
+        sub1.start()
+        sub2.start()
+        assert list(provider.active_subscriptions().values()) == [2]
+        with sub1, sub2:
+            for sub in [sub1, sub2]:
+                for response in sub:
+                    assert response.value["field1"] == 123
+                    break
+    assert provider.active_subscriptions() == {}
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__get_property__served_by_subscription(japc_mock, selector, supercycle_mock, mock_acq_param):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+
+    provider = pyda_japc.JapcProvider(max_age=60)
+    client = pyda.SimpleClient(provider=provider)
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector=selector, data_filters=None)
+
+    with supercycle_mock(selector):
+        sub = client.subscribe(device=dev, prop=prop, selector=selector)
+        sub.start()
+        with sub:
+            for _ in sub:
+                break
+            response = provider._get_property(query).result(timeout=5)
+            assert response.value["field1"] == 123
+            # The response is the subscription's, rather than one built for this query.
+            assert response.query is not query
+    # Without an active subscription, the get goes to JAPC.
+    assert provider._get_property(query).result(timeout=5).query is query
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__subscribe_conflated(japc_mock, selector, supercycle_mock, mock_acq_param):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector=selector, data_filters=None)
+
+    with supercycle_mock(selector):
+        with provider.subscribe_conflated(query, fields=["field1"]) as stream:
+            response = stream.pull(timeout=5)
+            assert response.value["field1"] == 123
+            with pytest.raises(KeyError):
+                response.value["field2"]
+            assert stream.pending() <= 1
+    assert stream.pull() is None
+
+
+def test__JapcProvider__subscribe_correlated(japc_mock, supercycle_mock, cern):
+    selector = "TEST.USER.ALL"
+    factory = cern.japc.core.factory
+    simple = cern.japc.value.spi.value.simple
+    # The mocks publish the same value every cycle, with a fixed cycle stamp.
+    header = factory.ValueHeaderFactory.newAcquisitionRegularUpdateHeader(1, 12345, selector)
+    queries = []
+    for idx in range(3):
+        param = japc_mock.mockParameter(f"MockedDevice{idx}/MockedProperty")
+        mpv = japc_mock.mpv(["position", "trace"], [float(idx), simple.DoubleArrayValue(np.arange(4.) + idx)])
+        apv = factory.AcquiredParameterValueFactory.newAcquiredParameterValue(param.getName(), header, mpv)
+        japc_mock.whenGetValueThen(param, japc_mock.sel(selector), apv)
+        queries.append(pyda.data.PropertyAccessQuery(
+            device=f"MockedDevice{idx}", prop="MockedProperty", selector=selector, data_filters=None,
+        ))
+
+    events = []
+    provider = pyda_japc.JapcProvider()
+    with supercycle_mock(selector):
+        with provider.subscribe_correlated(queries, events.append, timeout=5):
+            deadline = time.monotonic() + 10
+            while not events and time.monotonic() < deadline:
+                time.sleep(0.01)
+    event = events[0]
+    assert event.cycle_stamp == 12345
+    assert event.complete
+    np.testing.assert_array_equal(event.stack("position"), [0., 1., 2.])
+    assert event.stacked()["trace"].shape == (3, 4)
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__get_raw(mock_acq_param, japc_mock, selector):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector=selector, data_filters=None)
+
+    response = provider.get_raw(query).result(timeout=5)
+    assert isinstance(response, pyda_japc._provider.RawResponse)
+    assert response.exception is None
+    assert response.value == {"field1": 123, "field2": 456}
+    assert response.selector == selector
+    assert response.query is query
+
+    assert list(provider.get_raw(query, fields=["field2"]).result(timeout=5).value) == ["field2"]
+    response = provider.get_raw(query, fields=["not_there"]).result(timeout=5)
+    assert isinstance(response.exception, pyda.data.PropertyAccessError)
+
+
+def test__JapcProvider__get_raw__exception(mock_acq_param, cern):
+    mock_acq_param("MockedDevice", "MockedProperty", "", Exception("Test error"))
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device="MockedDevice", prop="MockedProperty", selector="", data_filters=None)
+    response = provider.get_raw(query).result(timeout=5)
+    assert response.value is None
+    assert isinstance(response.exception, pyda.data.PropertyAccessError)
+    assert isinstance(response.exception.__cause__, cern.japc.core.ParameterException)
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__subscribe_raw(japc_mock, selector, supercycle_mock, mock_acq_param):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector=selector, data_filters=None)
+
+    received = []
+    with supercycle_mock(selector):
+        with provider.subscribe_raw(query, received.append):
+            deadline = time.monotonic() + 10
+            while not received and time.monotonic() < deadline:
+                time.sleep(0.01)
+    assert received[0].value == {"field1": 123, "field2": 456}
+    assert provider.active_subscriptions() == {}
+
+
+def test__JapcProvider__get_property__lazy_values(mock_acq_param, japc_mock):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, "", japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider(lazy_values=True)
+    client = pyda.SimpleClient(provider=provider)
+    response = client.get(device=dev, prop=prop)
+    assert response.value["field1"] == 123
+    assert response.value["field2"] == 456
+
+
+@pytest.mark.parametrize("lazy_values", [False, True])
+def test__JapcProvider__get_property__projected_fields(mock_acq_param, japc_mock, lazy_values):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, "", japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider(lazy_values=lazy_values)
+    provider.project_fields(dev, prop, ["field2"])
+    client = pyda.SimpleClient(provider=provider)
+    response = client.get(device=dev, prop=prop)
+    assert response.value["field2"] == 456
+    with pytest.raises(KeyError):
+        response.value["field1"]
+
+    provider.project_fields(dev, prop, None)
+    response = client.get(device=dev, prop=prop)
+    assert response.value["field1"] == 123
+
+
+def test__JapcProvider__get_many__projected_fields(mock_acq_param, japc_mock):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, "", japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector="", data_filters=None)
+    [response] = provider.get_many([query], fields=["field1"]).aggregate.result(timeout=10)
+    assert response.value["field1"] == 123
+    with pytest.raises(KeyError):
+        response.value["field2"]
+
+
+def test__JapcProvider__get_property__projected_field_missing(mock_acq_param, japc_mock):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, "", japc_mock.mpv(["field1"], [123]))
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector="", data_filters=None)
+    [future] = provider.get_many([query], fields=["not_there"]).futures
+    response = future.result(timeout=10)
+    assert isinstance(response.exception, pyda.data.PropertyAccessError)
+    assert "not_there" in str(response.exception)
+    assert isinstance(response.exception.__cause__, KeyError)
+
+
+@pytest.mark.parametrize("selector", ["", "TEST.USER.ALL"])
+def test__JapcProvider__subscriptions__recorder(japc_mock, selector, supercycle_mock, mock_acq_param):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, selector, japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider()
+    query = pyda.data.PropertyAccessQuery(device=dev, prop=prop, selector=selector, data_filters=None)
+
+    with supercycle_mock(selector):
+        stream = provider._create_property_stream(query)
+        recorder = stream.add_recorder(pyda_japc.Recorder(capacity=8, fields=["field1"]))
+        deadline = time.monotonic() + 10
+        while len(recorder) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stream._detach()
+    assert len(recorder) >= 2
+    np.testing.assert_array_equal(recorder.view("field1", last=2), [123, 123])
+    assert list(recorder.stamps(last=2).selector) == [selector, selector]
+
+
+def test__JapcProvider__instrumentation(mock_acq_param, japc_mock):
+    dev = "MockedDevice"
+    prop = "MockedProperty"
+    mock_acq_param(dev, prop, "", japc_mock.mpv(["field1", "field2"], [123, 456]))
+    provider = pyda_japc.JapcProvider()
+    client = pyda.SimpleClient(provider=provider)
+
+    client.get(device=dev, prop=prop)
+    assert provider.latency_report() == {}
+
+    provider.enable_instrumentation()
+    client.get(device=dev, prop=prop)
+    client.set(device=dev, prop=prop, value={'field1': 1})
+    provider.disable_instrumentation()
+    client.get(device=dev, prop=prop)
+
+    report = provider.latency_report()[f"{dev}/{prop}"]
+    assert set(report) == {'japc', 'header', 'value', 'delivery', 'total'}
+    assert report['total'].count == 2
+    assert report['header'].count == 1
+    assert report['value'].count == 2
+
+    provider.reset_latency_report()
+    assert provider.latency_report() == {}
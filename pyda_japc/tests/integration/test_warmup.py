@@ -0,0 +1,17 @@
+import pyda_japc
+from pyda_japc import _transformations
+
+
+def test_warmup(jvm):
+    report = pyda_japc.warmup(iterations=2)
+    assert report.total >= report.conversions > 0
+    # Warming up is only done once.
+    assert pyda_japc.warmup() is report
+    assert _transformations.schema_cache().cache_info().currsize > 0
+
+
+def test_warmup_in_background(jvm):
+    thread = pyda_japc.warmup_in_background(iterations=2)
+    assert pyda_japc.warmup_in_background() is thread
+    thread.join(timeout=60)
+    assert not thread.is_alive()
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+from pyda_japc import _aio
+
+
+def test_loop_bridge__delivers_on_loop_thread():
+    async def main():
+        bridge = _aio.LoopBridge(asyncio.get_running_loop())
+        future = asyncio.get_running_loop().create_future()
+        seen_threads = []
+
+        def resolve(result):
+            seen_threads.append(threading.get_ident())
+            _aio.resolve_future(future, result)
+
+        thread = threading.Thread(target=bridge.call, args=(resolve, 42))
+        thread.start()
+        result = await asyncio.wait_for(future, 5)
+        thread.join()
+        return result, seen_threads
+
+    result, seen_threads = asyncio.run(main())
+    assert result == 42
+    assert seen_threads != [] and threading.get_ident() in seen_threads
+
+
+def test_loop_bridge__batches_wakeups():
+    async def main():
+        bridge = _aio.LoopBridge(asyncio.get_running_loop())
+        results = []
+        # Results produced before the loop gets a chance to run are all drained in one go.
+        for idx in range(100):
+            bridge.call(results.append, idx)
+        while len(results) < 100:
+            await asyncio.sleep(0)
+        return results, bridge.wakeups
+
+    results, wakeups = asyncio.run(main())
+    assert results == list(range(100))
+    assert wakeups == 1
+
+
+def test_resolve_future__ignores_cancelled():
+    async def main():
+        future = asyncio.get_running_loop().create_future()
+        future.cancel()
+        _aio.resolve_future(future, 1)
+        return future.cancelled()
+
+    assert asyncio.run(main())
+
+
+def test_loop_bridge__closed_loop():
+    loop = asyncio.new_event_loop()
+    bridge = _aio.LoopBridge(loop)
+    loop.close()
+    # Must not raise, the results are simply dropped.
+    bridge.call(print, 'unused')
@@ -0,0 +1,88 @@
+import pytest
+
+from pyda_japc import _cache
+
+
+def test_lru_cache__get_put():
+    cache = _cache.LRUCache(maxsize=2)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('b', 'default') == 'default'
+    assert cache.cache_info() == _cache.CacheInfo(hits=1, misses=2, maxsize=2, currsize=1)
+
+
+def test_lru_cache__evicts_least_recently_used():
+    cache = _cache.LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    # Touch 'a' so that 'b' becomes the least recently used.
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert len(cache) == 2
+
+
+def test_lru_cache__get_or_create():
+    cache = _cache.LRUCache(maxsize=4)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    first = cache.get_or_create('key', factory)
+    second = cache.get_or_create('key', factory)
+    assert first is second
+    assert len(calls) == 1
+    info = cache.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_lru_cache__invalidate_and_clear():
+    cache = _cache.LRUCache(maxsize=4)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.invalidate('a') is True
+    assert cache.invalidate('a') is False
+    cache.cache_clear()
+    assert cache.cache_info() == _cache.CacheInfo(hits=0, misses=0, maxsize=4, currsize=0)
+
+
+def test_lru_cache__shrinking_maxsize_trims():
+    cache = _cache.LRUCache(maxsize=3)
+    for key in 'abc':
+        cache.put(key, key)
+    cache.maxsize = 1
+    assert len(cache) == 1
+    assert 'c' in cache
+
+
+def test_lru_cache__negative_maxsize():
+    with pytest.raises(ValueError, match='maxsize must be non-negative'):
+        _cache.LRUCache(maxsize=-1)
+
+
+def test_lru_cache__ttl_expiry(monkeypatch):
+    now = [100.]
+    monkeypatch.setattr(_cache.time, 'monotonic', lambda: now[0])
+    cache = _cache.LRUCache(maxsize=4, ttl=10.)
+    cache.put('a', 1)
+    now[0] += 9.
+    assert cache.get('a') == 1
+    now[0] += 1.
+    assert cache.get('a') is None
+    assert 'a' not in cache
+    info = cache.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_lru_cache__no_ttl_never_expires(monkeypatch):
+    now = [100.]
+    monkeypatch.setattr(_cache.time, 'monotonic', lambda: now[0])
+    cache = _cache.LRUCache(maxsize=4)
+    cache.put('a', 1)
+    now[0] += 1e9
+    assert cache.get('a') == 1
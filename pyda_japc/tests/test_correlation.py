@@ -0,0 +1,154 @@
+import threading
+import types
+
+import numpy as np
+import numpy.testing
+import pytest
+
+from pyda_japc import _correlation, _transformations
+
+
+class _Data(dict):
+    """Stands in for AcquiredPropertyData: a mapping of fields with a header."""
+    def __init__(self, fields, header):
+        super().__init__(fields)
+        self.header = header
+
+
+def make_response(cycle_stamp, exception=None, **fields):
+    header = types.SimpleNamespace(acquisition_timestamp=cycle_stamp + 1, cycle_timestamp=cycle_stamp, selector='SEL')
+    return types.SimpleNamespace(value=_Data(fields, header), exception=exception)
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def correlator(events):
+    return _correlation.CycleCorrelator(['a', 'b', 'c'], events.append, timeout=1, max_pending=2)
+
+
+def test_cycle_correlator__complete_cycles(correlator, events):
+    correlator.add('b', make_response(100, x=2))
+    correlator.add('a', make_response(100, x=1))
+    correlator.add('a', make_response(200, x=10))
+    assert events == []
+    correlator.add('c', make_response(100, x=3))
+
+    [event] = events
+    assert event.cycle_stamp == 100
+    assert event.complete
+    # In the order the parameters were given, not the order they arrived in.
+    assert list(event.responses) == ['a', 'b', 'c']
+    numpy.testing.assert_array_equal(event.stack('x'), [1, 2, 3])
+    assert correlator.pending() == 1
+    assert correlator.stats() == _correlation.CorrelationStats(complete=1, incomplete=0, late=0, uncorrelated=0)
+
+
+def test_cycle_correlator__timeout(correlator, events):
+    correlator.add('a', make_response(100, x=1))
+    correlator.add('c', make_response(100, x=3))
+    correlator.expire()
+    assert events == []
+
+    correlator.expire(now=float('inf'))
+    [event] = events
+    assert not event.complete
+    assert event.missing == ('b', )
+    numpy.testing.assert_array_equal(event.stack('x'), [1, 3])
+
+    # The missing update arriving after the timeout is dropped.
+    correlator.add('b', make_response(100, x=2))
+    assert correlator.pending() == 0
+    assert correlator.stats() == _correlation.CorrelationStats(complete=0, incomplete=1, late=1, uncorrelated=0)
+
+
+def test_cycle_correlator__max_pending(correlator, events):
+    for cycle_stamp in [100, 200, 300]:
+        correlator.add('a', make_response(cycle_stamp))
+    assert [event.cycle_stamp for event in events] == [100]
+    assert events[0].missing == ('b', 'c')
+    assert correlator.pending() == 2
+
+
+def test_cycle_correlator__uncorrelated(correlator, events):
+    correlator.add('a', make_response(0))
+    correlator.add('a', make_response(100, exception=ValueError()))
+    assert correlator.pending() == 0
+    assert correlator.stats().uncorrelated == 2
+
+
+def test_cycle_correlator__duplicate_parameters():
+    with pytest.raises(ValueError):
+        _correlation.CycleCorrelator(['a', 'a'], lambda event: None)
+
+
+def test_cycle_correlator__background_timeout(events):
+    delivered = threading.Event()
+
+    def sink(event):
+        events.append(event)
+        delivered.set()
+
+    correlator = _correlation.CycleCorrelator(['a', 'b'], sink, timeout=0.05)
+    correlator.start()
+    try:
+        correlator.add('a', make_response(100))
+        assert delivered.wait(timeout=5)
+        assert events[0].missing == ('b', )
+    finally:
+        correlator.stop()
+
+
+def test_cycle_correlator__stop_flushes(correlator, events):
+    correlator.start()
+    correlator.add('a', make_response(100))
+    correlator.stop()
+    assert [event.missing for event in events] == [('b', 'c')]
+
+
+def test_cycle_correlator__failing_sink(events):
+    def failing_sink(event):
+        raise ValueError("Consumer error")
+
+    correlator = _correlation.CycleCorrelator(['a'], failing_sink)
+    correlator.add('a', make_response(100))
+    assert correlator.stats().complete == 1
+
+
+def test_correlated_event__stack():
+    event = _correlation.CorrelatedEvent(
+        100,
+        {
+            'a': make_response(100, x=1., arr=np.arange(3), ragged=np.arange(2)),
+            'b': make_response(100, x=2., arr=np.arange(3) + 10, ragged=np.arange(3)),
+        },
+        (),
+    )
+    stacked = event.stacked()
+    assert sorted(stacked) == ['arr', 'x']
+    numpy.testing.assert_array_equal(stacked['arr'], [[0, 1, 2], [10, 11, 12]])
+    assert stacked['x'].shape == (2, )
+    with pytest.raises(ValueError, match='ragged of b has shape'):
+        event.stack('ragged')
+
+
+def test_cycle_correlator__pyda_headers(cern, japc_mock, events):
+    vhf = cern.japc.core.factory.ValueHeaderFactory
+    param = japc_mock.mockParameter('dev/prop')
+    correlator = _correlation.CycleCorrelator(['a', 'b'], events.append, timeout=1)
+
+    def response(header):
+        apv = japc_mock.apv(param, header, 1)
+        data, _ = _transformations.AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(apv)
+        return types.SimpleNamespace(value=data, exception=None)
+
+    correlator.add('a', response(vhf.newAcquisitionRegularUpdateHeader(110, 100, 'SEL')))
+    correlator.add('b', response(vhf.newAcquisitionRegularUpdateHeader(120, 100, 'SEL')))
+    # Without a selector, there is no cycle to correlate on.
+    correlator.add('a', response(vhf.newAcquisitionRegularUpdateHeader(130, 0, '')))
+    [event] = events
+    assert event.cycle_stamp == 100
+    assert correlator.stats() == _correlation.CorrelationStats(complete=1, incomplete=0, late=0, uncorrelated=1)
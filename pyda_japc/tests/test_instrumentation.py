@@ -0,0 +1,95 @@
+import types
+
+import numpy as np
+import pytest
+
+from pyda_japc import _instrumentation
+
+
+def test_histogram__empty():
+    hist = _instrumentation.Histogram()
+    assert hist.summary() == _instrumentation.HistogramSummary(0, 0, 0., 0, 0, 0, 0, 0)
+
+
+@pytest.mark.parametrize("scale", [1, 1_000, 1_000_000, 1_000_000_000])
+def test_histogram__percentiles_within_precision(scale):
+    values = np.random.default_rng(42).integers(scale, 100 * scale, size=5_000)
+    hist = _instrumentation.Histogram()
+    for value in values:
+        hist.record(int(value))
+    for percentile in [50, 90, 99, 99.9]:
+        expected = np.percentile(values, percentile, method='inverted_cdf')
+        assert hist.percentile(percentile) == pytest.approx(expected, rel=0.01, abs=1)
+    summary = hist.summary()
+    assert summary.count == len(values)
+    assert (summary.min, summary.max) == (values.min(), values.max())
+    assert summary.mean == pytest.approx(values.mean())
+
+
+def test_histogram__clamps_out_of_range_values():
+    hist = _instrumentation.Histogram(max_bits=20)
+    hist.record(-5)
+    hist.record(1 << 30)
+    assert hist.min == 0
+    assert hist.max == (1 << 20) - 1
+
+
+def test_histogram__only_stores_buckets_hit():
+    hist = _instrumentation.Histogram()
+    for value in [5, 5, 1_000, 1_000_000_000]:
+        hist.record(value)
+    assert len(hist._counts) == 3
+    assert hist.percentile(50) == 5
+
+
+def test_histogram__merge():
+    first, second, both = _instrumentation.Histogram(), _instrumentation.Histogram(), _instrumentation.Histogram()
+    for value in [10, 20, 30]:
+        first.record(value)
+        both.record(value)
+    for value in [5, 4_000, 50_000]:
+        second.record(value)
+        both.record(value)
+    first.merge(second)
+    assert first.summary() == both.summary()
+
+    with pytest.raises(ValueError):
+        first.merge(_instrumentation.Histogram(sub_bucket_bits=4))
+
+
+def test_instrumentation__records_marked_stages():
+    instrumentation = _instrumentation.Instrumentation()
+    query = types.SimpleNamespace(device='dev', prop='prop', selector='SEL')
+    for _ in range(3):
+        trace = instrumentation.trace(query)
+        trace.mark('japc')
+        trace.mark('queue')
+        trace.mark('header')
+        trace.mark('value')
+        trace.finish()
+    report = instrumentation.report()
+    assert list(report) == ['dev/prop']
+    assert set(report['dev/prop']) == set(_instrumentation.STAGES)
+    assert all(summary.count == 3 for summary in report['dev/prop'].values())
+    total, stages = report['dev/prop']['total'], report['dev/prop']
+    assert total.max >= max(stages[stage].max for stage in ['japc', 'queue', 'header', 'value', 'delivery'])
+
+    instrumentation.reset()
+    assert instrumentation.report() == {}
+
+
+def test_instrumentation__trace_without_stages_only_has_a_total():
+    instrumentation = _instrumentation.Instrumentation()
+    instrumentation.trace(types.SimpleNamespace(device='dev', prop='prop')).finish()
+    assert list(instrumentation.report()['dev/prop']) == ['total']
+
+
+def test_instrumentation__totals_over_parameters():
+    instrumentation = _instrumentation.Instrumentation()
+    for device in ['dev1', 'dev2']:
+        trace = instrumentation.trace(types.SimpleNamespace(device=device, prop='prop'))
+        trace.mark('value')
+        trace.finish()
+    totals = instrumentation.totals()
+    assert set(totals) == {'value', 'delivery', 'total'}
+    assert totals['total'].count == 2
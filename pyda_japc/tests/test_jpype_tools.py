@@ -0,0 +1,159 @@
+import jpype as jp
+import numpy as np
+import numpy.testing
+import pytest
+
+from pyda_japc import _jpype_tools
+
+
+@pytest.mark.parametrize(
+    ["jtype_name", "dtype"],
+    [
+        ("JBoolean", np.bool_),
+        ("JByte", np.int8),
+        ("JShort", np.int16),
+        ("JInt", np.int32),
+        ("JLong", np.int64),
+        ("JFloat", np.float32),
+        ("JDouble", np.float64),
+    ],
+)
+@pytest.mark.parametrize("borrow", [True, False])
+def test_jarray_to_ndarray__primitive(jvm, jtype_name, dtype, borrow):
+    value = np.array([1, 0, 1, 1], dtype=dtype)
+    jarr = jp.JArray(getattr(jp, jtype_name))(value)
+
+    result = _jpype_tools.jarray_to_ndarray(jarr, borrow=borrow)
+    assert result.dtype == dtype
+    numpy.testing.assert_array_equal(result, value)
+    # Borrowed arrays are views onto the Java data, and must not be written to.
+    assert result.flags.writeable is not borrow
+
+
+def test_jarray_to_ndarray__copy_is_independent(jvm):
+    jarr = jp.JArray(jp.JDouble)([1.0, 2.0])
+    result = _jpype_tools.jarray_to_ndarray(jarr)
+    jarr[0] = 5.0
+    numpy.testing.assert_array_equal(result, [1.0, 2.0])
+
+
+def test_jarray_to_ndarray__empty(jvm):
+    result = _jpype_tools.jarray_to_ndarray(jp.JArray(jp.JInt)(0))
+    assert result.dtype == np.int32
+    assert result.shape == (0, )
+
+
+def test_jarray_to_ndarray__strings(jvm):
+    jarr = jp.JArray(jp.JString)(["Hello world! ✓", "Goodbye"])
+    result = _jpype_tools.jarray_to_ndarray(jarr)
+    numpy.testing.assert_array_equal(result, ["Hello world! ✓", "Goodbye"])
+
+
+@pytest.mark.parametrize(
+    ["jtype_name", "dtype"],
+    [
+        ("JBoolean", np.bool_),
+        ("JByte", np.int8),
+        ("JShort", np.int16),
+        ("JInt", np.int32),
+        ("JLong", np.int64),
+        ("JFloat", np.float32),
+        ("JDouble", np.float64),
+    ],
+)
+def test_ndarray_to_jarray__primitive(jvm, jtype_name, dtype):
+    value = np.array([1, 0, 1, 1], dtype=dtype)
+    jp_type = getattr(jp, jtype_name)
+    result = _jpype_tools.ndarray_to_jarray(value, jp_type)
+    assert isinstance(result, jp.JArray(jp_type))
+    numpy.testing.assert_array_equal(np.array(result), value)
+
+
+@pytest.mark.parametrize(
+    "make_value",
+    [
+        pytest.param(lambda arr: arr, id="c-contiguous"),
+        pytest.param(np.asfortranarray, id="fortran"),
+        pytest.param(lambda arr: np.ascontiguousarray(arr.T).T, id="transposed"),
+        pytest.param(lambda arr: np.repeat(arr, 2, axis=1)[:, ::2], id="strided"),
+    ],
+)
+def test_ndarray_to_jarray__row_major_layout(jvm, make_value):
+    expected = np.arange(12, dtype=np.float64).reshape(3, 4)
+    value = make_value(expected.copy())
+    numpy.testing.assert_array_equal(value, expected)
+
+    result = _jpype_tools.ndarray_to_jarray(value, jp.JDouble)
+    numpy.testing.assert_array_equal(np.array(result), expected.ravel())
+
+
+def test_ndarray_to_jarray__strings(jvm):
+    value = np.array([["a", "b"], ["c", "d"]])
+    result = _jpype_tools.ndarray_to_jarray(value, jp.JString)
+    assert list(result) == ["a", "b", "c", "d"]
+
+
+def test_java_array_pool__reuses_released_arrays(jvm):
+    identity = jp.java.lang.System.identityHashCode
+    pool = _jpype_tools.JavaArrayPool()
+    lease = pool.lease()
+    first = _jpype_tools.ndarray_to_jarray(np.arange(3, dtype=np.float64), jp.JDouble, array_pool=lease)
+    # Still leased, so a new array must be handed out.
+    assert identity(pool.acquire(jp.JDouble, 3)) != identity(first)
+    lease.release()
+
+    second = _jpype_tools.ndarray_to_jarray(np.arange(3, 6, dtype=np.float64), jp.JDouble, array_pool=pool)
+    assert identity(second) == identity(first)
+    numpy.testing.assert_array_equal(np.array(second), [3., 4., 5.])
+
+
+def test_java_array_pool__keyed_by_type_and_length(jvm):
+    pool = _jpype_tools.JavaArrayPool()
+    array = pool.acquire(jp.JDouble, 3)
+    pool.release(array)
+    assert len(pool.acquire(jp.JDouble, 4)) == 4
+    assert isinstance(pool.acquire(jp.JFloat, 3), jp.JArray(jp.JFloat))
+
+
+@pytest.mark.parametrize(
+    ["value", "expected_type_name"],
+    [
+        (True, "Boolean"),
+        (np.bool_(False), "Boolean"),
+        (12, "Integer"),
+        (2 ** 40, "Long"),
+        (np.int8(1), "Byte"),
+        (np.int16(1), "Short"),
+        (np.int64(1), "Long"),
+        (np.float32(1.5), "Float"),
+        (1.5, "Double"),
+        ("text", "String"),
+    ],
+)
+def test_to_java_value__scalars(jvm, value, expected_type_name):
+    result = _jpype_tools.to_java_value(value)
+    boxed = jp.JObject(result, jp.java.lang.Object)
+    assert boxed.getClass().getSimpleName() == expected_type_name
+
+
+@pytest.mark.parametrize(
+    ["value", "jtype_name"],
+    [
+        ([1, 2, 3], "JInt"),
+        ((1, -2 ** 31, 2 ** 31 - 1), "JInt"),
+        ([1, 2 ** 31], "JLong"),
+        ([np.int64(1), 2], "JLong"),
+        (np.array([1, 2], dtype=np.int32), "JInt"),
+        ((1.5, 2.5), "JDouble"),
+        (["a", "b"], "JString"),
+    ],
+)
+def test_to_java_value__arrays(jvm, value, jtype_name):
+    result = _jpype_tools.to_java_value(value)
+    assert isinstance(result, jp.JArray(getattr(jp, jtype_name)))
+    assert list(result) == list(value)
+
+
+def test_to_java_value__unsupported(jvm):
+    with pytest.raises(TypeError, match="Cannot convert Python type"):
+        _jpype_tools.to_java_value(object())
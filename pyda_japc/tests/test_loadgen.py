@@ -0,0 +1,41 @@
+import concurrent.futures
+import threading
+import time
+import types
+
+from pyda_japc import loadgen
+
+
+def test_parse_args__defaults():
+    args = loadgen._parse_args([])
+    assert args.parameters == 100
+    assert args.subscribe is None
+    assert args.json is None
+
+
+def test_paced__calls_at_rate():
+    stop = threading.Event()
+    calls = []
+    thread = threading.Thread(target=loadgen._paced, args=(stop, 200, lambda: calls.append(time.perf_counter())))
+    thread.start()
+    time.sleep(0.25)
+    stop.set()
+    thread.join()
+    assert 25 <= len(calls) <= 55
+
+
+def test_counters__take_resets():
+    counters = loadgen._Counters()
+    done = concurrent.futures.Future()
+    done.set_result(types.SimpleNamespace(exception=None))
+    failed = concurrent.futures.Future()
+    failed.set_exception(ValueError("Test error"))
+    counters.request_done('get', time.perf_counter_ns(), done)
+    counters.request_done('set', time.perf_counter_ns(), failed)
+    counters.update_received(types.SimpleNamespace(exception=None))
+
+    counts = counters.take()
+    assert (counts['gets'], counts['sets'], counts['updates'], counts['errors']) == (1, 1, 1, 1)
+    assert counts['get_latency'].count == 1
+    counts = counters.take()
+    assert (counts['gets'], counts['sets'], counts['updates'], counts['errors']) == (0, 0, 0, 0)
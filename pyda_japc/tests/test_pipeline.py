@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+from pyda_japc import _pipeline
+
+
+@pytest.fixture
+def pipeline():
+    pipeline = _pipeline.ConversionPipeline(workers=2, queue_size=3)
+    try:
+        yield pipeline
+    finally:
+        pipeline.shutdown()
+
+
+class Recorder:
+    """Records processed items, optionally blocking until released."""
+    def __init__(self, blocked=False):
+        self.items = []
+        self.done = threading.Event()
+        self.release = threading.Event()
+        self.started = threading.Event()
+        if not blocked:
+            self.release.set()
+        self.expected = None
+
+    def __call__(self, item):
+        self.started.set()
+        self.release.wait(5)
+        self.items.append(item)
+        if self.expected is not None and len(self.items) >= self.expected:
+            self.done.set()
+
+
+def test_channel__processes_in_order(pipeline):
+    recorder = Recorder()
+    recorder.expected = 100
+    pipeline.configure('dev/prop', queue_size=1000)
+    channel = pipeline.channel('dev/prop', 'dev/prop', recorder)
+    for idx in range(100):
+        channel.put(idx)
+    assert recorder.done.wait(5)
+    assert recorder.items == list(range(100))
+    stats = channel.stats()
+    assert (stats.enqueued, stats.processed, stats.dropped, stats.depth) == (100, 100, 0, 0)
+
+
+@pytest.mark.parametrize(
+    ["policy", "expected"],
+    [
+        (_pipeline.BackpressurePolicy.DROP_OLDEST, [0, 3, 4, 5]),
+        (_pipeline.BackpressurePolicy.DROP_NEWEST, [0, 1, 2, 3]),
+    ],
+)
+def test_channel__drop_policies(pipeline, policy, expected):
+    recorder = Recorder(blocked=True)
+    recorder.expected = 4
+    pipeline.configure('dev/prop', policy=policy)
+    channel = pipeline.channel('dev/prop', 'dev/prop', recorder)
+
+    channel.put(0)
+    # Wait for the worker to pick up the first item, so that the queue is empty.
+    assert recorder.started.wait(5)
+    for idx in range(1, 6):
+        channel.put(idx)
+    stats = channel.stats()
+    assert stats.depth == 3
+    assert stats.max_depth == 3
+    assert stats.dropped == 2
+
+    recorder.release.set()
+    assert recorder.done.wait(5)
+    assert recorder.items == expected
+
+
+def test_channel__block_policy(pipeline):
+    recorder = Recorder(blocked=True)
+    recorder.expected = 6
+    pipeline.configure('dev/prop', policy=_pipeline.BackpressurePolicy.BLOCK)
+    channel = pipeline.channel('dev/prop', 'dev/prop', recorder)
+    channel.put(0)
+    assert recorder.started.wait(5)
+    for idx in range(1, 4):
+        channel.put(idx)
+
+    producer = threading.Thread(target=lambda: [channel.put(idx) for idx in range(4, 6)])
+    producer.start()
+    producer.join(0.2)
+    # The producer is blocked, as the queue is full.
+    assert producer.is_alive()
+
+    recorder.release.set()
+    producer.join(5)
+    assert recorder.done.wait(5)
+    assert recorder.items == list(range(6))
+    assert channel.stats().dropped == 0
+
+
+def test_channel__processing_errors_are_counted(pipeline):
+    processed = threading.Event()
+
+    def process(item):
+        if item == 'bad':
+            raise ValueError(item)
+        processed.set()
+
+    channel = pipeline.channel('dev/prop', 'dev/prop', process)
+    channel.put('bad')
+    channel.put('good')
+    assert processed.wait(5)
+    stats = channel.stats()
+    assert stats.errors == 1
+
+
+def test_channel__closed(pipeline):
+    recorder = Recorder()
+    channel = pipeline.channel('dev/prop', 'dev/prop', recorder)
+    channel.close()
+    channel.put(1)
+    assert channel.stats().enqueued == 0
+
+
+def test_pipeline__defaults_and_overrides(pipeline):
+    default = pipeline.channel('dev/prop', 'dev/prop', print)
+    pipeline.configure('other/prop', policy=_pipeline.BackpressurePolicy.BLOCK, queue_size=10)
+    overridden = pipeline.channel('other/prop', 'other/prop@SEL', print)
+    assert (default.policy, default.queue_size) == (_pipeline.BackpressurePolicy.DROP_OLDEST, 3)
+    assert (overridden.policy, overridden.queue_size) == (_pipeline.BackpressurePolicy.BLOCK, 10)
+    assert sorted(stats.name for stats in pipeline.stats()) == ['dev/prop', 'other/prop@SEL']
+
+
+def test_channel__invalid_queue_size(pipeline):
+    pipeline.configure('dev/prop', queue_size=0)
+    with pytest.raises(ValueError, match='queue_size must be at least 1'):
+        pipeline.channel('dev/prop', 'dev/prop', print)
@@ -0,0 +1,783 @@
+import asyncio
+import threading
+import types
+
+import numpy as np
+import pytest
+
+from pyda_japc import _correlation, _instrumentation, _pipeline, _provider, _transformations
+
+
+def make_query(device="MockedDevice", prop="MockedProperty", selector="", data_filters=None):
+    return types.SimpleNamespace(device=device, prop=prop, selector=selector, data_filters=data_filters)
+
+
+def ignore(response):
+    """A sink for the responses a test doesn't look at."""
+
+
+@pytest.fixture
+def clean_selector_cache():
+    _provider.selector_cache().cache_clear()
+    try:
+        yield _provider.selector_cache()
+    finally:
+        _provider.selector_cache().cache_clear()
+
+
+def test_data_filter_key__order_independent():
+    assert _provider._data_filter_key({'a': 1, 'b': 'x'}) == _provider._data_filter_key({'b': 'x', 'a': 1})
+
+
+def test_data_filter_key__distinguishes_types():
+    keys = {
+        _provider._data_filter_key({'a': True}),
+        _provider._data_filter_key({'a': 1}),
+        _provider._data_filter_key({'a': 1.0}),
+        _provider._data_filter_key({'a': np.int64(1)}),
+    }
+    assert len(keys) == 4
+
+
+def test_data_filter_key__arrays():
+    key = _provider._data_filter_key({'a': np.array([1, 2])})
+    assert key == _provider._data_filter_key({'a': np.array([1, 2])})
+    assert key != _provider._data_filter_key({'a': np.array([1, 3])})
+    assert key != _provider._data_filter_key({'a': np.array([[1, 2]])})
+    hash(key)
+
+
+def test_data_filter_key__unhashable():
+    with pytest.raises(TypeError):
+        _provider._data_filter_key({'a': {'nested': 1}})
+
+
+def test_data_filter_key__empty():
+    assert _provider._data_filter_key(None) == ()
+    assert _provider._data_filter_key({}) == ()
+
+
+def test_create_selector__no_selector(cern, clean_selector_cache):
+    assert _provider.create_selector(make_query()) == cern.japc.core.Selectors.NO_SELECTOR
+    assert len(clean_selector_cache) == 0
+
+
+def test_create_selector__cached(cern, clean_selector_cache):
+    first = _provider.create_selector(make_query(selector="SPS.USER.ALL"))
+    second = _provider.create_selector(make_query(selector="SPS.USER.ALL"))
+    assert first is second
+    assert first.getId() == "SPS.USER.ALL"
+    assert _provider.create_selector(make_query(selector="SPS.USER.SFTPRO1")) is not first
+
+
+def test_create_selector__cached_with_data_filter(cern, clean_selector_cache):
+    data_filters = {'averaging': 5, 'name': 'x'}
+    first = _provider.create_selector(make_query(selector="SPS.USER.ALL", data_filters=data_filters))
+    # Mutating the caller's filter afterwards must not affect the cached selector.
+    data_filters['averaging'] = 6
+    second = _provider.create_selector(make_query(selector="SPS.USER.ALL", data_filters={'averaging': 5, 'name': 'x'}))
+    assert first is second
+    filter_j = first.getDataFilter()
+    assert filter_j.getValueType('averaging') == cern.japc.value.ValueType.INT
+    assert filter_j.getObject('averaging') == 5
+    assert filter_j.getObject('name') == 'x'
+    assert _provider.create_selector(make_query(selector="SPS.USER.ALL", data_filters=data_filters)) is not first
+
+
+def _fake_param(name):
+    return types.SimpleNamespace(getName=lambda: name)
+
+
+def _fake_apv(selector_id):
+    selector = types.SimpleNamespace(getId=lambda: selector_id)
+    header = types.SimpleNamespace(getSelector=lambda: selector)
+    return types.SimpleNamespace(getHeader=lambda: header)
+
+
+@pytest.fixture
+def fake_listeners(monkeypatch):
+    # Avoid creating real JProxies, the correlation logic is independent of Java.
+    monkeypatch.setattr(
+        _provider, '_listener_proxy',
+        lambda on_value, on_exception: types.SimpleNamespace(on_value=on_value, on_exception=on_exception),
+    )
+
+
+@pytest.fixture
+def dispatcher(fake_listeners):
+    return _provider.ListenerDispatcher(
+        value_response=lambda query, apv_j: ('value', query, apv_j),
+        exception_response=lambda query, exc_j: ('exception', query),
+    )
+
+
+def test_listener_dispatcher__routes_by_parameter(dispatcher):
+    results = []
+    query_a = make_query(device='A')
+    query_b = make_query(device='B')
+    listener_a, _ = dispatcher.register(_fake_param('A/MockedProperty'), query_a, results.append)
+    listener_b, _ = dispatcher.register(_fake_param('B/MockedProperty'), query_b, results.append)
+    assert listener_a is listener_b is dispatcher.listener_j
+    assert dispatcher.pending_count() == 2
+
+    apv_a, apv_b = _fake_apv(''), _fake_apv('')
+    listener_b.on_value('B/MockedProperty', apv_b)
+    listener_a.on_value('A/MockedProperty', apv_a)
+    assert results == [('value', query_b, apv_b), ('value', query_a, apv_a)]
+    assert dispatcher.pending_count() == 0
+
+
+def test_listener_dispatcher__interleaved_selectors(dispatcher):
+    results = []
+    query_all = make_query(selector='SPS.USER.ALL')
+    query_lhc = make_query(selector='SPS.USER.LHC1')
+    listener_all, _ = dispatcher.register(_fake_param('dev/prop'), query_all, results.append)
+    listener_lhc, _ = dispatcher.register(_fake_param('dev/prop'), query_lhc, results.append)
+    listener_all_2, _ = dispatcher.register(_fake_param('dev/prop'), query_all, results.append)
+    assert listener_all is listener_all_2 is dispatcher.listener_j
+    # A different selector cannot be told apart on the shared listener.
+    assert listener_lhc is not listener_all
+    assert dispatcher.pending_count() == 2
+
+    # The .ALL get is answered with a more specific selector, which must not go to the LHC1 get.
+    apv_lhc, apv_sftpro = _fake_apv('SPS.USER.LHC1'), _fake_apv('SPS.USER.SFTPRO1')
+    listener_all.on_value('dev/prop', apv_sftpro)
+    listener_lhc.on_value('dev/prop', apv_lhc)
+    assert results == [('value', query_all, apv_sftpro), ('value', query_lhc, apv_lhc)]
+
+    # Once the .ALL gets are answered, another selector can use the shared listener.
+    listener_all.on_exception('dev/prop', 'description', types.SimpleNamespace(getHeader=lambda: None))
+    assert results[-1] == ('exception', query_all)
+    listener, _ = dispatcher.register(_fake_param('dev/prop'), query_lhc, results.append)
+    assert listener is dispatcher.listener_j
+
+
+def test_listener_dispatcher__data_filters(dispatcher):
+    results = []
+    query_1 = make_query(selector='SEL', data_filters={'averaging': 1})
+    query_2 = make_query(selector='SEL', data_filters={'averaging': 2})
+    listener_1, _ = dispatcher.register(_fake_param('dev/prop'), query_1, results.append)
+    listener_2, _ = dispatcher.register(_fake_param('dev/prop'), query_2, results.append)
+    # Filters are not reported in the value header, so each filtered request has its own listener.
+    assert len({id(listener_1), id(listener_2), id(dispatcher.listener_j)}) == 3
+    assert dispatcher.pending_count() == 0
+
+    apv_1, apv_2 = _fake_apv('SEL'), _fake_apv('SEL')
+    listener_2.on_value('dev/prop', apv_2)
+    listener_1.on_value('dev/prop', apv_1)
+    assert results == [('value', query_2, apv_2), ('value', query_1, apv_1)]
+
+
+def test_listener_dispatcher__not_shared(fake_listeners):
+    dispatcher = _provider.ListenerDispatcher(
+        value_response=lambda query, apv_j: ('value', query),
+        exception_response=lambda query, exc_j: ('exception', query),
+        share=False,
+    )
+    results_1, results_2 = [], []
+    listener_1, token = dispatcher.register(_fake_param('dev/prop'), make_query(), results_1.append)
+    listener_2, _ = dispatcher.register(_fake_param('dev/prop'), make_query(), results_2.append)
+    assert listener_1 is not listener_2
+    dispatcher.discard(token)
+
+    # Concurrent sets of one parameter can't swap their success and error.
+    listener_2.on_exception('dev/prop', 'description', types.SimpleNamespace(getHeader=lambda: None))
+    listener_1.on_value('dev/prop', _fake_apv(''))
+    assert results_1 == [('value', make_query())]
+    assert results_2 == [('exception', make_query())]
+
+
+def test_listener_dispatcher__exception_without_header(dispatcher):
+    results = []
+    query = make_query()
+    listener, _ = dispatcher.register(_fake_param('dev/prop'), query, results.append)
+    listener.on_exception('dev/prop', 'description', types.SimpleNamespace(getHeader=lambda: None))
+    assert results == [('exception', query)]
+
+
+def test_listener_dispatcher__discard(dispatcher):
+    results = []
+    listener, token = dispatcher.register(_fake_param('dev/prop'), make_query(), results.append)
+    dispatcher.discard(token)
+    assert dispatcher.pending_count() == 0
+    with pytest.warns(UserWarning, match='does not correspond to a pending request'):
+        listener.on_value('dev/prop', _fake_apv(''))
+    assert results == []
+
+
+class FakeLease:
+    def __init__(self):
+        self.released = False
+
+    def release(self):
+        self.released = True
+
+
+def test_provider__set_lease_released_by_own_response(fake_listeners, monkeypatch):
+    monkeypatch.setattr(_provider, 'update_response', lambda query, apv_j: ('set', query.device))
+    monkeypatch.setattr(_provider, 'update_exception_response', lambda query, exc_j: ('error', query.device))
+    provider = _provider.JapcProvider(reuse_set_arrays=True)
+    leases, listeners = [], []
+
+    def convert_for_set(query, value):
+        leases.append(FakeLease())
+        return value, leases[-1]
+
+    param = types.SimpleNamespace(
+        getName=lambda: 'dev/prop',
+        setValue=lambda selector_j, mpv, listener_j: listeners.append(listener_j),
+    )
+    monkeypatch.setattr(provider, '_convert_for_set', convert_for_set)
+    monkeypatch.setattr(_provider, 'create_param', lambda query: param)
+    monkeypatch.setattr(_provider, 'create_selector', lambda query: None)
+
+    future_1 = provider._set_property(make_query(device='first'), 1)
+    future_2 = provider._set_property(make_query(device='second'), 2)
+    # The second set completing must not recycle the arrays of the first, still in flight.
+    listeners[1].on_value('dev/prop', _fake_apv(''))
+    assert future_2.result(timeout=0) == ('set', 'second')
+    assert [lease.released for lease in leases] == [False, True]
+    assert not future_1.done()
+
+    listeners[0].on_exception('dev/prop', 'description', types.SimpleNamespace(getHeader=lambda: None))
+    assert future_1.result(timeout=0) == ('error', 'first')
+    assert [lease.released for lease in leases] == [True, True]
+
+
+class FakeSubscriptionHandle:
+    def __init__(self, listener):
+        self.listener = listener
+        self.monitoring = False
+
+    def startMonitoring(self):
+        self.monitoring = True
+
+    def stopMonitoring(self):
+        self.monitoring = False
+
+
+@pytest.fixture
+def fake_japc(monkeypatch):
+    """Replace the Java subscription machinery with fakes, recording the created subscriptions."""
+    handles = []
+
+    def create_param(query):
+        def create_subscription(selector_j, listener_j):
+            handles.append(FakeSubscriptionHandle(listener_j))
+            return handles[-1]
+        return types.SimpleNamespace(createSubscription=create_subscription)
+
+    monkeypatch.setattr(_provider, 'create_param', create_param)
+    monkeypatch.setattr(_provider, 'create_selector', lambda query: None)
+    monkeypatch.setattr(_provider, 'create_raw_listener', lambda callback: callback)
+    return handles
+
+
+class FakeRawUpdate:
+    def __init__(self, value):
+        self.value = value
+        self.conversions = 0
+        self.conversion = None
+
+    def to_retrieval_response(self, query, conversion=None, trace=None):
+        self.conversions += 1
+        self.conversion = conversion
+        if trace is not None:
+            trace.mark('value')
+        return ('response', query.device, self.value)
+
+
+def test_subscription_registry__shares_identical_queries(fake_japc):
+    registry = _provider.SubscriptionRegistry()
+    received_1, received_2 = [], []
+    sub_1 = registry.attach(make_query(selector='SEL'), received_1.append)
+    sub_2 = registry.attach(make_query(selector='SEL'), received_2.append)
+    assert sub_1 is sub_2
+    assert len(fake_japc) == 1
+    assert fake_japc[0].monitoring
+    assert registry.active() == {'MockedDevice/MockedProperty@SEL': 2}
+
+    update = FakeRawUpdate(1)
+    fake_japc[0].listener(update)
+    assert update.conversions == 1
+    assert received_1 == received_2 == [('response', 'MockedDevice', 1)]
+    assert received_1[0] is received_2[0]
+    # As the response is shared, no sink may modify its arrays for the others.
+    assert update.conversion == _transformations.ConversionOptions(readonly=True)
+
+
+def test_subscription_registry__distinct_queries(fake_japc):
+    registry = _provider.SubscriptionRegistry()
+    registry.attach(make_query(selector='SEL'), ignore)
+    registry.attach(make_query(selector='OTHER'), ignore)
+    registry.attach(make_query(selector='SEL', data_filters={'a': 1}), ignore)
+    registry.attach(make_query(device='Other', selector='SEL'), ignore)
+    assert len(fake_japc) == 4
+
+
+def test_subscription_registry__distinct_conversions(fake_japc):
+    registry = _provider.SubscriptionRegistry()
+    projected = _transformations.ConversionOptions(fields=('a',))
+    sub_1 = registry.attach(make_query(), ignore)
+    sub_2 = registry.attach(make_query(), ignore, projected)
+    sub_3 = registry.attach(make_query(), ignore, _transformations.ConversionOptions(fields=('a',)))
+    assert sub_1 is not sub_2
+    assert sub_2 is sub_3
+    assert len(fake_japc) == 2
+
+
+def test_subscription_registry__stops_with_last_sink(fake_japc):
+    registry = _provider.SubscriptionRegistry()
+    received_1, received_2 = [], []
+    sub = registry.attach(make_query(), received_1.append)
+    registry.attach(make_query(), received_2.append)
+
+    registry.detach(sub, received_1.append)
+    assert fake_japc[0].monitoring
+    fake_japc[0].listener(FakeRawUpdate(1))
+    assert received_1 == []
+    assert len(received_2) == 1
+
+    registry.detach(sub, received_2.append)
+    assert not fake_japc[0].monitoring
+    assert registry.active() == {}
+
+    # A new stream creates a new JAPC subscription.
+    registry.attach(make_query(), received_1.append)
+    assert len(fake_japc) == 2
+    assert fake_japc[1].monitoring
+
+
+def test_subscription_registry__replays_last_response(fake_japc):
+    registry = _provider.SubscriptionRegistry()
+    registry.attach(make_query(), ignore)
+    fake_japc[0].listener(FakeRawUpdate(1))
+
+    late = []
+    registry.attach(make_query(), late.append)
+    assert late == [('response', 'MockedDevice', 1)]
+
+
+def test_subscription_registry__unkeyable_queries_are_not_shared(fake_japc):
+    registry = _provider.SubscriptionRegistry()
+    query = make_query(data_filters={'a': {'unhashable': 1}})
+    sub_1 = registry.attach(query, ignore)
+    sub_2 = registry.attach(query, ignore)
+    assert sub_1 is not sub_2
+    registry.detach(sub_1, ignore)
+    assert not fake_japc[0].monitoring
+    assert fake_japc[1].monitoring
+
+
+def test_shared_subscription__failing_sink_does_not_affect_others(fake_japc):
+    registry = _provider.SubscriptionRegistry()
+    received = []
+
+    def failing_sink(response):
+        raise ValueError("Consumer error")
+
+    registry.attach(make_query(), failing_sink)
+    registry.attach(make_query(), received.append)
+    fake_japc[0].listener(FakeRawUpdate(1))
+    assert len(received) == 1
+
+
+def test_subscription_registry__instrumentation(fake_japc):
+    registry = _provider.SubscriptionRegistry()
+    registry.attach(make_query(), ignore)
+    fake_japc[0].listener(FakeRawUpdate(1))
+
+    instrumentation = _instrumentation.Instrumentation()
+    registry.instrumentation = instrumentation
+    # Subscriptions made both before and after enabling are timed.
+    registry.attach(make_query(device='Other'), ignore)
+    fake_japc[0].listener(FakeRawUpdate(2))
+    fake_japc[1].listener(FakeRawUpdate(3))
+    report = instrumentation.report()
+    assert sorted(report) == ['MockedDevice/MockedProperty', 'Other/MockedProperty']
+    assert set(report['Other/MockedProperty']) == {'value', 'delivery', 'total'}
+
+    registry.instrumentation = None
+    fake_japc[0].listener(FakeRawUpdate(4))
+    assert instrumentation.report()['MockedDevice/MockedProperty']['total'].count == 1
+
+
+def test_subscription_registry__instrumentation_with_pipeline(fake_japc):
+    pipeline = _pipeline.ConversionPipeline(workers=1)
+    registry = _provider.SubscriptionRegistry(pipeline)
+    registry.instrumentation = _instrumentation.Instrumentation()
+    received = threading.Event()
+    registry.attach(make_query(), lambda response: received.set())
+    fake_japc[0].listener(FakeRawUpdate(1))
+    assert received.wait(timeout=5)
+    pipeline.shutdown()
+    # Timed from the JAPC callback, including the wait for a worker.
+    report = registry.instrumentation.report()['MockedDevice/MockedProperty']
+    assert set(report) == {'queue', 'value', 'delivery', 'total'}
+
+
+def test_subscription_registry__stop_drops_queued_updates(fake_japc):
+    pipeline = _pipeline.ConversionPipeline(workers=1)
+    registry = _provider.SubscriptionRegistry(pipeline)
+    converting, release = threading.Event(), threading.Event()
+
+    class SlowRawUpdate(FakeRawUpdate):
+        def to_retrieval_response(self, *args, **kwargs):
+            converting.set()
+            release.wait(timeout=5)
+            return super().to_retrieval_response(*args, **kwargs)
+
+    received = []
+    subscription = registry.attach(make_query(), received.append)
+    fake_japc[0].listener(SlowRawUpdate(0))
+    updates = [FakeRawUpdate(value) for value in range(1, 3)]
+    for update in updates:
+        fake_japc[0].listener(update)
+    assert converting.wait(timeout=5)
+    assert [stats.depth for stats in pipeline.stats()] == [2]
+    registry.detach(subscription, received.append)
+    assert pipeline.stats() == []
+    release.set()
+    pipeline.shutdown()
+    # The update being converted has nobody left to go to, and the queued ones are never converted.
+    assert received == []
+    assert [update.conversions for update in updates] == [0, 0]
+
+
+def test_provider__async_requests_are_timed(fake_listeners, monkeypatch):
+    def get_response(query, apv_j, conversion, trace=None):
+        trace.mark('japc')
+        return 'get'
+
+    monkeypatch.setattr(_provider, '_get_response', get_response)
+    monkeypatch.setattr(_provider, 'update_response', lambda query, apv_j: 'set')
+    provider = _provider.JapcProvider()
+    param = types.SimpleNamespace(
+        getName=lambda: 'dev/prop',
+        getValue=lambda selector_j, listener_j: listener_j.on_value('dev/prop', _fake_apv('')),
+        setValue=lambda selector_j, mpv, listener_j: listener_j.on_value('dev/prop', _fake_apv('')),
+    )
+    monkeypatch.setattr(_provider, 'create_param', lambda query: param)
+    monkeypatch.setattr(_provider, 'create_selector', lambda query: None)
+    monkeypatch.setattr(provider, '_convert_for_set', lambda query, value: (value, None))
+    provider.enable_instrumentation()
+
+    async def main():
+        return await provider.aget(make_query(device='get')), await provider.aset(make_query(device='set'), 1)
+
+    assert asyncio.run(main()) == ('get', 'set')
+    report = provider.latency_report()
+    assert set(report['get/MockedProperty']) == {'japc', 'delivery', 'total'}
+    assert set(report['set/MockedProperty']) == {'value', 'japc', 'delivery', 'total'}
+
+
+def test_provider__instrumentation_switch(fake_japc):
+    provider = _provider.JapcProvider()
+    provider.enable_instrumentation()
+    assert provider._instrumentation is provider._subscriptions.instrumentation is not None
+    provider.disable_instrumentation()
+    assert provider._instrumentation is provider._subscriptions.instrumentation is None
+    with provider.subscribe_sink(make_query(), ignore):
+        fake_japc[0].listener(FakeRawUpdate(1))
+    assert provider.latency_report() == {}
+
+
+def test_single_flight__coalesces_while_in_flight():
+    flights = _provider.SingleFlight()
+    callbacks = []
+    first = flights.submit('key', callbacks.append)
+    second = flights.submit('key', callbacks.append)
+    other = flights.submit('other', callbacks.append)
+    assert len(callbacks) == 2
+    assert flights.stats() == _provider.CoalescingStats(issued=2, coalesced=1)
+
+    callbacks[0]('response')
+    assert first.result(timeout=0) == second.result(timeout=0) == 'response'
+    assert not other.done()
+    # Once the response has arrived, the next request is issued again.
+    third = flights.submit('key', callbacks.append)
+    assert not third.done()
+    assert flights.stats() == _provider.CoalescingStats(issued=3, coalesced=1)
+    assert flights.in_flight() == 2
+
+
+def test_single_flight__synchronous_response():
+    flights = _provider.SingleFlight()
+    assert flights.submit('key', lambda callback: callback(1)).result(timeout=0) == 1
+    assert flights.in_flight() == 0
+
+
+def test_single_flight__failure_to_issue():
+    flights = _provider.SingleFlight()
+
+    def issue(callback):
+        raise ValueError("Could not issue")
+
+    with pytest.raises(ValueError):
+        flights.submit('key', issue)
+    assert flights.in_flight() == 0
+
+
+def test_provider__coalesces_gets(monkeypatch):
+    provider = _provider.JapcProvider(coalesce_gets=True)
+    issued = []
+    monkeypatch.setattr(provider, '_submit_get', lambda query, callback, **kwargs: issued.append(callback))
+
+    futures = [provider._get_property(make_query()) for _ in range(3)]
+    futures.append(provider._get_property(make_query(selector='SPS.USER.ALL')))
+    futures.append(provider._get_property(make_query(data_filters={'a': {'unhashable': 1}})))
+    assert len(issued) == 3
+    assert provider.coalescing_stats() == _provider.CoalescingStats(issued=2, coalesced=2)
+
+    issued[0]('response')
+    assert [future.result(timeout=0) for future in futures[:3]] == ['response'] * 3
+    assert not futures[3].done()
+
+
+def test_provider__coalesced_gets_are_isolated(monkeypatch):
+    provider = _provider.JapcProvider(coalesce_gets=True)
+    issued = []
+    monkeypatch.setattr(
+        provider, '_submit_get', lambda query, callback, conversion, **kwargs: issued.append((callback, conversion)),
+    )
+
+    first, second, third = [provider._get_property(make_query()) for _ in range(3)]
+    [(callback, conversion)] = issued
+    assert conversion.readonly
+    # Cancelling one of the gets leaves the others (and the JAPC call) alone.
+    assert second.cancel()
+    value = np.zeros(3)
+    value.flags.writeable = not conversion.readonly
+    callback(types.SimpleNamespace(value={'x': value}))
+    assert second.cancelled()
+    assert first.result(timeout=0) is third.result(timeout=0)
+    with pytest.raises(ValueError, match='read-only'):
+        first.result().value['x'][0] = 1
+
+
+def test_provider__coalesces_async_gets(monkeypatch):
+    provider = _provider.JapcProvider(coalesce_gets=True)
+    issued = []
+    monkeypatch.setattr(provider, '_submit_get', lambda query, callback, **kwargs: issued.append(callback))
+
+    async def main():
+        tasks = [asyncio.ensure_future(provider.aget(make_query(selector=selector))) for selector in [None, '', None]]
+        sync_future = provider._get_property(make_query())
+        while not issued:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        issued[0]('response')
+        return await asyncio.gather(*tasks), sync_future.result(timeout=5)
+
+    # No selector is keyed the same way whether given as None or as an empty string.
+    assert asyncio.run(main()) == (['response'] * 3, 'response')
+    assert provider.coalescing_stats() == _provider.CoalescingStats(issued=1, coalesced=3)
+
+
+class FakeResponseUpdate(FakeRawUpdate):
+    def __init__(self, value, exception=None):
+        super().__init__(value)
+        self.exception = exception
+
+    def to_retrieval_response(self, query, conversion=None, trace=None):
+        return types.SimpleNamespace(query=query, value=self.value, exception=self.exception)
+
+
+def test_subscription_registry__latest(fake_japc, monkeypatch):
+    now = [100.]
+    monkeypatch.setattr(_provider.time, 'monotonic', lambda: now[0])
+    registry = _provider.SubscriptionRegistry()
+    sub = registry.attach(make_query(selector='SEL'), ignore)
+    assert registry.latest(make_query(selector='SEL'), max_age=1) is None
+
+    fake_japc[0].listener(FakeResponseUpdate(1))
+    now[0] += 0.5
+    assert registry.latest(make_query(selector='SEL'), max_age=1).value == 1
+    assert registry.latest(make_query(selector='SEL'), max_age=0.1) is None
+    assert registry.latest(make_query(selector='OTHER'), max_age=1) is None
+    projected = _transformations.ConversionOptions(fields=('a',))
+    assert registry.latest(make_query(selector='SEL'), projected, max_age=1) is None
+
+    # Errors are not served.
+    fake_japc[0].listener(FakeResponseUpdate(2, exception=ValueError()))
+    assert registry.latest(make_query(selector='SEL'), max_age=1) is None
+
+    # Nor are the values of stopped subscriptions.
+    fake_japc[0].listener(FakeResponseUpdate(3))
+    registry.detach(sub, ignore)
+    assert registry.latest(make_query(selector='SEL'), max_age=1) is None
+
+
+def test_provider__get_served_by_subscription(fake_japc, monkeypatch):
+    provider = _provider.JapcProvider(max_age=1)
+    issued = []
+    monkeypatch.setattr(provider, '_submit_get', lambda query, callback, **kwargs: issued.append(callback))
+    provider._subscriptions.attach(make_query(), ignore)
+    fake_japc[0].listener(FakeResponseUpdate(1))
+
+    assert provider._get_property(make_query()).result(timeout=0).value == 1
+    assert provider.get_many([make_query()]).aggregate.result(timeout=0)[0].value == 1
+    assert issued == []
+    # A max_age of 0 forces a JAPC call.
+    provider._get_property(make_query(), max_age=0)
+    provider._get_property(make_query(device='Other'))
+    assert len(issued) == 2
+
+
+class FakeArrayUpdate(FakeRawUpdate):
+    def to_retrieval_response(self, query, conversion=None, trace=None):
+        value = np.arange(3)
+        value.flags.writeable = not conversion.readonly
+        return types.SimpleNamespace(query=query, value={'x': value}, exception=None)
+
+
+def test_provider__get_served_by_subscription_is_read_only(fake_japc, monkeypatch):
+    provider = _provider.JapcProvider(max_age=1)
+    monkeypatch.setattr(provider, '_submit_get', lambda query, callback, **kwargs: pytest.fail("JAPC get issued"))
+    with provider.subscribe_sink(make_query(), ignore):
+        fake_japc[0].listener(FakeArrayUpdate(None))
+        response = provider._get_property(make_query()).result(timeout=0)
+    with pytest.raises(ValueError, match='read-only'):
+        response.value['x'][0] = 1
+
+
+class FakeSelectorUpdate(FakeRawUpdate):
+    def __init__(self, value, selector_id=''):
+        super().__init__(value)
+        self._selector_id = selector_id
+
+    def selector_id(self):
+        return self._selector_id
+
+
+def test_conflated_stream__keeps_latest_per_selector(fake_japc):
+    stream = _provider.ConflatedPropertyStream(make_query(selector='SPS.USER.ALL'))
+    stream.start()
+    updates = [
+        FakeSelectorUpdate(1, 'SPS.USER.A'),
+        FakeSelectorUpdate(2, 'SPS.USER.B'),
+        FakeSelectorUpdate(3, 'SPS.USER.A'),
+        FakeSelectorUpdate(4, 'SPS.USER.A'),
+    ]
+    for update in updates:
+        fake_japc[0].listener(update)
+    assert stream.pending() == 2
+    assert stream.stats() == _provider.ConflationStats(received=4, conflated=2)
+
+    # The selector first left pending comes first, with its latest value.
+    assert stream.pull(timeout=0) == ('response', 'MockedDevice', 4)
+    assert stream.pull(timeout=0) == ('response', 'MockedDevice', 2)
+    assert stream.pull(timeout=0) is None
+    # Values which were overwritten are never converted.
+    assert [update.conversions for update in updates] == [0, 1, 0, 1]
+
+
+def test_conflated_stream__stop(fake_japc):
+    with _provider.ConflatedPropertyStream(make_query()) as stream:
+        assert fake_japc[0].monitoring
+        fake_japc[0].listener(FakeSelectorUpdate(1))
+        assert next(iter(stream)) == ('response', 'MockedDevice', 1)
+        fake_japc[0].listener(FakeSelectorUpdate(2))
+    assert not fake_japc[0].monitoring
+    assert stream.pending() == 0
+    assert list(stream) == []
+    # Updates arriving after the stop (e.g. already in flight) are ignored.
+    fake_japc[0].listener(FakeSelectorUpdate(3))
+    assert stream.pending() == 0
+
+
+def test_conflated_stream__pull_waits(fake_japc):
+    stream = _provider.ConflatedPropertyStream(make_query())
+    stream.start()
+    timer = threading.Timer(0.05, fake_japc[0].listener, [FakeSelectorUpdate(1)])
+    timer.start()
+    assert stream.pull(timeout=5) == ('response', 'MockedDevice', 1)
+    timer.join()
+    stream.stop()
+
+
+def test_provider__subscribe_correlated(fake_japc):
+    provider = _provider.JapcProvider()
+    with pytest.raises(ValueError, match='same'):
+        provider.subscribe_correlated([make_query(selector='A'), make_query(selector='B')], ignore)
+    with pytest.raises(ValueError, match='non-empty'):
+        provider.subscribe_correlated([make_query()], ignore)
+
+    queries = [make_query(device=f'dev{idx}', selector='SEL') for idx in range(3)]
+    subscription = provider.subscribe_correlated(queries, ignore)
+    assert subscription.correlator.parameters == ('dev0/MockedProperty', 'dev1/MockedProperty', 'dev2/MockedProperty')
+    with subscription:
+        assert len(fake_japc) == 3
+        assert all(handle.monitoring for handle in fake_japc)
+    assert not any(handle.monitoring for handle in fake_japc)
+    assert provider.active_subscriptions() == {}
+
+
+class FakeCycleUpdate(FakeRawUpdate):
+    def to_retrieval_response(self, query, conversion=None, trace=None):
+        header = types.SimpleNamespace(cycle_timestamp=self.value)
+        return types.SimpleNamespace(query=query, value=types.SimpleNamespace(header=header), exception=None)
+
+
+def test_provider__subscribe_correlated_after_updates(fake_japc):
+    provider = _provider.JapcProvider()
+    queries = [make_query(device=f'dev{idx}', selector='SEL') for idx in range(2)]
+    events = []
+    with provider.subscribe_sink(queries[0], ignore):
+        fake_japc[0].listener(FakeCycleUpdate(100))
+        with provider.subscribe_correlated(queries, events.append) as subscription:
+            # The last update of dev0 is not replayed, as dev1 will never deliver its cycle.
+            assert subscription.correlator.pending() == 0
+            for handle in fake_japc:
+                handle.listener(FakeCycleUpdate(200))
+    assert [event.cycle_stamp for event in events] == [200]
+    assert subscription.stats() == _correlation.CorrelationStats(complete=1, incomplete=0, late=0, uncorrelated=0)
+
+
+def test_provider__get_raw(monkeypatch):
+    provider = _provider.JapcProvider(lazy_values=True)
+    provider.project_fields('MockedDevice', 'MockedProperty', ['a'])
+    conversions = []
+    monkeypatch.setattr(provider, '_submit_get', lambda query, callback, conversion: conversions.append(conversion))
+
+    provider.get_raw(make_query())
+    provider.get_raw(make_query(), fields=['b'])
+    provider._get_property(make_query())
+    assert conversions == [
+        _transformations.ConversionOptions(fields=('a', ), raw=True),
+        _transformations.ConversionOptions(fields=('b', ), raw=True),
+        _transformations.ConversionOptions(lazy=True, fields=('a', )),
+    ]
+
+
+def test_raw_response__repr():
+    response = _provider.RawResponse(make_query(), 'SETTING_UPDATE', {'a': 1}, 10, 20, 0, 'SEL')
+    assert repr(response) == (
+        "<RawResponse MockedDevice/MockedProperty: acq_stamp=10, cycle_stamp=20, set_stamp=0, selector='SEL', "
+        "fields=['a']>"
+    )
+    assert not hasattr(response, '__dict__')
+
+
+def test_provider__subscribe_raw(fake_japc):
+    provider = _provider.JapcProvider()
+    received = []
+    with provider.subscribe_raw(make_query(), received.append):
+        # Not shared with subscriptions delivering pyda responses.
+        provider._subscriptions.attach(make_query(), ignore)
+        assert len(fake_japc) == 2
+        fake_japc[0].listener(FakeRawUpdate(1))
+    assert received == [('response', 'MockedDevice', 1)]
+    assert list(provider.active_subscriptions().values()) == [1]
+
+
+def test_provider__subscribe_sink(fake_japc):
+    provider = _provider.JapcProvider()
+    received = []
+    update = FakeRawUpdate(1)
+    with provider.subscribe_sink(make_query(), received.append, fields=['a']):
+        assert provider.active_subscriptions() == {'MockedDevice/MockedProperty': 1}
+        fake_japc[0].listener(update)
+    assert received == [('response', 'MockedDevice', 1)]
+    assert (update.conversion.fields, update.conversion.raw) == (('a', ), False)
+    assert provider.active_subscriptions() == {}
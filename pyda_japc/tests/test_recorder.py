@@ -0,0 +1,123 @@
+import types
+
+import numpy as np
+import numpy.testing
+import pytest
+
+from pyda_japc import _recorder, _transformations
+
+
+class _Data(dict):
+    """Stands in for AcquiredPropertyData: a mapping of fields with a header."""
+    def __init__(self, fields, header):
+        super().__init__(fields)
+        self.header = header
+
+
+def make_response(acq_stamp, selector='SEL', cycle_stamp=None, exception=None, **fields):
+    header = types.SimpleNamespace(acquisition_timestamp=acq_stamp, cycle_timestamp=cycle_stamp, selector=selector)
+    return types.SimpleNamespace(value=_Data(fields, header), exception=exception)
+
+
+def test_ring_buffer__views_last_items_oldest_first():
+    buffer = _recorder.RingBuffer(3, np.int64)
+    assert buffer.view().shape == (0, )
+    for idx in range(5):
+        buffer.append(idx)
+    assert len(buffer) == 3
+    numpy.testing.assert_array_equal(buffer.view(), [2, 3, 4])
+    numpy.testing.assert_array_equal(buffer.view(2), [3, 4])
+    numpy.testing.assert_array_equal(buffer.view(10), [2, 3, 4])
+
+
+def test_ring_buffer__views_are_zero_copy_and_read_only():
+    buffer = _recorder.RingBuffer(4, np.float64, (2, ))
+    buffer.append([1, 2])
+    buffer.append([3, 4])
+    view = buffer.view(2)
+    assert view.shape == (2, 2)
+    assert not view.flags.writeable
+    assert not view.flags.owndata
+    assert view.flags.c_contiguous
+    # The view is unaffected by the next capacity - n appends.
+    buffer.append([5, 6])
+    buffer.append([7, 8])
+    numpy.testing.assert_array_equal(view, [[1, 2], [3, 4]])
+
+
+def test_ring_buffer__invalid_capacity():
+    with pytest.raises(ValueError):
+        _recorder.RingBuffer(0, np.int64)
+
+
+def test_recorder__records_fields_and_stamps():
+    recorder = _recorder.Recorder(2)
+    for idx in range(3):
+        recorder.record(make_response(
+            100 + idx, cycle_stamp=10 + idx, a_scalar=np.int32(idx), an_array=np.arange(3) * idx, a_string=f's{idx}',
+        ))
+    assert len(recorder) == 2
+    assert recorder.recorded == 3
+    assert recorder.fields == ('a_scalar', 'an_array', 'a_string')
+
+    scalars = recorder.view('a_scalar')
+    assert scalars.dtype == np.int32
+    numpy.testing.assert_array_equal(scalars, [1, 2])
+    numpy.testing.assert_array_equal(recorder.view('an_array'), [[0, 1, 2], [0, 2, 4]])
+    assert list(recorder.view('a_string', last=1)) == ['s2']
+
+    stamps = recorder.stamps()
+    numpy.testing.assert_array_equal(stamps.acq_stamp, [101, 102])
+    numpy.testing.assert_array_equal(stamps.cycle_stamp, [11, 12])
+    assert list(stamps.selector) == ['SEL', 'SEL']
+
+
+def test_recorder__selected_fields():
+    recorder = _recorder.Recorder(4, fields=['b'])
+    recorder.record(make_response(1, a=1, b=2.5))
+    assert recorder.fields == ('b', )
+    numpy.testing.assert_array_equal(recorder.view('b'), [2.5])
+    with pytest.raises(KeyError, match='recorded fields'):
+        recorder.view('a')
+
+
+def test_recorder__shape_change_is_rejected():
+    recorder = _recorder.Recorder(4)
+    recorder.record(make_response(1, a=np.zeros(2)))
+    with pytest.raises(ValueError, match='shape'):
+        recorder.record(make_response(2, a=np.zeros(3)))
+    assert len(recorder) == 1
+
+
+def test_recorder__counts_exceptions():
+    recorder = _recorder.Recorder(4)
+    recorder.record(make_response(1, exception=ValueError("Test error")))
+    assert len(recorder) == 0
+    assert recorder.errors == 1
+    recorder.clear()
+    assert recorder.errors == 0
+
+
+def test_recorder__header_without_cycle_stamp_is_rejected():
+    recorder = _recorder.Recorder(4)
+    response = make_response(1, a=1)
+    del response.value.header.cycle_timestamp
+    with pytest.raises(AttributeError):
+        recorder.record(response)
+    recorder.record(make_response(2, a=2))
+    numpy.testing.assert_array_equal(recorder.view('a'), [2])
+    numpy.testing.assert_array_equal(recorder.stamps().acq_stamp, [2])
+
+
+def test_recorder__pyda_headers(cern, japc_mock):
+    vhf = cern.japc.core.factory.ValueHeaderFactory
+    param = japc_mock.mockParameter('dev/prop')
+    recorder = _recorder.Recorder(4)
+    for header_args in [(110, 100, 'SEL'), (130, 0, '')]:
+        apv = japc_mock.apv(param, vhf.newAcquisitionRegularUpdateHeader(*header_args), 1)
+        data, _ = _transformations.AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(apv)
+        recorder.record(types.SimpleNamespace(value=data, exception=None))
+    stamps = recorder.stamps()
+    numpy.testing.assert_array_equal(stamps.acq_stamp, [110, 130])
+    numpy.testing.assert_array_equal(stamps.cycle_stamp, [100, 0])
+    assert list(stamps.selector) == ['SEL', '']
@@ -1,3 +1,5 @@
+import sys
+
 import jpype as jp
 import numpy as np
 import numpy.testing
@@ -57,6 +59,37 @@ def test_mapparametervalue_to_datatypevalue_multiple_values(japc_mock, cern):
     assert result['a_short'] == 2
 
 
+def test_mapparametervalue_to_datatypevalue__reuses_schema(japc_mock, cern):
+    japc_value = cern.japc.value.spi.value
+    trans.schema_cache().cache_clear()
+
+    def mpv(byte_val, short_val):
+        return japc_mock.mpv(
+            ['a_byte', 'a_short'], [
+                japc_value.simple.ByteValue(byte_val),
+                japc_value.simple.ShortValue(short_val),
+            ]
+        )
+
+    first = trans.MapParameterValue_to_DataTypeValue(mpv(1, 2))
+    second = trans.MapParameterValue_to_DataTypeValue(mpv(3, 4))
+    info = trans.schema_cache().cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+    assert (first['a_byte'], first['a_short']) == (1, 2)
+    assert (second['a_byte'], second['a_short']) == (3, 4)
+
+
+def test_mapparametervalue_to_datatypevalue__schema_keyed_by_types(japc_mock, cern):
+    japc_value = cern.japc.value.spi.value
+    trans.schema_cache().cache_clear()
+
+    as_int = trans.MapParameterValue_to_DataTypeValue(japc_mock.mpv(['a_name'], [japc_value.simple.IntValue(1)]))
+    as_long = trans.MapParameterValue_to_DataTypeValue(japc_mock.mpv(['a_name'], [japc_value.simple.LongValue(1)]))
+    assert as_int.get_type('a_name') == model.BasicType.INT32
+    assert as_long.get_type('a_name') == model.BasicType.INT64
+    assert trans.schema_cache().cache_info().misses == 2
+
+
 @pytest.mark.parametrize(
     ["simple_value_type", "expected_type_name", "value"],
     [
@@ -135,6 +168,157 @@ def test_mapparametervalue_to_datatypevalue__specific_2d_array_types(japc_mock,
     numpy.testing.assert_array_equal(result['a_name'], value)
 
 
+@pytest.mark.parametrize("rank", [1, 2])
+def test_mapparametervalue_to_datatypevalue__borrowed_arrays(japc_mock, cern, rank):
+    japc_value = cern.japc.value.spi.value
+    value = np.arange(6, dtype=np.float64)
+    if rank == 2:
+        value = value.reshape(2, 3)
+        jvalue = japc_value.simple.DoubleArrayValue(value.flatten(), value.shape)
+    else:
+        jvalue = japc_value.simple.DoubleArrayValue(value)
+
+    mpv = japc_mock.mpv(['a_name'], [jvalue])
+    result = trans.MapParameterValue_to_DataTypeValue(mpv, borrow_arrays=True)
+    numpy.testing.assert_array_equal(result['a_name'], value)
+
+
+def test_mapparametervalue_to_datatypevalue__readonly(japc_mock, cern):
+    japc_value = cern.japc.value.spi.value
+    mpv = japc_mock.mpv(
+        ['an_array', 'a_double'], [
+            japc_value.simple.DoubleArrayValue(np.array([1.5, 2.5])),
+            japc_value.simple.DoubleValue(1.),
+        ]
+    )
+    assert trans.MapParameterValue_to_DataTypeValue(mpv)['an_array'].flags.writeable
+    results = [
+        trans.MapParameterValue_to_DataTypeValue(mpv, readonly=True),
+        trans.MapParameterValue_to_dict(mpv, readonly=True),
+        trans.LazyDataTypeValue(mpv, readonly=True),
+    ]
+    for result in results:
+        with pytest.raises(ValueError, match='read-only'):
+            result['an_array'] -= 1
+        numpy.testing.assert_array_equal(result['an_array'], [1.5, 2.5])
+        assert result['a_double'] == 1.
+
+
+def test_mapparametervalue_to_datatypevalue__projected_fields(japc_mock, cern):
+    japc_value = cern.japc.value.spi.value
+    mpv = japc_mock.mpv(
+        ['a_byte', 'an_array', 'a_string'], [
+            japc_value.simple.ByteValue(127),
+            japc_value.simple.DoubleArrayValue(np.array([1.5, 2.5])),
+            japc_value.simple.StringValue("Hello"),
+        ]
+    )
+    result = trans.MapParameterValue_to_DataTypeValue(mpv, fields=['a_string', 'a_byte'])
+    assert sorted(result.keys()) == ['a_byte', 'a_string']
+    assert result['a_byte'] == 127
+    assert result['a_string'] == 'Hello'
+
+    lazy = trans.LazyDataTypeValue(mpv, fields=['an_array'])
+    assert list(lazy.keys()) == ['an_array']
+
+
+def test_mapparametervalue_to_datatypevalue__projected_field_missing(japc_mock, cern):
+    japc_value = cern.japc.value.spi.value
+    mpv = japc_mock.mpv(['a_byte'], [japc_value.simple.ByteValue(127)])
+    with pytest.raises(KeyError, match="not_there"):
+        trans.MapParameterValue_to_DataTypeValue(mpv, fields=['a_byte', 'not_there'])
+
+
+def test_mapparametervalue_to_dict(japc_mock, cern):
+    japc_value = cern.japc.value.spi.value
+    mpv = japc_mock.mpv(
+        ['a_byte', 'an_array', 'a_string'], [
+            japc_value.simple.ByteValue(127),
+            japc_value.simple.DoubleArrayValue(np.array([1.5, 2.5])),
+            japc_value.simple.StringValue("Hello"),
+        ]
+    )
+    result = trans.MapParameterValue_to_dict(mpv)
+    assert type(result) is dict
+    assert sorted(result) == ['a_byte', 'a_string', 'an_array']
+    assert all(type(name) is str for name in result)
+    assert result['a_byte'] == 127
+    assert result['a_byte'].dtype == np.int8
+    numpy.testing.assert_array_equal(result['an_array'], [1.5, 2.5])
+    assert result['a_string'] == 'Hello'
+
+    assert list(trans.MapParameterValue_to_dict(mpv, fields=['a_string'])) == ['a_string']
+
+
+def test_lazy_datatypevalue__converts_on_access(japc_mock, cern):
+    japc_value = cern.japc.value.spi.value
+    mpv = japc_mock.mpv(
+        ['a_byte', 'an_array', 'a_string'], [
+            japc_value.simple.ByteValue(127),
+            japc_value.simple.DoubleArrayValue(np.array([1.5, 2.5])),
+            japc_value.simple.StringValue("Hello"),
+        ]
+    )
+    result = trans.LazyDataTypeValue(mpv)
+    assert sorted(result.keys()) == ['a_byte', 'a_string', 'an_array']
+    assert len(result) == 3
+    assert 'a_byte' in result
+    assert result.get_type('an_array') == model.BasicType.DOUBLE
+    assert result.converted_fields == frozenset()
+
+    assert result['a_byte'] == 127
+    assert result.converted_fields == {'a_byte'}
+    array = result['an_array']
+    numpy.testing.assert_array_equal(array, [1.5, 2.5])
+    # Converted values are cached.
+    assert result['an_array'] is array
+    assert result.converted_fields == {'a_byte', 'an_array'}
+
+    with pytest.raises(KeyError):
+        result['missing']
+
+
+def test_lazy_datatypevalue__to_data_type_value(japc_mock, cern):
+    japc_value = cern.japc.value.spi.value
+    mpv = japc_mock.mpv(
+        ['a_short', 'an_array'], [
+            japc_value.simple.ShortValue(2),
+            japc_value.simple.IntArrayValue(np.array([1, 2], dtype=np.int32)),
+        ]
+    )
+    lazy = trans.LazyDataTypeValue(mpv)
+    eager = trans.MapParameterValue_to_DataTypeValue(mpv)
+    result = lazy.to_data_type_value()
+    assert isinstance(result, model.DataTypeValue)
+    assert sorted(result.keys()) == sorted(eager.keys())
+    for name in eager.keys():
+        assert result.get_type(name) == eager.get_type(name) == lazy.get_type(name)
+        numpy.testing.assert_array_equal(result[name], eager[name])
+
+
+def test_acqvalue_to_property_data__lazy(cern, japc_mock):
+    vhf = cern.japc.core.factory.ValueHeaderFactory
+    param = japc_mock.mockParameter('ff')
+    header = vhf.newAcquisitionRegularUpdateHeader(21312, 0, 'some.selector.here')
+    j_acq = japc_mock.apv(param, header, 123)
+
+    acq, _ = trans.AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(j_acq, lazy=True)
+    assert acq['value'] == 123
+
+
+def test_acqvalue_to_property_data__projected(cern, japc_mock):
+    vhf = cern.japc.core.factory.ValueHeaderFactory
+    param = japc_mock.mockParameter('ff')
+    header = vhf.newAcquisitionRegularUpdateHeader(21312, 0, 'some.selector.here')
+    int_value = cern.japc.value.spi.value.simple.IntValue
+    j_acq = japc_mock.apv(param, header, japc_mock.mpv(['a', 'b'], [int_value(1), int_value(2)]))
+
+    acq, _ = trans.AcquiredParameterValue_to_AcquiredPropertyData_notif_pair(j_acq, fields=('b',))
+    assert acq['b'] == 2
+    with pytest.raises(KeyError):
+        acq['a']
+
+
 def test_datatypevalue_mapparametervalue__multiple_values(datatype, cern):
     datatype.create_basic_item("value", type=model.BasicType.INT64)
     datatype.create_basic_item("another", type=model.BasicType.BOOL)
@@ -151,6 +335,23 @@ def test_datatypevalue_mapparametervalue__multiple_values(datatype, cern):
     assert result.get('another').getObject() == False
 
 
+def test_datatypevalue_mapparametervalue__reuses_plan(datatype, cern):
+    trans.write_plan_cache().cache_clear()
+    datatype.create_basic_item("value", type=model.BasicType.INT64)
+    datatype.create_basic_item("array", type=model.BasicType.DOUBLE, rank=1)
+
+    results = []
+    for idx in range(2):
+        dtv = datatype.create_empty_value()
+        dtv['value'] = np.int64(idx)
+        dtv['array'] = np.array([idx, 1.5])
+        results.append(trans.DataTypeValue_to_MapParameterValue(dtv))
+    info = trans.write_plan_cache().cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+    assert [result.get('value').getObject() for result in results] == [0, 1]
+    numpy.testing.assert_array_equal(results[1].get('array').getObject(), [1, 1.5])
+
+
 @pytest.mark.parametrize(
     ["dsf_type", "expected_type_name", "value"],
     [
@@ -293,6 +494,36 @@ def test_valueheader_to_context__AcquisitionRegularUpdateHeader_cycle_bound_no_s
     assert notification_type == 'SETTING_UPDATE'
 
 
+def test_valueheader_to_context__selector_interned(cern):
+    vhf = cern.japc.core.factory.ValueHeaderFactory
+    selector = 'some.selector.' + 'interned'
+    trans._header_contexts.cache_clear()
+    contexts = [
+        trans.ValueHeader_to_ctx_notif_pair(vhf.newAcquisitionRegularUpdateHeader(21312, cycle_stamp, selector))[0]
+        for cycle_stamp in [1, 2]
+    ]
+    assert [ctx.cycle_stamp for ctx in contexts] == [1, 2]
+    assert trans._header_contexts.cache_info().hits == 1
+    assert trans._header_contexts(selector).selector is sys.intern(selector)
+
+
+@pytest.mark.parametrize(
+    ["header_args", "expected"],
+    [
+        ((21312, 123, 'some.selector.here'), (21312, 123, 0, 'some.selector.here')),
+        ((21312, 123, ''), (21312, 0, 0, '')),
+    ],
+)
+def test_valueheader_to_stamps__acquisition(cern, header_args, expected):
+    header = cern.japc.core.factory.ValueHeaderFactory.newAcquisitionRegularUpdateHeader(*header_args)
+    assert trans.ValueHeader_to_stamps(header) == expected
+
+
+def test_valueheader_to_stamps__setting(cern):
+    header = cern.japc.core.factory.ValueHeaderFactory.newSettingImmediateUpdateHeader(21312, 1322313, 'some.selector')
+    assert trans.ValueHeader_to_stamps(header) == (21312, 0, 1322313, 'some.selector')
+
+
 def test_acqvalue_to_property_data(cern, japc_mock: "cern.japc.ext.mockito.JapcMock"):
     vhf = cern.japc.core.factory.ValueHeaderFactory
 